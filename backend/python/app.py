@@ -1,8 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+import hmac
 import os
+import time
 from chatbot_engine_enhanced import ChatbotEngineEnhanced
+import metrics
+from schedule_index import describe_conflict
+from profiler import Profiler, ProfilerBusy
+from snapshot import SnapshotRejected
 
 # Load environment variables
 load_dotenv()
@@ -10,8 +16,98 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Initialize enhanced chatbot engine
-chatbot = ChatbotEngineEnhanced()
+# Initialize enhanced chatbot engine; the catalog loads off the import path
+chatbot = ChatbotEngineEnhanced(autoload=False)
+chatbot.start_warmup()
+
+# How long /chat waits for warm-up before answering 503
+READY_TIMEOUT = float(os.getenv('CHATBOT_READY_TIMEOUT', 10))
+
+# Most messages accepted by one /chat/batch request
+BATCH_LIMIT = int(os.getenv('CHAT_BATCH_LIMIT', 100))
+
+# Largest page /search returns
+SEARCH_PAGE_LIMIT = int(os.getenv('SEARCH_PAGE_LIMIT', 50))
+
+# Admin routes (profiler, intent updates); without ADMIN_TOKEN they answer 404
+# and the profiler adds no request hooks
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+profiler = Profiler() if ADMIN_TOKEN else None
+
+def admin_error():
+    """Error response unless the request carries ADMIN_TOKEN in X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Admin token required'}), 401
+    return None
+
+def catalog_size():
+    snapshot = chatbot.snapshot
+    return {
+        ('professors',): len(snapshot.professors),
+        ('subjects',): len(snapshot.subject_index.entries),
+        ('schedules',): sum(len(intervals) for intervals in snapshot.schedule_index.by_day.values()),
+        ('attachments',): snapshot.attachment_count
+    }
+
+def numeric_stats(stats, keys=None):
+    """Label tuples to values for the numeric entries of a stats() dict"""
+    return {
+        (key,): value for key, value in stats.items()
+        if (keys is None or key in keys) and isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+# Read from the engine at scrape time; the request histograms live in metrics.py
+metrics.CallbackMetric('chatbot_catalog_size', 'Entries in the published catalog snapshot', catalog_size,
+                       labelnames=('kind',))
+metrics.CallbackMetric('chatbot_snapshot_version', 'Version of the published catalog snapshot',
+                       lambda: chatbot.snapshot.version)
+metrics.CallbackMetric('chatbot_last_reload_seconds', 'Duration of the most recent load or reload',
+                       lambda: chatbot.last_reload and chatbot.last_reload['seconds'])
+metrics.CallbackMetric('chatbot_response_cache_events_total', 'Response cache lookups and removals',
+                       lambda: numeric_stats(chatbot.response_cache.stats(),
+                                             ('hits', 'misses', 'bypassed', 'evictions', 'expirations')),
+                       kind='counter', labelnames=('event',))
+metrics.CallbackMetric('chatbot_response_cache_size', 'Responses currently cached',
+                       lambda: chatbot.response_cache.stats()['size'])
+metrics.CallbackMetric('chatbot_sessions', 'Session contexts currently stored',
+                       lambda: chatbot.sessions.stats()['sessions'])
+metrics.CallbackMetric('chatbot_db_pool', 'MySQL connection pool counters',
+                       lambda: numeric_stats(chatbot.db.pool_stats()), labelnames=('stat',))
+
+def chat_reply(response):
+    """JSON body for a processed message; shared with the ASGI app"""
+    return {
+        'success': True,
+        'response': response['message'],
+        'intent': response['intent'],
+        'emotion': response.get('emotion', None),
+        'data': response.get('data', None),
+        'attachments': response.get('attachments', None),
+        'image_url': response.get('image_url', None),
+        'suggestions': response.get('suggestions', [])
+    }
+
+def start_profiling():
+    session = profiler.session
+    if session is None or request.path.startswith('/admin/'):
+        return
+    
+    # Only read the body when the session filters on it
+    session_id = None
+    if session.session_id is not None:
+        data = request.get_json(silent=True)
+        session_id = data.get('session_id', 'default') if isinstance(data, dict) else None
+    g.profile = profiler.begin(request.headers, session_id)
+
+def stop_profiling(exception=None):
+    profiler.end(g.pop('profile', None))
+
+if profiler is not None:
+    app.before_request(start_profiling)
+    app.teardown_request(stop_profiling)
 
 @app.route('/', methods=['GET'])
 def home():
@@ -33,22 +129,75 @@ def chat():
         user_message = data['message']
         session_id = data.get('session_id', 'default')
         
+        if not chatbot.wait_until_ready(READY_TIMEOUT):
+            return jsonify({
+                'error': 'Chatbot is still starting up, please retry shortly',
+                'success': False
+            }), 503
+        
         # Process the message through enhanced chatbot engine
         response = chatbot.process_message(user_message, session_id)
         
+        return jsonify(chat_reply(response))
+    
+    except Exception as e:
+        print(f"Error in chat endpoint: {e}")
+        metrics.ERRORS.inc('chat')
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), 500
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many messages in one request
+    
+    Accepts a JSON array of {message, session_id} objects (or {"messages": [...]})
+    and returns one result per item, in order. Items sharing a session_id are
+    answered in order, so follow-ups see the earlier items' context, as with
+    /chat. Invalid or failing items get their own error without failing the
+    rest of the batch.
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('messages') if isinstance(data, dict) else data
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty list of messages is required'}), 400
+        if len(items) > BATCH_LIMIT:
+            return jsonify({'error': f'At most {BATCH_LIMIT} messages per batch'}), 400
+        
+        if not chatbot.wait_until_ready(READY_TIMEOUT):
+            return jsonify({
+                'error': 'Chatbot is still starting up, please retry shortly',
+                'success': False
+            }), 503
+        
+        valid = [
+            position for position, item in enumerate(items)
+            if isinstance(item, dict) and isinstance(item.get('message'), str)
+            and isinstance(item.get('session_id', 'default'), str)
+        ]
+        responses = chatbot.process_messages(
+            [items[position]['message'] for position in valid],
+            [items[position].get('session_id', 'default') for position in valid]
+        )
+        
+        results = [{'error': 'Message is required and session_id must be a string', 'success': False}] * len(items)
+        for position, response in zip(valid, responses):
+            if 'error' in response:
+                results[position] = {'error': response['error'], 'success': False}
+            else:
+                results[position] = chat_reply(response)
+        
         return jsonify({
             'success': True,
-            'response': response['message'],
-            'intent': response['intent'],
-            'emotion': response.get('emotion', None),
-            'data': response.get('data', None),
-            'attachments': response.get('attachments', None),
-            'image_url': response.get('image_url', None),
-            'suggestions': response.get('suggestions', [])
+            'results': results
         })
     
     except Exception as e:
-        print(f"Error in chat endpoint: {e}")
+        print(f"Error in chat batch endpoint: {e}")
+        metrics.ERRORS.inc('chat_batch')
         return jsonify({
             'error': str(e),
             'success': False
@@ -56,27 +205,232 @@ def chat():
 
 @app.route('/reload-data', methods=['POST'])
 def reload_data():
-    """Reload chatbot data from database"""
+    """Reload chatbot data from database
+    
+    Only changed professors are reloaded unless the request asks for
+    a full rebuild with ?full=1 or {"full": true}. "force" publishes a
+    snapshot even if it looks truncated and "background" returns before
+    the new snapshot is built.
+    """
     try:
-        chatbot.load_data()
+        data = request.get_json(silent=True) or {}
+        
+        def flag(name):
+            return request.args.get(name, '0') in ('1', 'true') or bool(data.get(name))
+        
+        summary = chatbot.reload_data(full=flag('full'), force=flag('force'), background=flag('background'))
         return jsonify({
             'success': True,
-            'message': 'Data reloaded successfully'
+            'message': 'Data reloaded successfully',
+            'reload': summary
         })
+    except SnapshotRejected as e:
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), 409
     except Exception as e:
+        metrics.ERRORS.inc('reload_data')
         return jsonify({
             'error': str(e),
             'success': False
         }), 500
 
+@app.route('/intents', methods=['GET'])
+def list_intents():
+    """List the intent keyword table"""
+    return jsonify({
+        'success': True,
+        'intents': chatbot.intents
+    })
+
+@app.route('/intents', methods=['POST'])
+def update_intents():
+    """Merge (or with "replace": true, replace) the intent keyword table
+    
+    Admin only. The table lives in this worker's memory, so under a
+    multi-worker server each worker has to be updated separately.
+    """
+    error = admin_error()
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    intents = data.get('intents')
+    
+    valid = isinstance(intents, dict) and bool(intents) and all(
+        isinstance(keywords, list) and any(isinstance(keyword, str) and keyword.strip() for keyword in keywords)
+        and all(isinstance(keyword, str) for keyword in keywords)
+        for keywords in intents.values()
+    )
+    if not valid:
+        return jsonify({'error': 'intents must map intent names to non-empty lists of keywords'}), 400
+    
+    chatbot.set_intents(intents, replace=bool(data.get('replace')))
+    return jsonify({
+        'success': True,
+        'intents': chatbot.intents
+    })
+
+@app.route('/search', methods=['GET'])
+def search():
+    """Ranked, paginated professor search over names, departments and subjects"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    
+    if page < 1 or not 1 <= per_page <= SEARCH_PAGE_LIMIT:
+        return jsonify({'error': f'page must be at least 1 and per_page between 1 and {SEARCH_PAGE_LIMIT}'}), 400
+    
+    results = chatbot.search_professors(query, page, per_page)
+    results['success'] = True
+    return jsonify(results)
+
+@app.route('/schedule/conflicts', methods=['GET'])
+def schedule_conflicts():
+    """Double-booked rooms and professors plus a per-room occupancy heatmap"""
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 0:
+        return jsonify({'error': 'limit must be 0 or more'}), 400
+    
+    snapshot = chatbot.snapshot
+    index = snapshot.schedule_index
+    conflicts = index.conflicts
+    return jsonify({
+        'success': True,
+        'version': snapshot.version,
+        'total_room_conflicts': len(conflicts['rooms']),
+        'total_professor_conflicts': len(conflicts['professors']),
+        'room_conflicts': [describe_conflict('room', day, bookings) for day, bookings in conflicts['rooms'][:limit]],
+        'professor_conflicts': [
+            describe_conflict('professor', day, bookings) for day, bookings in conflicts['professors'][:limit]
+        ],
+        'occupancy': index.occupancy()
+    })
+
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Liveness check; answers as soon as the process is up"""
     return jsonify({
         'status': 'healthy',
-        'professors_loaded': len(chatbot.professors_data)
+        'ready': chatbot.ready.is_set(),
+        'warmup': chatbot.warmup_status,
+        'professors_loaded': len(chatbot.professors_data),
+        'snapshot': chatbot.snapshot.describe(),
+        'database_pool': chatbot.db.pool_stats(),
+        'response_cache': chatbot.response_cache.stats(),
+        'sessions': chatbot.sessions.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage latencies, DB query times and catalog counters for Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profile', methods=['POST'])
+def start_profile():
+    """Profile this worker's requests for a few seconds
+    
+    Body: mode (sample or cprofile), seconds, interval_ms (sample mode),
+    header plus optional header_value, and session_id; only requests that
+    match every given filter are profiled.
+    """
+    error = admin_error()
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    header = data.get('header')
+    try:
+        session = profiler.start(
+            mode=data.get('mode', 'sample'),
+            seconds=float(data.get('seconds', 10)),
+            interval=float(data.get('interval_ms', 5)) / 1000,
+            header=(header, data.get('header_value')) if header else None,
+            session_id=data.get('session_id')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e), 'profile': profiler.session.describe()}), 409
+    
+    return jsonify({
+        'success': True,
+        'profile': session.describe()
+    }), 202
+
+@app.route('/admin/profile', methods=['GET'])
+def profile_result():
+    """Status while running; collapsed stacks or pstats output once finished
+    
+    ?wait=1 blocks until the session ends. ?format is collapsed (sample
+    mode), pstats (a text report, with ?sort and ?limit) or raw (a .prof
+    file for pstats or snakeviz).
+    """
+    error = admin_error()
+    if error:
+        return error
+    
+    session = profiler.session
+    if session is None:
+        return jsonify({'error': 'No profiling session has been started'}), 404
+    
+    if request.args.get('wait', '0') in ('1', 'true'):
+        session.stopped.wait(max(0.0, session.deadline - time.monotonic()))
+    if session.running:
+        return jsonify({
+            'success': True,
+            'profile': session.describe()
+        })
+    
+    default_format = 'collapsed' if session.mode == 'sample' else 'pstats'
+    output_format = request.args.get('format', default_format)
+    if output_format == 'collapsed' and session.mode == 'sample':
+        return Response(session.collapsed(), mimetype='text/plain')
+    if output_format == 'pstats' and session.mode == 'cprofile':
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        return Response(session.pstats_text(request.args.get('sort', 'cumulative'), limit), mimetype='text/plain')
+    if output_format == 'raw' and session.mode == 'cprofile':
+        return Response(session.pstats_dump(), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment; filename=chat.prof'})
+    return jsonify({'error': f'format {output_format} is not available in {session.mode} mode'}), 400
+
+@app.route('/admin/profile', methods=['DELETE'])
+def stop_profile():
+    """End the running session early; its results stay available"""
+    error = admin_error()
+    if error:
+        return error
+    
+    session = profiler.stop()
+    if session is None:
+        return jsonify({'error': 'No profiling session has been started'}), 404
+    return jsonify({
+        'success': True,
+        'profile': session.describe()
     })
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check; 503 until the catalog is loaded and the engine is warm"""
+    is_ready = chatbot.ready.is_set() and bool(chatbot.professors_data)
+    return jsonify({
+        'ready': is_ready,
+        'warmup': chatbot.warmup_status
+    }), 200 if is_ready else 503
+
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'True') == 'True'
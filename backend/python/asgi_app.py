@@ -0,0 +1,149 @@
+"""ASGI entry point: serve the chatbot from one event loop
+
+    uvicorn asgi_app:application --port 5000
+
+/chat and /reload-data are handled natively so a slow reload never holds a
+thread and one process can keep hundreds of chat sessions open. Every other
+route is served by the Flask app in app.py through asgiref's WSGI adapter.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+import metrics
+from app import READY_TIMEOUT, app, chat_reply, chatbot, profiler
+from snapshot import SnapshotRejected
+
+flask_application = WsgiToAsgi(app)
+
+# Reloads started with "background"; kept so they are not garbage collected
+background_reloads = set()
+
+async def read_json(receive):
+    """Request body parsed as JSON, or None if it is empty or invalid"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+async def send_json(send, payload, status=200):
+    body = app.json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            # Same policy flask-cors applies to the WSGI routes
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def chat(scope, receive, send):
+    """Main chatbot endpoint, answered on the event loop"""
+    try:
+        data = await read_json(receive)
+
+        if not isinstance(data, dict) or 'message' not in data:
+            return await send_json(send, {'error': 'Message is required'}, 400)
+
+        if not chatbot.ready.is_set():
+            ready = await asyncio.to_thread(chatbot.wait_until_ready, READY_TIMEOUT)
+            if not ready:
+                return await send_json(send, {
+                    'error': 'Chatbot is still starting up, please retry shortly',
+                    'success': False
+                }, 503)
+
+        session_id = data.get('session_id', 'default')
+        handle = None
+        if profiler is not None and profiler.session is not None:
+            headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+            handle = profiler.begin(headers, session_id)
+        try:
+            response = await chatbot.process_message_async(data['message'], session_id)
+        finally:
+            if handle is not None:
+                profiler.end(handle)
+        await send_json(send, chat_reply(response))
+
+    except Exception as e:
+        print(f"Error in chat endpoint: {e}")
+        metrics.ERRORS.inc('chat')
+        await send_json(send, {'error': str(e), 'success': False}, 500)
+
+async def run_background_reload(full, force):
+    try:
+        summary = await chatbot.reload_data_async(full=full, force=force)
+        print(f"🔄 Background reload published snapshot v{summary['version']}")
+    except Exception as e:
+        print(f"Error in background reload: {e}")
+        metrics.ERRORS.inc('reload_data')
+
+async def reload_data(scope, receive, send):
+    """Reload chatbot data over aiomysql; same options as the Flask route"""
+    data = await read_json(receive) or {}
+    args = parse_qs(scope.get('query_string', b'').decode())
+
+    def flag(name):
+        return args.get(name, ['0'])[0] in ('1', 'true') or bool(data.get(name))
+
+    try:
+        if flag('background'):
+            task = asyncio.create_task(run_background_reload(flag('full'), flag('force')))
+            background_reloads.add(task)
+            task.add_done_callback(background_reloads.discard)
+            summary = {
+                'mode': 'full' if flag('full') else 'incremental',
+                'status': 'scheduled',
+                'version': chatbot.snapshot.version
+            }
+        else:
+            summary = await chatbot.reload_data_async(full=flag('full'), force=flag('force'))
+
+        await send_json(send, {
+            'success': True,
+            'message': 'Data reloaded successfully',
+            'reload': summary
+        })
+    except SnapshotRejected as e:
+        await send_json(send, {'error': str(e), 'success': False}, 409)
+    except Exception as e:
+        metrics.ERRORS.inc('reload_data')
+        await send_json(send, {'error': str(e), 'success': False}, 500)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if chatbot.async_db is not None:
+                await chatbot.async_db.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+NATIVE_ROUTES = {
+    ('POST', '/chat'): chat,
+    ('POST', '/reload-data'): reload_data
+}
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    handler = None
+    if scope['type'] == 'http':
+        handler = NATIVE_ROUTES.get((scope['method'], scope['path']))
+
+    if handler is None:
+        return await flask_application(scope, receive, send)
+    await handler(scope, receive, send)
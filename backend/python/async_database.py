@@ -0,0 +1,148 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+from database import (
+    ALL_ATTACHMENTS_QUERY,
+    CATALOG_QUERY,
+    CHANGED_PROFESSORS_QUERY,
+    JOINABLE_SCHEDULES_QUERY,
+    SUBJECT_FINGERPRINT_QUERY,
+    CatalogFetchError,
+    subject_fingerprints
+)
+from lazy_imports import LazyModule
+from metrics import db_query
+
+# Only the ASGI app needs the async driver
+aiomysql = LazyModule('aiomysql')
+
+class AsyncDatabaseConnection:
+    """Non-blocking counterpart of DatabaseConnection for the ASGI app
+
+    Runs the same catalog queries over an aiomysql pool, so reloads wait on
+    MySQL without holding the event loop. Error handling mirrors the sync
+    class: catalog reads raise CatalogFetchError, the rest return None or [].
+    """
+
+    def __init__(self):
+        self.host = os.getenv('DB_HOST', 'localhost')
+        self.database = os.getenv('DB_NAME', 'findmyprofessor')
+        self.user = os.getenv('DB_USER', 'root')
+        self.password = os.getenv('DB_PASSWORD', '')
+        self.pool_size = max(1, int(os.getenv('DB_POOL_SIZE', 5)))
+        self.pool = None
+        self._pool_lock = None
+
+    async def get_pool(self):
+        """Create the aiomysql pool on first use"""
+        if self.pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self.pool is None:
+                    self.pool = await aiomysql.create_pool(
+                        host=self.host,
+                        db=self.database,
+                        user=self.user,
+                        password=self.password,
+                        minsize=1,
+                        maxsize=self.pool_size,
+                        autocommit=True
+                    )
+        return self.pool
+
+    async def close(self):
+        """Close every pooled connection"""
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def _fetch(self, name: str, query: str, args=None, dictionary: bool = False) -> List:
+        """Run one query; name labels its timing in chatbot_db_query_seconds"""
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+            async with connection.cursor(cursor_class) as cursor:
+                with db_query(name):
+                    await cursor.execute(query, args)
+                    return list(await cursor.fetchall())
+
+    async def iter_all_data(self, professor_ids=None, batch_size: int = 1000):
+        """Stream the joined catalog rows in batches of up to batch_size rows
+
+        Uses an unbuffered cursor, so the result set is never held in memory
+        at once. Raises CatalogFetchError on failure.
+        """
+        if professor_ids is not None and not professor_ids:
+            return
+
+        if professor_ids is None:
+            query, args = CATALOG_QUERY.format(where=""), None
+        else:
+            args = list(professor_ids)
+            placeholders = ", ".join(["%s"] * len(args))
+            query = CATALOG_QUERY.format(where=f"WHERE p.id IN ({placeholders})")
+
+        try:
+            pool = await self.get_pool()
+            async with pool.acquire() as connection:
+                async with connection.cursor(aiomysql.SSDictCursor) as cursor:
+                    # Only the database's share: the caller consumes rows between batches
+                    with db_query('catalog'):
+                        await cursor.execute(query, args)
+
+                    while True:
+                        with db_query('catalog_fetch'):
+                            rows = await cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield rows
+
+        except (aiomysql.Error, OSError) as e:
+            print(f"Error fetching data: {e}")
+            raise CatalogFetchError(str(e)) from e
+
+    async def fetch_server_time(self):
+        """Current database server time, used as the reload watermark"""
+        try:
+            rows = await self._fetch('server_time', "SELECT NOW()")
+            return rows[0][0]
+        except (aiomysql.Error, OSError) as e:
+            print(f"Error fetching server time: {e}")
+            return None
+
+    async def fetch_catalog_ids(self) -> Optional[Dict]:
+        """Every professor, subject and joinable schedule id, or None on error"""
+        try:
+            professors = await self._fetch('catalog_ids', "SELECT id FROM professors")
+            subjects = await self._fetch('catalog_ids', SUBJECT_FINGERPRINT_QUERY)
+            schedules = await self._fetch('catalog_ids', JOINABLE_SCHEDULES_QUERY)
+        except (aiomysql.Error, OSError) as e:
+            print(f"Error fetching catalog ids: {e}")
+            return None
+
+        owners, fields = subject_fingerprints(subjects)
+        return {
+            'professors': {row[0] for row in professors},
+            'subjects': owners,
+            'subject_fields': fields,
+            'schedules': dict(schedules)
+        }
+
+    async def fetch_changed_professor_ids(self, since):
+        """Ids of professors changed since a watermark, or None on error"""
+        try:
+            rows = await self._fetch('changed_professors', CHANGED_PROFESSORS_QUERY, (since, since, since))
+            return {row[0] for row in rows}
+        except (aiomysql.Error, OSError) as e:
+            print(f"Error fetching changed professors: {e}")
+            return None
+
+    async def fetch_all_attachments(self) -> List[Dict]:
+        """Every attachment in one query, newest first"""
+        try:
+            return await self._fetch('all_attachments', ALL_ATTACHMENTS_QUERY, dictionary=True)
+        except (aiomysql.Error, OSError) as e:
+            print(f"Error fetching attachments: {e}")
+            return []
@@ -0,0 +1,66 @@
+"""Compare the lexicon and TextBlob emotion backends
+
+Usage: python benchmarks/bench_emotion.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion import EmotionDetector
+
+MESSAGES = [
+    "Who is Prof. Santos?",
+    "What's Dr. Reyes' schedule?",
+    "thank you so much, that was really helpful!",
+    "I'm so tired and stressed about exams",
+    "I don't understand where my class is",
+    "this is awesome, you are amazing",
+    "I hate this, everything is terrible",
+    "please help me find CS301 asap",
+    "not good, I'm confused",
+    "Where is the office of Prof. Dela Cruz?",
+    "I love you bot",
+    "meh, so boring",
+]
+
+
+def time_backend(detector, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in MESSAGES:
+            detector.analyze_sentiment(message)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    lexicon = EmotionDetector('lexicon')
+    textblob = EmotionDetector('textblob')
+
+    # Warm both paths (regex compilation, TextBlob's lazy lexicon load)
+    time_backend(lexicon, 1)
+    time_backend(textblob, 1)
+
+    lexicon_us = time_backend(lexicon, args.iterations)
+    textblob_us = time_backend(textblob, args.iterations)
+
+    agree = sum(
+        lexicon.analyze_sentiment(message)['emotion'] == textblob.analyze_sentiment(message)['emotion']
+        for message in MESSAGES
+    )
+
+    print(f"lexicon:  {lexicon_us:8.1f} µs/message")
+    print(f"textblob: {textblob_us:8.1f} µs/message")
+    print(f"speedup:  {textblob_us / lexicon_us:8.1f}x")
+    print(f"emotion labels agree on {agree}/{len(MESSAGES)} messages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Microbenchmarks for ChatbotEngineEnhanced over synthetic catalogs
+
+Times load_data, detect_intent, analyze_sentiment, find_professor,
+find_by_subject and process_message at each catalog size and writes the
+results as JSON. Pass --compare with an earlier results file to flag
+operations that got slower than --tolerance allows (exit status 1).
+
+Usage: python benchmarks/bench_engine.py [--sizes 1000,10000,100000] [--output FILE]
+                                         [--compare FILE] [--tolerance 1.25]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from response_cache import ResponseCache
+from synthetic_catalog import SyntheticDatabase, generate_catalog, professor_names, query_corpus, subject_rows
+
+
+def summarize(samples):
+    """Per-call timings in microseconds"""
+    ordered = sorted(samples)
+    return {
+        'calls': len(ordered),
+        'mean_us': round(statistics.fmean(ordered) * 1e6, 2),
+        'p50_us': round(ordered[len(ordered) // 2] * 1e6, 2),
+        'p95_us': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6, 2),
+        'max_us': round(ordered[-1] * 1e6, 2)
+    }
+
+
+def time_calls(function, inputs, rounds):
+    """Time function on every input, rounds times over, after one warm-up pass"""
+    for value in inputs:
+        function(value)
+
+    samples = []
+    for _ in range(rounds):
+        for value in inputs:
+            start = time.perf_counter()
+            function(value)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_size(schedules, rounds, load_runs, seed):
+    rows, attachments = generate_catalog(schedules=schedules, seed=seed)
+
+    chatbot = ChatbotEngineEnhanced(autoload=False)
+    chatbot.db = SyntheticDatabase(rows, attachments)
+    # Measure the full answer path; cached replies are timed separately
+    chatbot.response_cache = ResponseCache(max_entries=0)
+
+    load_samples = []
+    for _ in range(load_runs):
+        start = time.perf_counter()
+        chatbot.load_data(force=True)
+        load_samples.append(time.perf_counter() - start)
+
+    corpus = query_corpus(rows, seed=seed)
+    names = professor_names(rows)[:100]
+    subjects = [row['subject_name'] for row in subject_rows(rows)[:50]]
+    subjects += [row['subject_code'] for row in subject_rows(rows)[:50]]
+
+    operations = {
+        'detect_intent': time_calls(chatbot.detect_intent, corpus, rounds),
+        'analyze_sentiment': time_calls(chatbot.emotion_detector.analyze_sentiment, corpus, rounds),
+        'find_professor': time_calls(chatbot.find_professor, names, rounds),
+        'find_by_subject': time_calls(chatbot.find_by_subject, subjects, rounds),
+        'process_message': time_calls(chatbot.process_message, corpus, rounds)
+    }
+
+    chatbot.response_cache = ResponseCache(max_entries=len(corpus) * 2)
+    operations['process_message_cached'] = time_calls(chatbot.process_message, corpus, rounds)
+
+    snapshot = chatbot.snapshot
+    return {
+        'catalog': {
+            'rows': len(rows),
+            'professors': len(snapshot.professors),
+            'subjects': len(snapshot.subject_index),
+            'schedules': schedules,
+            'attachments': snapshot.attachment_count
+        },
+        'load_data': summarize(load_samples),
+        'operations': operations
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against baseline; returns the regressed operations"""
+    regressions = []
+    for size, current in results['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size)
+        if previous is None:
+            continue
+
+        pairs = [('load_data', current['load_data'], previous['load_data'])]
+        pairs += [(name, timing, previous['operations'].get(name))
+                  for name, timing in current['operations'].items()]
+
+        for name, timing, before in pairs:
+            if not before:
+                continue
+            ratio = timing['p50_us'] / before['p50_us'] if before['p50_us'] else 1.0
+            flag = ''
+            if ratio > tolerance:
+                flag = '  <-- regression'
+                regressions.append(f"{size}/{name}")
+            print(f"{size:>8} {name:24s} {before['p50_us']:12.1f} -> {timing['p50_us']:12.1f} µs  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma separated schedule counts')
+    parser.add_argument('--rounds', type=int, default=3, help='passes over the query corpus per operation')
+    parser.add_argument('--load-runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'engine.json'))
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown ratio counted as a regression')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'fuzzy_backend': os.getenv('FUZZY_BACKEND', 'auto'),
+            'emotion_backend': os.getenv('EMOTION_BACKEND', 'lexicon')
+        },
+        'sizes': {}
+    }
+
+    for schedules in [int(size) for size in args.sizes.split(',')]:
+        print(f"⏱️ Benchmarking {schedules} schedules...")
+        result = bench_size(schedules, args.rounds, args.load_runs, args.seed)
+        results['sizes'][str(schedules)] = result
+
+        print(f"   load_data          {result['load_data']['p50_us'] / 1000:10.1f} ms")
+        for name, timing in result['operations'].items():
+            print(f"   {name:24s} p50 {timing['p50_us']:10.1f} µs  p95 {timing['p95_us']:10.1f} µs")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"📊 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions beyond x{args.tolerance}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Compare the rapidfuzz and fuzzywuzzy professor name matching backends
+
+Usage: python benchmarks/bench_fuzzy.py [--professors N] [--queries N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzywuzzy import fuzz, process
+from indexes import ProfessorNameIndex, strip_titles
+from models import Professor
+
+FIRST_NAMES = ['Maria', 'Juan', 'Anna', 'Pedro', 'Linda', 'Jose', 'Carlo', 'Ramon', 'Liza', 'Grace',
+               'Mark', 'Paolo', 'Rosa', 'Ella', 'Noel', 'Joy', 'Ramil', 'Aileen', 'Dante', 'Celia']
+LAST_NAMES = ['Santos', 'Dela Cruz', 'Reyes', 'Garcia', 'Tan', 'Bautista', 'Mendoza', 'Villanueva',
+              'Ramos', 'Aquino', 'Castillo', 'Flores', 'Navarro', 'Torres', 'Lim', 'Gonzales']
+TITLES = ['Dr.', 'Prof.', '']
+
+
+def make_professors(count, rng):
+    professors = []
+    for prof_id in range(1, count + 1):
+        name = f"{rng.choice(TITLES)} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}".strip()
+        professors.append(Professor(prof_id, name))
+    return professors
+
+
+def make_queries(professors, count, rng):
+    queries = []
+    for _ in range(count):
+        name = rng.choice(professors).name.lower()
+        if rng.random() < 0.3:
+            # Drop a letter to simulate a typo
+            cut = rng.randrange(len(name))
+            name = name[:cut] + name[cut + 1:]
+        queries.append(f"who is {name}" if rng.random() < 0.5 else name)
+    return queries
+
+
+def reference(professors, query):
+    """The original full-scan extractOne over title-stripped names"""
+    names = {prof.id: strip_titles(prof.name) for prof in professors}
+    match = process.extractOne(strip_titles(query), names, scorer=fuzz.token_sort_ratio, score_cutoff=60)
+    return match[2] if match else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--professors', type=int, default=3000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    professors = make_professors(args.professors, rng)
+    queries = make_queries(professors, args.queries, rng)
+
+    indexes = {}
+    for backend in ('rapidfuzz', 'fuzzywuzzy'):
+        os.environ['FUZZY_BACKEND'] = backend
+        indexes[backend] = ProfessorNameIndex(professors)
+        if indexes[backend].backend != backend:
+            print(f"{backend}: not installed, skipped")
+            del indexes[backend]
+
+    for backend, index in indexes.items():
+        index.find(queries[0])
+
+        start = time.perf_counter()
+        single = [index.find(query) for query in queries]
+        single_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        start = time.perf_counter()
+        batch = index.find_many(queries)
+        batch_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        sample = queries[:100]
+        agree = sum(
+            (match.id if match else None) == reference(professors, query)
+            for query, match in zip(sample, single)
+        )
+
+        assert [p and p.id for p in single] == [p and p.id for p in batch]
+        print(f"{backend:10s} single: {single_us:8.1f} µs/query  batch: {batch_us:8.1f} µs/query  "
+              f"matches full-scan reference on {agree}/{len(sample)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Measure worker startup: time until /health answers and until /ready reports ready
+
+Starts app.py in a fresh interpreter for each run, so module imports and the
+warm-up (catalog load) are measured exactly as a new worker pays for them.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--port PORT]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = "import app; app.app.run(host='127.0.0.1', port={port}, debug=False, use_reloader=False)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def poll(url: str, deadline: float):
+    """Poll url until it answers 200; returns the decoded body"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.005)
+    raise TimeoutError(f"{url} did not answer in time")
+
+
+def measure(port: int, timeout: float):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-c', SERVER.format(port=port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        poll(f"http://127.0.0.1:{port}/health", deadline)
+        live = time.perf_counter() - started
+
+        status = poll(f"http://127.0.0.1:{port}/ready", deadline)
+        ready = time.perf_counter() - started
+        return live, ready, status['warmup']
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=0, help='defaults to a free port')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    for run in range(1, args.runs + 1):
+        live, ready, warmup = measure(args.port or free_port(), args.timeout)
+        note = f" (warm-up error: {warmup['error']})" if warmup.get('error') else ""
+        print(f"run {run}: /health after {live * 1000:7.1f} ms, ready after {ready * 1000:7.1f} ms{note}")
+
+
+if __name__ == '__main__':
+    main()
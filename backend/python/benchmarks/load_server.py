@@ -0,0 +1,111 @@
+"""Serve app.py against a synthetic stand-in database for load tests
+
+Usage: python benchmarks/load_server.py [--port 5055] [--schedules 10000] [--db-latency-ms 2]
+
+Every DatabaseConnection call is answered from a generated catalog, after
+sleeping --db-latency-ms to stand in for the network round trip. /chat
+answers from the in-memory catalog snapshot and makes no database calls,
+so that latency only shows up in loads and /reload-data. Each response
+carries X-Server-CPU-Ms (CPU time of the request thread), and
+GET /__load/stats returns process CPU and database totals.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import database
+from synthetic_catalog import SyntheticDatabase, generate_catalog
+
+# Calls the harness times; everything else passes straight through
+TIMED_CALLS = ('iter_all_data', 'fetch_all_data', 'fetch_all_attachments', 'fetch_attachments',
+               'fetch_server_time', 'fetch_catalog_ids', 'fetch_changed_professor_ids')
+
+
+class TimedDatabase(SyntheticDatabase):
+    """SyntheticDatabase that simulates latency and totals the time spent in calls"""
+
+    def __init__(self, rows, attachments, latency: float = 0.0):
+        super().__init__(rows, attachments)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.totals = {'calls': 0, 'seconds': 0.0}
+
+        for name in TIMED_CALLS:
+            setattr(self, name, self.timed(getattr(self, name)))
+
+    def timed(self, method):
+        @wraps(method)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            if self.latency:
+                time.sleep(self.latency)
+            result = method(*args, **kwargs)
+            # Streams are consumed by the caller; materialize them inside the timing
+            if not isinstance(result, (list, set, dict)) and hasattr(result, '__next__'):
+                result = iter(list(result))
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                self.totals['calls'] += 1
+                self.totals['seconds'] += elapsed
+            return result
+        return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--schedules', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    rows, attachments = generate_catalog(schedules=args.schedules, seed=args.seed)
+    stand_in = TimedDatabase(rows, attachments, latency=args.db_latency_ms / 1000)
+
+    # The engine builds its connection at import time; hand it the stand-in instead
+    database.DatabaseConnection = lambda: stand_in
+
+    from flask import g, jsonify
+    from werkzeug.serving import make_server
+    from app import app, chatbot
+
+    @app.before_request
+    def start_timers():
+        g.cpu_start = time.thread_time()
+
+    @app.after_request
+    def report_timers(response):
+        if 'cpu_start' in g:
+            response.headers['X-Server-CPU-Ms'] = f"{(time.thread_time() - g.cpu_start) * 1000:.3f}"
+        return response
+
+    @app.route('/__load/stats', methods=['GET'])
+    def load_stats():
+        with stand_in.lock:
+            totals = dict(stand_in.totals)
+        return jsonify({
+            'process_cpu_seconds': time.process_time(),
+            'db_calls': totals['calls'],
+            'db_seconds': totals['seconds'],
+            'ready': chatbot.ready.is_set(),
+            'professors': len(chatbot.professors_data),
+            'schedules': args.schedules
+        })
+
+    chatbot.wait_until_ready()
+    server = make_server(args.host, args.port, app, threaded=True)
+    print(f"🚀 Load test server on http://{args.host}:{args.port} "
+          f"({len(chatbot.professors_data)} professors, {args.schedules} schedules)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+"""Load test and traffic replay for the /chat endpoint
+
+Starts benchmarks/load_server.py (app.py on a synthetic stand-in database)
+unless --url points at a running server, replays a message log and reports
+throughput, latency percentiles, a latency histogram, errors per intent,
+server CPU per reply and the database time spent by reloads. /chat makes no
+database calls, so --db-latency-ms only affects loads and --reload-every.
+
+Closed loop: --concurrency clients each send their next message as soon as
+the previous reply arrives. Open loop: messages arrive at a fixed --rate
+whether or not earlier ones have been answered, and latency is measured from
+the scheduled arrival, so a backed-up server shows up as queueing delay.
+
+Usage: python benchmarks/load_test.py [--mode closed|open] [--concurrency 8] [--rate 200]
+                                      [--duration 20] [--log FILE] [--schedules 10000]
+                                      [--db-latency-ms 2] [--reload-every 5] [--output FILE]
+
+--log takes a JSON-lines file of {"message": ..., "session_id": ...} objects
+or plain text with one message per line; without it a synthetic corpus is used.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from synthetic_catalog import generate_catalog, query_corpus
+
+# Upper edges of the latency histogram buckets, in milliseconds
+HISTOGRAM_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def load_log(path):
+    """(message, session_id) pairs from a JSON-lines or plain text log"""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                entries.append((record['message'], record.get('session_id', 'default')))
+            else:
+                entries.append((line, 'default'))
+    return entries
+
+
+def start_server(args):
+    """Run load_server.py in a child process and wait until it serves"""
+    port = free_port()
+    command = [sys.executable, os.path.join(BENCH_DIR, 'load_server.py'), '--port', str(port),
+               '--schedules', str(args.schedules), '--seed', str(args.seed),
+               '--db-latency-ms', str(args.db_latency_ms)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+    for line in process.stdout:
+        if line.startswith('🚀'):
+            print(line.rstrip())
+            break
+    else:
+        raise RuntimeError(f"Load test server exited with status {process.wait()}")
+
+    # Keep draining its output so the child never blocks on a full pipe
+    threading.Thread(target=lambda: [None for _ in process.stdout], daemon=True).start()
+    return process, f"http://127.0.0.1:{port}"
+
+
+def fetch_stats(url):
+    try:
+        with urllib.request.urlopen(f"{url}/__load/stats", timeout=10) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+
+class Client:
+    """One keep-alive connection posting chat messages"""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def post(self, message, session_id, path='/chat'):
+        """(status, body, server headers); reconnects once on a dropped connection"""
+        body = json.dumps({'message': message, 'session_id': session_id})
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request('POST', path, body, {'Content-Type': 'application/json'})
+                response = self.connection.getresponse()
+                payload = response.read()
+                if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                    self.close()
+                return response.status, payload, response
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Recorder:
+    """Thread-safe collection of per-request samples"""
+
+    def __init__(self, intent_of):
+        self.intent_of = intent_of
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def send(self, client, message, session_id, scheduled=None, path='/chat'):
+        start = time.perf_counter()
+        sample = {'latency': None, 'intent': None, 'error': None, 'cpu_ms': None}
+        try:
+            status, payload, response = client.post(message, session_id, path)
+            sample['cpu_ms'] = float(response.getheader('X-Server-CPU-Ms') or 'nan')
+            if status == 200:
+                sample['intent'] = json.loads(payload).get('intent', 'reload')
+            else:
+                sample['error'] = f"HTTP {status}"
+        except Exception as e:
+            sample['error'] = type(e).__name__
+
+        # Open loop measures from the scheduled arrival, not from when a thread got to it
+        sample['latency'] = time.perf_counter() - (scheduled if scheduled is not None else start)
+        if sample['intent'] is None:
+            sample['intent'] = self.intent_of(message)
+        with self.lock:
+            self.samples.append(sample)
+
+
+def run_closed(args, url, messages, recorder):
+    cursor = itertools.count()
+    deadline = time.perf_counter() + args.duration
+
+    def worker():
+        client = Client(url, args.timeout)
+        while time.perf_counter() < deadline:
+            index = next(cursor)
+            if args.requests and index >= args.requests:
+                break
+            message, session_id = messages[index % len(messages)]
+            recorder.send(client, message, session_id)
+        client.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open(args, url, messages, recorder):
+    local = threading.local()
+    total = args.requests or int(args.rate * args.duration)
+    interval = 1.0 / args.rate
+
+    def send(message, session_id, scheduled):
+        if not hasattr(local, 'client'):
+            local.client = Client(url, args.timeout)
+        recorder.send(local.client, message, session_id, scheduled)
+
+    with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+        start = time.perf_counter()
+        for index in range(total):
+            scheduled = start + index * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            message, session_id = messages[index % len(messages)]
+            pool.submit(send, message, session_id, scheduled)
+
+
+def run_reloads(args, url, recorder, stop):
+    """POST /reload-data every --reload-every seconds until stop is set"""
+    client = Client(url, args.timeout)
+    while not stop.wait(args.reload_every):
+        recorder.send(client, '', 'default', path='/reload-data')
+    client.close()
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3) if ordered else None,
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3) if ordered else None,
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3) if ordered else None,
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else None
+    }
+
+
+def mean(values):
+    values = [value for value in values if value is not None and value == value]
+    return round(sum(values) / len(values), 3) if values else None
+
+
+def histogram(latencies):
+    counts = [0] * (len(HISTOGRAM_MS) + 1)
+    for latency in latencies:
+        ms = latency * 1000
+        bucket = next((i for i, edge in enumerate(HISTOGRAM_MS) if ms <= edge), len(HISTOGRAM_MS))
+        counts[bucket] += 1
+    labels = [f"<={edge}ms" for edge in HISTOGRAM_MS] + [f">{HISTOGRAM_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def build_report(args, samples, elapsed, stats_before, stats_after):
+    ok = [sample for sample in samples if not sample['error']]
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'mode': args.mode,
+            'concurrency': args.concurrency if args.mode == 'closed' else None,
+            'rate': args.rate if args.mode == 'open' else None,
+            'schedules': args.schedules,
+            'db_latency_ms': args.db_latency_ms,
+            'log': args.log
+        },
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else None,
+        'latency': latency_summary([sample['latency'] for sample in ok]),
+        'histogram': histogram([sample['latency'] for sample in ok]),
+        'server_time': {
+            'cpu_ms_mean': mean([sample['cpu_ms'] for sample in ok])
+        },
+        'intents': {}
+    }
+
+    if stats_before and stats_after:
+        report['server_time']['process_cpu_seconds'] = round(
+            stats_after['process_cpu_seconds'] - stats_before['process_cpu_seconds'], 3)
+        report['server_time']['db_seconds'] = round(stats_after['db_seconds'] - stats_before['db_seconds'], 3)
+        report['server_time']['db_calls'] = stats_after['db_calls'] - stats_before['db_calls']
+        # Includes the HTTP server's own parsing and threading, which the per-request timers miss
+        if samples:
+            report['server_time']['process_cpu_ms_per_request'] = round(
+                report['server_time']['process_cpu_seconds'] * 1000 / len(samples), 3)
+
+    by_intent = {}
+    for sample in samples:
+        by_intent.setdefault(sample['intent'] or 'unknown', []).append(sample)
+
+    for intent, group in sorted(by_intent.items()):
+        successes = [sample for sample in group if not sample['error']]
+        errors = {}
+        for sample in group:
+            if sample['error']:
+                errors[sample['error']] = errors.get(sample['error'], 0) + 1
+        report['intents'][intent] = {
+            'requests': len(group),
+            'error_rate': round((len(group) - len(successes)) / len(group), 4),
+            'errors': errors,
+            'latency': latency_summary([sample['latency'] for sample in successes]),
+            'cpu_ms_mean': mean([sample['cpu_ms'] for sample in successes])
+        }
+    return report
+
+
+def print_report(report):
+    latency = report['latency']
+    print(f"\n📊 {report['requests']} requests in {report['elapsed_seconds']}s, "
+          f"{report['throughput_rps']} req/s, {report['errors']} errors")
+    print(f"   latency p50 {latency['p50_ms']} ms  p95 {latency['p95_ms']} ms  "
+          f"p99 {latency['p99_ms']} ms  max {latency['max_ms']} ms")
+
+    server = report['server_time']
+    print(f"   server CPU per request: {server['cpu_ms_mean']} ms")
+    if 'process_cpu_seconds' in server:
+        # Only loads and reloads reach the database; /chat answers from memory
+        print(f"   server process: {server['process_cpu_seconds']} s CPU "
+              f"({server.get('process_cpu_ms_per_request')} ms/request), "
+              f"{server['db_seconds']} s in {server['db_calls']} DB calls by reloads")
+
+    peak = max(report['histogram'].values()) or 1
+    print("\n   latency histogram")
+    for label, count in report['histogram'].items():
+        if count:
+            print(f"   {label:>9} {count:7d} {'█' * max(1, count * 40 // peak)}")
+
+    print(f"\n   {'intent':18s} {'reqs':>6s} {'err%':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+          f"{'cpu ms':>8s}")
+    for intent, row in report['intents'].items():
+        timing = row['latency']
+        print(f"   {intent:18s} {row['requests']:6d} {row['error_rate'] * 100:6.2f} "
+              f"{timing['p50_ms'] or 0:9.2f} {timing['p95_ms'] or 0:9.2f} {timing['p99_ms'] or 0:9.2f} "
+              f"{row['cpu_ms_mean'] or 0:8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='target a running server instead of starting load_server.py')
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed')
+    parser.add_argument('--concurrency', type=int, default=8, help='closed loop clients')
+    parser.add_argument('--rate', type=float, default=200.0, help='open loop arrivals per second')
+    parser.add_argument('--max-inflight', type=int, default=256, help='open loop client threads')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='stop after this many requests')
+    parser.add_argument('--warmup', type=int, default=50, help='requests sent before measuring')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--log', help='message log to replay')
+    parser.add_argument('--schedules', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    parser.add_argument('--reload-every', type=float, default=0.0,
+                        help='also POST /reload-data this often (seconds), reported as the reload intent')
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    if args.log:
+        messages = load_log(args.log)
+    else:
+        rows, _ = generate_catalog(schedules=args.schedules, seed=args.seed)
+        messages = [(message, 'default') for message in query_corpus(rows, count=1000, seed=args.seed)]
+
+    # Failed requests have no reply to read the intent from; classify them locally
+    from chatbot_engine_enhanced import ChatbotEngineEnhanced
+    classifier = ChatbotEngineEnhanced(autoload=False)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args)
+
+    try:
+        warmup = Client(url, args.timeout)
+        for message, session_id in messages[:args.warmup]:
+            warmup.post(message, session_id)
+        warmup.close()
+
+        recorder = Recorder(lambda message: classifier.detect_intent(message) if message else 'reload')
+        stop = threading.Event()
+        reloads = threading.Thread(target=run_reloads, args=(args, url, recorder, stop))
+        if args.reload_every > 0:
+            reloads.start()
+
+        stats_before = fetch_stats(url)
+        start = time.perf_counter()
+        if args.mode == 'closed':
+            run_closed(args, url, messages, recorder)
+        else:
+            run_open(args, url, messages, recorder)
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        if reloads.is_alive():
+            reloads.join()
+        stats_after = fetch_stats(url)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = build_report(args, recorder.samples, elapsed, stats_before, stats_after)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📊 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""Synthetic catalogs shaped like DatabaseConnection.fetch_all_data() rows
+
+    from synthetic_catalog import SyntheticDatabase, generate_catalog
+    rows, attachments = generate_catalog(schedules=10000)
+    chatbot.db = SyntheticDatabase(rows, attachments)
+
+The generator is seeded, so the same size and seed always produce the same
+catalog. SyntheticDatabase answers the DatabaseConnection calls the engine
+makes while loading and reloading, so load_data() runs without MySQL.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+FIRST_NAMES = ['Maria', 'Juan', 'Anna', 'Pedro', 'Linda', 'Jose', 'Carlo', 'Ramon', 'Liza', 'Grace',
+               'Mark', 'Paolo', 'Rosa', 'Ella', 'Noel', 'Joy', 'Ramil', 'Aileen', 'Dante', 'Celia',
+               'Miguel', 'Teresa', 'Andres', 'Carmela', 'Rafael', 'Isabel', 'Emilio', 'Lourdes']
+LAST_NAMES = ['Santos', 'Dela Cruz', 'Reyes', 'Garcia', 'Tan', 'Bautista', 'Mendoza', 'Villanueva',
+              'Ramos', 'Aquino', 'Castillo', 'Flores', 'Navarro', 'Torres', 'Lim', 'Gonzales',
+              'Fernandez', 'Rivera', 'Domingo', 'Salazar', 'Pascual', 'Soriano', 'Manalo', 'Ocampo']
+TITLES = ['Dr.', 'Prof.', '']
+
+# Department, building and subject code prefix
+DEPARTMENTS = [
+    ('Computer Science', 'Science Building', 'CS'),
+    ('Information Technology', 'IT Building', 'IT'),
+    ('Mathematics', 'Math Building', 'MATH'),
+    ('Physics', 'Science Building', 'PHYS'),
+    ('English', 'Humanities Building', 'ENG')
+]
+
+TOPICS = {
+    'CS': ['Programming', 'Data Structures', 'Algorithms', 'Database Systems', 'Machine Learning',
+           'Web Development', 'Operating Systems', 'Computer Networks', 'Software Engineering', 'Compilers'],
+    'IT': ['Network Security', 'Systems Administration', 'Cloud Computing', 'Information Management',
+           'Mobile Development', 'IT Project Management'],
+    'MATH': ['Calculus', 'Linear Algebra', 'Discrete Mathematics', 'Statistics', 'Differential Equations',
+             'Number Theory'],
+    'PHYS': ['Mechanics', 'Electromagnetism', 'Thermodynamics', 'Quantum Physics', 'Optics'],
+    'ENG': ['Technical Writing', 'Literature', 'Speech Communication', 'Academic Writing']
+}
+LEVELS = ['Introduction to', 'Fundamentals of', 'Advanced', 'Topics in', 'Applied']
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+ROOMS_PER_BUILDING = 40
+
+
+def generate_catalog(schedules: int = 1000, subjects_per_professor: int = 3, schedules_per_subject: int = 3,
+                     attachment_ratio: float = 0.2, seed: int = 7) -> Tuple[List[Dict], List[Dict]]:
+    """(catalog rows, attachment rows) for a catalog with the given number of schedules
+
+    Rows are ordered like the catalog query (professor name, subject code,
+    day, start time). About one professor in twenty has no subjects, so the
+    LEFT JOIN's all-NULL rows are exercised too.
+    """
+    rng = random.Random(seed)
+    per_professor = subjects_per_professor * schedules_per_subject
+    professor_count = max(1, -(-schedules // per_professor))
+
+    rows = []
+    attachments = []
+    subject_id = schedule_id = 0
+    remaining = schedules
+
+    for prof_id in range(1, professor_count + 1):
+        department, building, prefix = rng.choice(DEPARTMENTS)
+        name = f"{rng.choice(TITLES)} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}".strip()
+        handle = name.replace('Dr. ', '').replace('Prof. ', '').lower().replace(' ', '.')
+        professor = {
+            'professor_id': prof_id,
+            'professor_name': name,
+            'department': department,
+            'contact': f"0917{rng.randrange(10 ** 7):07d}",
+            'email': f"{handle}{prof_id}@university.edu",
+            'office_location': f"Room {rng.randrange(100, 500)}, {building}",
+            'bio': f"Faculty of {department}",
+            'image_url': None
+        }
+
+        if remaining <= 0 or rng.random() < 0.05:
+            rows.append(dict(professor, **empty_subject(), **empty_schedule()))
+            continue
+
+        professor_rows = []
+        for _ in range(subjects_per_professor):
+            if remaining <= 0:
+                break
+            subject_id += 1
+            topic = rng.choice(TOPICS[prefix])
+            subject = {
+                'subject_id': subject_id,
+                'subject_code': f"{prefix}{rng.randrange(100, 500)}",
+                'subject_name': f"{rng.choice(LEVELS)} {topic}",
+                'subject_description': f"Course on {topic.lower()}",
+                'units': rng.choice([2, 3, 4])
+            }
+
+            for _ in range(min(schedules_per_subject, remaining)):
+                schedule_id += 1
+                remaining -= 1
+                start = rng.randrange(7, 19)
+                professor_rows.append(dict(professor, **subject, **{
+                    'schedule_id': schedule_id,
+                    'classroom': f"Room {rng.randrange(1, 6)}{rng.randrange(ROOMS_PER_BUILDING):02d}",
+                    'day': rng.choice(DAYS),
+                    # mysql-connector returns TIME columns as timedelta
+                    'time_start': timedelta(hours=start),
+                    'time_end': timedelta(hours=start + rng.choice([1, 1.5, 2, 3])),
+                    'semester': '1st Semester',
+                    'academic_year': '2024-2025',
+                    'section': rng.choice('ABCD'),
+                    'schedule_description': None
+                }))
+
+                if rng.random() < attachment_ratio:
+                    attachments.append({
+                        'id': len(attachments) + 1,
+                        'professor_id': prof_id,
+                        'file_name': f"{subject['subject_code']}-syllabus-{schedule_id}.pdf",
+                        'file_path': f"uploads/attachments/{schedule_id}.pdf",
+                        'file_type': 'pdf',
+                        'description': None,
+                        'schedule_id': schedule_id,
+                        'subject_name': subject['subject_name'],
+                        'subject_code': subject['subject_code']
+                    })
+
+        professor_rows.sort(key=lambda row: (row['subject_code'], DAYS.index(row['day']), row['time_start']))
+        rows.extend(professor_rows)
+
+    rows.sort(key=lambda row: row['professor_name'])
+    return rows, attachments
+
+
+def empty_subject() -> Dict:
+    return {'subject_id': None, 'subject_code': None, 'subject_name': None,
+            'subject_description': None, 'units': None}
+
+
+def empty_schedule() -> Dict:
+    return {'schedule_id': None, 'classroom': None, 'day': None, 'time_start': None, 'time_end': None,
+            'semester': None, 'academic_year': None, 'section': None, 'schedule_description': None}
+
+
+class SyntheticDatabase:
+    """In-memory stand-in for DatabaseConnection serving a generated catalog"""
+
+    def __init__(self, rows: List[Dict], attachments: Optional[List[Dict]] = None):
+        self.rows = rows
+        self.attachments = attachments or []
+        self.changed = set()
+
+    def iter_all_data(self, professor_ids=None, batch_size: int = 1000):
+        if professor_ids is None:
+            return iter(self.rows)
+        return (row for row in self.rows if row['professor_id'] in professor_ids)
+
+    def fetch_all_data(self, professor_ids=None):
+        return list(self.iter_all_data(professor_ids))
+
+    def fetch_all_attachments(self):
+        return list(self.attachments)
+
+    def fetch_attachments(self, professor_id=None, schedule_id=None):
+        return [
+            attachment for attachment in self.attachments
+            if (professor_id and attachment['professor_id'] == professor_id)
+            or (schedule_id and attachment['schedule_id'] == schedule_id)
+        ]
+
+    def fetch_server_time(self):
+        return datetime.now()
+
+    def fetch_catalog_ids(self):
+        return {
+            'professors': {row['professor_id'] for row in self.rows},
+            'subjects': {row['subject_id']: row['professor_id'] for row in self.rows if row['subject_id']},
+            'subject_fields': {
+                row['subject_id']: (row['subject_code'], row['subject_name'], row['subject_description'], row['units'])
+                for row in self.rows if row['subject_id']
+            },
+            'schedules': {row['schedule_id']: row['professor_id'] for row in self.rows if row['schedule_id']}
+        }
+
+    def fetch_changed_professor_ids(self, since):
+        return set(self.changed)
+
+    def pool_stats(self) -> Dict:
+        return {'enabled': False, 'synthetic': True}
+
+
+def professor_names(rows: List[Dict]) -> List[str]:
+    """Distinct professor names in catalog order"""
+    return list(dict.fromkeys(row['professor_name'] for row in rows))
+
+
+def subject_rows(rows: List[Dict]) -> List[Dict]:
+    """One row per subject"""
+    return list({row['subject_id']: row for row in rows if row['subject_id']}.values())
+
+
+def query_corpus(rows: List[Dict], count: int = 200, seed: int = 11) -> List[str]:
+    """Chat messages covering every intent, naming professors and subjects of the catalog"""
+    rng = random.Random(seed)
+    names = professor_names(rows)
+    subjects = subject_rows(rows)
+
+    templates = [
+        lambda: f"Who is {rng.choice(names)}?",
+        lambda: f"What is {rng.choice(names)}'s schedule?",
+        lambda: f"Where is the office of {rng.choice(names)}?",
+        lambda: f"How can I contact {rng.choice(names).split()[-1]}?",
+        lambda: f"Show me files from {rng.choice(names)}",
+        lambda: f"Who teaches {rng.choice(subjects)['subject_name']}?",
+        lambda: f"Who handles {rng.choice(subjects)['subject_code']}?",
+        lambda: f"Find prof {rng.choice(names).split()[-1]}",
+        lambda: "Who is teaching right now?",
+        lambda: f"Free professors {rng.choice(DAYS)} {rng.randrange(1, 5)}-{rng.randrange(5, 7)}pm",
+        lambda: f"What's in Room {rng.randrange(1, 6)}{rng.randrange(ROOMS_PER_BUILDING):02d} at 10am?",
+        lambda: rng.choice(['Hello!', 'hi there', 'good morning']),
+        lambda: rng.choice(['thank you so much', 'thanks!', 'bye, see you']),
+        lambda: rng.choice(["I'm so stressed about exams", 'I am tired', "I'm confused where my class is"]),
+        lambda: rng.choice(['tell me a joke', 'what can you do?', 'help'])
+    ]
+    if not names:
+        templates = templates[-4:]
+    elif not subjects:
+        templates = templates[:5] + templates[7:]
+
+    return [rng.choice(templates)() for _ in range(count)]
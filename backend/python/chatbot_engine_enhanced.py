@@ -1,96 +1,64 @@
-from fuzzywuzzy import fuzz, process
-import re
+import asyncio
+from async_database import AsyncDatabaseConnection
+from contextlib import contextmanager
 from datetime import datetime
-from database import DatabaseConnection
-from textblob import TextBlob
+from database import CatalogFetchError, DatabaseConnection
+from emotion import EmotionDetector
+from intent_matcher import IntentMatcher
+from lazy_imports import LazyModule
+from metrics import RELOAD_SECONDS, StageTimer, metrics_enabled, observe_request
+from models import Professor, ProfessorBuilder, build_professors, serialize_subject_results
+from preprocessing import NormalizedMessage
+from response_cache import ResponseCache
+from schedule_index import clock, parse_schedule_query, room_key
+from session_store import create_session_backend, references
+from snapshot import CatalogSnapshot, SnapshotRejected
+from snapshot_store import SnapshotFileStore
 import os
-from typing import Dict, List, Optional
-import openai
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
 
-class EmotionDetector:
-    """Detect emotions and sentiment from user messages"""
-    
-    @staticmethod
-    def analyze_sentiment(text: str) -> Dict:
-        """Analyze sentiment and emotion of text"""
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity  # -1 to 1
-        subjectivity = blob.sentiment.subjectivity  # 0 to 1
-        
-        # Determine emotion
-        if polarity > 0.5:
-            emotion = "very_happy"
-            emoji = "😊"
-        elif polarity > 0.1:
-            emotion = "happy"
-            emoji = "🙂"
-        elif polarity < -0.5:
-            emotion = "very_sad"
-            emoji = "😢"
-        elif polarity < -0.1:
-            emotion = "sad"
-            emoji = "😕"
-        else:
-            emotion = "neutral"
-            emoji = "😐"
-        
-        # Check for specific emotions
-        text_lower = text.lower()
-        if any(word in text_lower for word in ['love', 'loving', 'adore', 'i love you']):
-            emotion = "loving"
-            emoji = "💕"
-        elif any(word in text_lower for word in ['thanks', 'thank you', 'appreciate', 'grateful', 'tysm', 'thx']):
-            emotion = "grateful"
-            emoji = "🙏"
-        elif any(word in text_lower for word in ['sad', 'depressed', 'upset', 'crying', 'unhappy', 'miserable']):
-            emotion = "sad"
-            emoji = "😢"
-        elif any(word in text_lower for word in ['angry', 'mad', 'furious', 'annoyed', 'irritated', 'pissed']):
-            emotion = "angry"
-            emoji = "😠"
-        elif any(word in text_lower for word in ['tired', 'exhausted', 'sleepy', 'fatigue', 'burned out', 'drained']):
-            emotion = "tired"
-            emoji = "😴"
-        elif any(word in text_lower for word in ['stressed', 'stressed out', 'anxious', 'worried', 'nervous', 'overwhelmed']):
-            emotion = "stressed"
-            emoji = "😰"
-        elif any(word in text_lower for word in ['bored', 'boring', 'dull', 'meh']):
-            emotion = "bored"
-            emoji = "😑"
-        elif any(word in text_lower for word in ['excited', 'awesome', 'amazing', 'fantastic', 'wonderful', 'yay', 'woohoo']):
-            emotion = "excited"
-            emoji = "🤩"
-        elif any(word in text_lower for word in ['happy', 'glad', 'joyful', 'cheerful', 'delighted', 'pleased']):
-            emotion = "happy"
-            emoji = "😊"
-        elif any(word in text_lower for word in ['confused', 'lost', "don't understand", 'unclear', 'puzzled']):
-            emotion = "confused"
-            emoji = "😕"
-        elif any(word in text_lower for word in ['help', 'please', 'need', 'urgent', 'asap']):
-            emotion = "needy"
-            emoji = "🆘"
-        elif any(word in text_lower for word in ['great', 'good', 'fine', 'okay', 'alright']):
-            emotion = "content"
-            emoji = "🙂"
-        
-        return {
-            'polarity': polarity,
-            'subjectivity': subjectivity,
-            'emotion': emotion,
-            'emoji': emoji
-        }
+# Only imported when an OpenAI key is configured
+openai = LazyModule('openai')
 
 class ChatbotEngineEnhanced:
-    def __init__(self):
-        self.professors_data = []
+    # Intents whose responses show course materials
+    ATTACHMENT_INTENTS = ('professor_info', 'professor_search', 'attachment')
+    # Intents that look up a professor by name
+    PROFESSOR_INTENTS = ('professor_info', 'schedule', 'classroom', 'contact', 'professor_search', 'attachment')
+    # Intents answered purely from the catalog, so their replies can be cached
+    CACHEABLE_INTENTS = ('professor_info', 'professor_search', 'schedule', 'classroom',
+                         'contact', 'attachment', 'subject')
+    
+    def __init__(self, autoload: bool = True):
+        # Published catalog; replaced as a whole, never mutated
+        self.snapshot = CatalogSnapshot.empty()
+        self.snapshot_min_ratio = float(os.getenv('SNAPSHOT_MIN_RATIO', 0.5))
+        # Backoff between attempts when the first catalog load fails
+        self.catalog_retry_initial = float(os.getenv('CATALOG_RETRY_INITIAL', 1))
+        self.catalog_retry_max = float(os.getenv('CATALOG_RETRY_MAX', 60))
+        self._reload_lock = threading.Lock()
+        # Shared snapshot file for prefork servers (CATALOG_SNAPSHOT_PATH), else None
+        self.snapshot_store = SnapshotFileStore.from_env()
         self.db = DatabaseConnection()
+        # aiomysql connection for the ASGI app, created on first async reload
+        self.async_db = None
         self.emotion_detector = EmotionDetector()
+        # Catalog answers keyed on (normalized text, snapshot version)
+        self.response_cache = ResponseCache.from_env()
+        # Last professor and subject per session, for follow-up questions
+        self.sessions = create_session_backend()
+        # Per-stage timers for /metrics (METRICS_ENABLED=0 turns them off)
+        self.metrics_enabled = metrics_enabled()
+        self.last_reload = None
+        
+        # Set once warm_up() (or the blocking autoload) has loaded a catalog
+        self.ready = threading.Event()
+        self.warmup_status = {'state': 'pending'}
         
         # OpenAI API key (optional - for more advanced responses)
-        self.use_openai = False
-        if os.getenv('OPENAI_API_KEY'):
-            openai.api_key = os.getenv('OPENAI_API_KEY')
-            self.use_openai = True
+        self.use_openai = bool(os.getenv('OPENAI_API_KEY'))
         
         self.intents = {
             'greeting': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'sup', 'yo', 'hola', 'greetings'],
@@ -110,145 +78,606 @@ class ChatbotEngineEnhanced:
             'capability': ['what can you do', 'your abilities', 'your features'],
             'motivation': ['motivate me', 'inspire me', 'encourage', 'motivation', 'inspiration'],
             'study_tips': ['study tips', 'how to study', 'study advice', 'exam tips', 'study help'],
+            'schedule_search': ['right now', 'currently', 'vacant', 'free professor', 'available professor',
+                                'free room', 'available room', 'who is free', "who's free", 'who is available',
+                                'free at', 'free on', 'available at', 'available on', 'free now', 'teaching now',
+                                'who is teaching', 'in room', 'what is in', "what's in"],
             'professor_info': ['who is', 'tell me about', 'info about', 'information', 'about'],
             'professor_search': ['find', 'search', 'look for', 'looking for', 'show me'],
             'schedule': ['schedule', 'class', 'when', 'time', 'what time', 'timetable'],
-            'subject': ['subject', 'teach', 'teaches', 'teaching', 'course', 'what does'],
+            'subject': ['subject', 'teach', 'teaches', 'teaching', 'who is teaching', 'course', 'what does'],
             'classroom': ['where', 'room', 'classroom', 'location', 'find'],
             'contact': ['contact', 'email', 'phone', 'reach', 'how to contact'],
             'attachment': ['file', 'attachment', 'document', 'material', 'resource', 'image', 'photo'],
             'help': ['help', 'how', 'what can you do', 'commands', 'assist']
         }
+        self.intent_matcher = IntentMatcher(self.intents)
+        
+        if autoload:
+            self.warm_up()
+    
+    def get_openai(self):
+        """Import and configure the OpenAI client on first use"""
+        client = openai.load()
+        client.api_key = os.getenv('OPENAI_API_KEY')
+        return client
+    
+    def start_warmup(self) -> threading.Thread:
+        """Run warm_up() on a background thread so importing the app never blocks"""
+        thread = threading.Thread(target=self.warm_up, name='chatbot-warmup', daemon=True)
+        thread.start()
+        return thread
+    
+    def warm_up(self):
+        """Load the catalog and pull heavy dependencies in before serving traffic
+        
+        If the catalog can't be loaded the state becomes 'failed', ready stays
+        unset and the load is retried with backoff on a background thread.
+        """
+        started = time.perf_counter()
+        self.warmup_status = {'state': 'warming'}
+        error = self.try_initial_load()
+        
+        try:
+            # First calls import fuzzywuzzy and compile the matchers
+            self.process_message("who is prof warm up")
+            self.response_cache.clear(reset_stats=True)
+            if self.use_openai:
+                self.get_openai()
+        except Exception as e:
+            print(f"⚠️ Warm-up call failed: {e}")
         
-        self.load_data()
+        if error is None:
+            self.finish_warmup(started)
+            return
+        
+        self.warmup_status = {'state': 'failed', 'error': error, 'attempts': 1}
+        thread = threading.Thread(target=self.retry_initial_load, args=(started,),
+                                  name='chatbot-catalog-retry', daemon=True)
+        thread.start()
     
-    def load_data(self):
+    def try_initial_load(self) -> Optional[str]:
+        """Load the first catalog; the error message if it failed or came back empty"""
+        try:
+            self.load_initial_catalog()
+        except Exception as e:
+            print(f"⚠️ Could not load the catalog: {e}")
+            return f"{type(e).__name__}: {e}"
+        
+        if not self.professors_data:
+            print("⚠️ The catalog is empty")
+            return "The catalog is empty"
+        return None
+    
+    def retry_initial_load(self, started: float):
+        """Retry the first catalog load with exponential backoff until it succeeds"""
+        delay = self.catalog_retry_initial
+        attempts = 1
+        
+        while True:
+            self.warmup_status['retry_in'] = delay
+            time.sleep(delay)
+            
+            # A /reload-data call may have loaded the catalog in the meantime
+            error = self.try_initial_load() if not self.professors_data else None
+            attempts += 1
+            if error is None:
+                break
+            
+            self.warmup_status = {'state': 'failed', 'error': error, 'attempts': attempts}
+            delay = min(delay * 2, self.catalog_retry_max)
+        
+        self.finish_warmup(started)
+    
+    def finish_warmup(self, started: float):
+        self.warmup_status = {
+            'state': 'ready',
+            'seconds': round(time.perf_counter() - started, 3),
+            'error': None
+        }
+        self.ready.set()
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has finished; False if it timed out"""
+        return self.ready.wait(timeout)
+    
+    @property
+    def professors_data(self) -> Tuple[Professor, ...]:
+        return self.snapshot.professors
+    
+    @property
+    def name_index(self):
+        return self.snapshot.name_index
+    
+    @property
+    def subject_index(self):
+        return self.snapshot.subject_index
+    
+    def load_data(self, force: bool = False):
         """Load data from database"""
-        results = self.db.fetch_all_data()
+        started = time.perf_counter()
+        with self.catalog_writer():
+            self.publish(self.build_full_snapshot(), force=force)
+        self.record_reload('full', started)
+        print(f"✅ Loaded {len(self.professors_data)} professors")
+    
+    def load_initial_catalog(self):
+        """Adopt the shared snapshot file if a sibling worker wrote one, else load from MySQL
         
-        # Transform data
-        professors_dict = {}
+        The file may be left over from before a restart, so an adopted
+        snapshot is brought up to date with an incremental reload from its
+        watermark before it is served.
+        """
+        if self.snapshot_store is None:
+            self.load_data()
+            return
         
-        for row in results:
-            prof_id = row['professor_id']
+        started = time.perf_counter()
+        with self.catalog_writer():
+            if not self.snapshot.version:
+                self.publish(self.build_full_snapshot())
+                self.record_reload('full', started)
+                print(f"✅ Loaded {len(self.professors_data)} professors")
+                return
             
-            if prof_id not in professors_dict:
-                professors_dict[prof_id] = {
-                    'id': row['professor_id'],
-                    'name': row['professor_name'],
-                    'department': row['department'],
-                    'contact': row['contact'],
-                    'email': row['email'],
-                    'office_location': row['office_location'],
-                    'bio': row['bio'],
-                    'image_url': row['image_url'],
-                    'subjects': [],
-                    'schedules': []
-                }
+            print(f"✅ Read {len(self.professors_data)} professors from {self.snapshot_store.path}")
+            self.refresh_adopted_snapshot(started)
+    
+    def refresh_adopted_snapshot(self, started: float):
+        """Patch in changes made since the adopted snapshot's watermark; caller holds catalog_writer()"""
+        current = self.snapshot
+        if current.watermark is None:
+            return
+        
+        try:
+            candidate, summary = self.build_incremental_snapshot(current)
+        except CatalogFetchError as e:
+            print(f"⚠️ Serving the snapshot file unchecked: {e}")
+            return
+        
+        # Siblings adopting a file that is already current must not rewrite it
+        if (summary['updated'] or summary['deleted'] or
+                candidate.attachments_by_professor != current.attachments_by_professor):
+            self.publish(candidate)
+            self.record_reload(summary['mode'], started)
+    
+    @contextmanager
+    def catalog_writer(self):
+        """Serialize catalog rebuilds in this process and, when shared, across workers
+        
+        With a snapshot store the newest shared version is adopted first, so
+        rebuilds always start from the latest catalog any worker published.
+        """
+        with self._reload_lock:
+            if self.snapshot_store is None:
+                yield
+                return
+            with self.snapshot_store.exclusive():
+                self.adopt_shared_snapshot()
+                yield
+    
+    def adopt_shared_snapshot(self) -> bool:
+        """Swap in the shared file's snapshot if it is newer than ours"""
+        shared = self.snapshot_store.read()
+        if shared is None or shared.version <= self.snapshot.version:
+            return False
+        self.snapshot = shared
+        self.response_cache.clear()
+        return True
+    
+    def sync_shared_snapshot(self):
+        """Pick up a snapshot another worker published, without blocking requests"""
+        if self.snapshot_store is None or not self.snapshot_store.has_update():
+            return
+        self.try_adopt_shared_snapshot()
+    
+    def try_adopt_shared_snapshot(self):
+        """Adopt the shared file unless a reload in this process already holds the lock"""
+        # A reload already running here will adopt the file itself
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            if self.adopt_shared_snapshot():
+                print(f"🔄 Adopted shared catalog snapshot v{self.snapshot.version}")
+        finally:
+            self._reload_lock.release()
+    
+    def reload_data(self, full: bool = False, force: bool = False, background: bool = False) -> Dict:
+        """Reload data, patching only professors changed since the last load
+        
+        Falls back to a full rebuild when asked to or when no watermark has
+        been recorded yet. With background=True the new snapshot is built on
+        a separate thread and this returns immediately.
+        """
+        if background:
+            thread = threading.Thread(
+                target=self._reload_in_background,
+                args=(full, force),
+                name='catalog-reload',
+                daemon=True
+            )
+            thread.start()
+            return {
+                'mode': 'full' if full else 'incremental',
+                'status': 'scheduled',
+                'version': self.snapshot.version
+            }
+        
+        started = time.perf_counter()
+        with self.catalog_writer():
+            current = self.snapshot
+            if full or current.watermark is None:
+                candidate = self.build_full_snapshot()
+                summary = {'mode': 'full'}
+            else:
+                candidate, summary = self.build_incremental_snapshot(current)
             
-            # Add subject
-            if row['subject_id']:
-                subject_exists = any(s['id'] == row['subject_id'] for s in professors_dict[prof_id]['subjects'])
-                if not subject_exists:
-                    professors_dict[prof_id]['subjects'].append({
-                        'id': row['subject_id'],
-                        'code': row['subject_code'],
-                        'name': row['subject_name'],
-                        'description': row['subject_description'],
-                        'units': row['units']
-                    })
+            self.publish(candidate, force=force)
+        
+        self.record_reload(summary['mode'], started)
+        summary['version'] = candidate.version
+        summary['professors'] = len(candidate.professors)
+        return summary
+    
+    def record_reload(self, mode: str, started: float):
+        """Count a published load or reload in the reload duration metrics"""
+        seconds = time.perf_counter() - started
+        RELOAD_SECONDS.observe(seconds, mode)
+        self.last_reload = {'mode': mode, 'seconds': seconds, 'at': time.time()}
+    
+    def _reload_in_background(self, full: bool, force: bool):
+        try:
+            summary = self.reload_data(full=full, force=force)
+            print(f"🔄 Background reload published snapshot v{summary['version']}")
+        except Exception as e:
+            print(f"Error in background reload: {e}")
+    
+    def get_async_db(self) -> AsyncDatabaseConnection:
+        """aiomysql-backed connection for the ASGI app, created on first use"""
+        if self.async_db is None:
+            self.async_db = AsyncDatabaseConnection()
+        return self.async_db
+    
+    async def reload_data_async(self, full: bool = False, force: bool = False) -> Dict:
+        """reload_data() for the ASGI app
+        
+        Catalog queries go through aiomysql and the snapshot is built on a
+        worker thread, so the event loop keeps answering chats meanwhile.
+        The shared snapshot file needs the blocking cross-process lock, so
+        with CATALOG_SNAPSHOT_PATH set the sync reload runs on a thread.
+        """
+        if self.snapshot_store is not None:
+            return await asyncio.to_thread(self.reload_data, full, force)
+        
+        started = time.perf_counter()
+        db = self.get_async_db()
+        base = self.snapshot
+        watermark = await db.fetch_server_time()
+        
+        if full or base.watermark is None:
+            professors = await self.stream_professors(db)
+            attachment_rows = await db.fetch_all_attachments()
             
-            # Add schedule
-            if row['schedule_id']:
-                professors_dict[prof_id]['schedules'].append({
-                    'id': row['schedule_id'],
-                    'subject_code': row['subject_code'],
-                    'subject_name': row['subject_name'],
-                    'classroom': row['classroom'],
-                    'day': row['day'],
-                    'time_start': str(row['time_start']) if row['time_start'] else None,
-                    'time_end': str(row['time_end']) if row['time_end'] else None,
-                    'semester': row['semester'],
-                    'academic_year': row['academic_year'],
-                    'section': row['section'],
-                    'description': row['schedule_description']
-                })
-        
-        self.professors_data = list(professors_dict.values())
-        print(f"✅ Loaded {len(self.professors_data)} professors")
+            def build():
+                candidate = CatalogSnapshot.build(
+                    base.version + 1,
+                    professors.build(),
+                    attachment_rows,
+                    watermark=watermark
+                )
+                return candidate, {'mode': 'full'}
+        else:
+            catalog_ids = await db.fetch_catalog_ids()
+            changed = await db.fetch_changed_professor_ids(base.watermark)
+            if watermark is None or catalog_ids is None or changed is None:
+                raise CatalogFetchError("Could not read catalog changes from the database")
+            
+            changed, deleted = self.plan_incremental(base, catalog_ids, changed)
+            professors = await self.stream_professors(db, professor_ids=changed)
+            attachment_rows = await db.fetch_all_attachments()
+            
+            def build():
+                return self.patch_snapshot(base, changed, deleted, professors.build(),
+                                           attachment_rows, watermark)
+        
+        candidate, summary = await asyncio.to_thread(self._publish_built, base, build, force)
+        self.record_reload(summary['mode'], started)
+        summary['version'] = candidate.version
+        summary['professors'] = len(candidate.professors)
+        return summary
     
-    def detect_intent(self, message: str) -> str:
-        """Detect user intent from message"""
-        message_lower = message.lower()
+    async def stream_professors(self, db: AsyncDatabaseConnection, professor_ids=None) -> ProfessorBuilder:
+        """Group catalog rows batch by batch as they arrive, never holding the full result"""
+        professors = ProfessorBuilder()
+        async for rows in db.iter_all_data(professor_ids=professor_ids):
+            professors.add(rows)
+        return professors
+    
+    def _publish_built(self, base: CatalogSnapshot, build, force: bool):
+        with self._reload_lock:
+            if self.snapshot is not base:
+                raise SnapshotRejected(
+                    f"Snapshot v{self.snapshot.version} was published while this reload ran; retry"
+                )
+            candidate, summary = build()
+            self.publish(candidate, force=force)
+        return candidate, summary
+    
+    def publish(self, candidate: CatalogSnapshot, force: bool = False):
+        """Atomically swap in a new snapshot unless it looks truncated"""
+        if not force:
+            self.snapshot.check_successor(candidate, self.snapshot_min_ratio)
+        self.snapshot = candidate
+        # Old entries can no longer be hit; free them now
+        self.response_cache.clear()
         
-        # Check each intent
-        intent_scores = {}
-        for intent, keywords in self.intents.items():
-            score = sum(1 for keyword in keywords if keyword in message_lower)
-            if score > 0:
-                intent_scores[intent] = score
+        conflicts = candidate.schedule_index.conflicts
+        if conflicts['rooms'] or conflicts['professors']:
+            print(f"⚠️ Snapshot v{candidate.version} has {len(conflicts['rooms'])} room and "
+                  f"{len(conflicts['professors'])} professor schedule conflicts")
+        if self.snapshot_store is not None:
+            self.snapshot_store.write(candidate)
+    
+    def build_full_snapshot(self) -> CatalogSnapshot:
+        """Build a snapshot from a full catalog query"""
+        watermark = self.db.fetch_server_time()
         
-        if intent_scores:
-            # Return intent with highest score
-            return max(intent_scores, key=intent_scores.get)
+        return CatalogSnapshot.build(
+            self.snapshot.version + 1,
+            build_professors(self.db.iter_all_data()),
+            self.db.fetch_all_attachments(),
+            watermark=watermark
+        )
+    
+    def build_incremental_snapshot(self, base: CatalogSnapshot):
+        """Build a snapshot from base plus the professors changed since its watermark"""
+        watermark = self.db.fetch_server_time()
+        catalog_ids = self.db.fetch_catalog_ids()
+        changed = self.db.fetch_changed_professor_ids(base.watermark)
+        
+        if watermark is None or catalog_ids is None or changed is None:
+            raise CatalogFetchError("Could not read catalog changes from the database")
         
-        return 'unknown'
+        changed, deleted = self.plan_incremental(base, catalog_ids, changed)
+        refreshed = build_professors(self.db.iter_all_data(professor_ids=changed))
+        return self.patch_snapshot(base, changed, deleted, refreshed,
+                                   self.db.fetch_all_attachments(), watermark)
     
-    def find_professor(self, query: str) -> Optional[Dict]:
-        """Find professor using fuzzy matching"""
-        if not self.professors_data:
-            return None
+    def plan_incremental(self, base: CatalogSnapshot, catalog_ids: Dict, changed: set):
+        """Professor ids to re-fetch and ids deleted since base was built
+        
+        catalog_ids comes from a full scan of the professor, subject and
+        schedule ids (and subject columns), so this diff is O(catalog); the
+        fetch and the index patching that follow are O(changed).
+        """
+        current = {prof.id: prof for prof in base.professors}
+        deleted = set(current) - catalog_ids['professors']
         
-        # Clean query
-        query_clean = re.sub(r'\b(prof|professor|dr|doctor|ms|mr|mrs)\b\.?\s*', '', query, flags=re.IGNORECASE).strip()
+        # New professors, subjects/schedules that appeared or vanished and edited subjects
+        changed |= catalog_ids['professors'] - set(current)
+        changed |= self.professors_with_changed_rows(current, catalog_ids)
+        changed -= deleted
+        return changed, deleted
+    
+    def patch_snapshot(self, base: CatalogSnapshot, changed: set, deleted: set,
+                       refreshed: List[Professor], attachment_rows: List[Dict], watermark):
+        """Build the successor of base with refreshed professors swapped in"""
+        current = {prof.id: prof for prof in base.professors}
+        refreshed = {prof.id: prof for prof in refreshed}
+        # Deleted between the id scan and the fetch
+        deleted = deleted | (changed - set(refreshed))
         
-        # Try fuzzy matching on professor names
-        professor_names = [p['name'] for p in self.professors_data]
-        match = process.extractOne(query_clean, professor_names, scorer=fuzz.token_sort_ratio)
+        # Unchanged professor records are shared with the base snapshot
+        for prof_id in deleted:
+            current.pop(prof_id, None)
+        current.update(refreshed)
         
-        if match and match[1] >= 60:  # 60% similarity threshold
-            matched_name = match[0]
-            for prof in self.professors_data:
-                if prof['name'] == matched_name:
-                    return prof
+        candidate = CatalogSnapshot.patch(
+            base,
+            base.version + 1,
+            sorted(current.values(), key=lambda prof: prof.name.lower()),
+            set(refreshed) | deleted,
+            attachment_rows,
+            watermark=watermark
+        )
+        print(f"🔄 Reloaded {len(refreshed)} changed professors, removed {len(deleted)}")
         
-        return None
+        return candidate, {
+            'mode': 'incremental',
+            'updated': len(refreshed),
+            'deleted': len(deleted)
+        }
     
-    def find_by_subject(self, query: str) -> List[Dict]:
-        """Find professor by subject"""
-        results = []
-        query_lower = query.lower()
+    def professors_with_changed_rows(self, current: Dict, catalog_ids: Dict) -> set:
+        """Professors whose subject or schedule id sets, or subject columns, differ from the database"""
+        subject_fields = catalog_ids['subject_fields']
+        db_subjects = {}
+        for subject_id, prof_id in catalog_ids['subjects'].items():
+            db_subjects.setdefault(prof_id, set()).add(subject_id)
         
-        for prof in self.professors_data:
-            for subject in prof['subjects']:
-                if (query_lower in subject['code'].lower() or 
-                    query_lower in subject['name'].lower()):
-                    results.append({
-                        'professor': prof,
-                        'subject': subject
-                    })
+        db_schedules = {}
+        for schedule_id, prof_id in catalog_ids['schedules'].items():
+            db_schedules.setdefault(prof_id, set()).add(schedule_id)
         
-        return results
+        changed = set()
+        for prof_id, prof in current.items():
+            subject_ids = {subject.id for subject in prof.subjects}
+            schedule_ids = {sched.id for sched in prof.schedules}
+            
+            if (subject_ids != db_subjects.get(prof_id, set()) or
+                    schedule_ids != db_schedules.get(prof_id, set())):
+                changed.add(prof_id)
+            elif any(subject_fields.get(subject.id) != subject.fingerprint() for subject in prof.subjects):
+                # subjects has no updated_at, so renamed or re-described subjects only show up here
+                changed.add(prof_id)
+        
+        return changed
+    
+    def detect_intent(self, message: Union[str, NormalizedMessage]) -> str:
+        """Detect user intent from message"""
+        # Highest keyword count wins; ties go to the intent listed first
+        return self.intent_matcher.best(message)
+    
+    def set_intents(self, intents: Dict[str, List[str]], replace: bool = False):
+        """Install a new intent keyword table at runtime
+        
+        The table is merged into the current one unless replace is set.
+        Intents without a reply in generate_short_response() fall through
+        to the catalog or unknown replies.
+        """
+        table = {} if replace else dict(self.intents)
+        table.update({intent: list(keywords) for intent, keywords in intents.items()})
+        
+        # Compile first, then swap both references
+        matcher = IntentMatcher(table)
+        self.intents = table
+        self.intent_matcher = matcher
+        # Cached replies were classified with the old table
+        self.response_cache.clear()
+    
+    def find_professor(self, query: Union[str, NormalizedMessage], snapshot: Optional[CatalogSnapshot] = None) -> Optional[Professor]:
+        """Find professor using fuzzy matching"""
+        snapshot = snapshot or self.snapshot
+        # Title stripping, token sorting and the 60% threshold live in the index
+        return snapshot.name_index.find(query)
     
-    def get_attachments(self, professor_id: int) -> List[Dict]:
-        """Get attachments for a professor"""
-        return self.db.fetch_attachments(professor_id=professor_id)
+    def resolve_professor(self, message: NormalizedMessage, snapshot: CatalogSnapshot,
+                          matches: Optional[Dict] = None) -> Optional[Professor]:
+        """Professor a chat message names: the fuzzy match, else a full name it mentions
+        
+        matches holds find_professor() results a batch already computed.
+        """
+        if matches is not None and message.key in matches:
+            professor = matches[message.key]
+        else:
+            professor = self.find_professor(message, snapshot)
+        return professor or snapshot.name_index.mentioned(message)
     
-    def format_schedule_short(self, schedules: List[Dict]) -> str:
+    def find_by_subject(self, query: Union[str, NormalizedMessage], snapshot: Optional[CatalogSnapshot] = None) -> List[Dict]:
+        """Find professor by subject code or subject name tokens"""
+        snapshot = snapshot or self.snapshot
+        return snapshot.subject_index.search(query)
+    
+    def search_professors(self, query: str, page: int = 1, per_page: int = 10,
+                          snapshot: Optional[CatalogSnapshot] = None) -> Dict:
+        """Rank professors by name, department and subject relevance, one page at a time"""
+        snapshot = snapshot or self.snapshot
+        total, ranked = snapshot.search_index.search(query, page, per_page)
+        
+        return {
+            'query': query,
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'results': [
+                {
+                    'id': prof.id,
+                    'name': prof.name,
+                    'department': prof.department,
+                    'email': prof.email,
+                    'office_location': prof.office_location,
+                    'bio': prof.bio,
+                    'image_url': prof.image_url,
+                    'subjects': [subject.code for subject in prof.subjects],
+                    'score': round(score, 4)
+                }
+                for prof, score in ranked
+            ]
+        }
+    
+    def get_attachments(self, professor_id: int, snapshot: Optional[CatalogSnapshot] = None) -> List[Dict]:
+        """Get attachments for a professor from the preloaded cache"""
+        snapshot = snapshot or self.snapshot
+        return snapshot.attachments_by_professor.get(professor_id, [])
+    
+    def get_schedule_attachments(self, schedule_id: int, snapshot: Optional[CatalogSnapshot] = None) -> List[Dict]:
+        """Get attachments for a schedule from the preloaded cache"""
+        snapshot = snapshot or self.snapshot
+        return snapshot.attachments_by_schedule.get(schedule_id, [])
+    
+    def format_schedule_short(self, schedules) -> str:
         """Format schedule in a short, concise way"""
         if not schedules:
             return "No schedule available."
         
         lines = []
         for sched in schedules[:3]:  # Show only first 3
-            time = f"{sched['time_start']}-{sched['time_end']}" if sched['time_start'] else "TBA"
-            lines.append(f"📅 {sched['day']} {time} - {sched['subject_code']} @ {sched['classroom']}")
+            time = f"{sched.time_start}-{sched.time_end}" if sched.time_start else "TBA"
+            lines.append(f"📅 {sched.day} {time} - {sched.subject_code} @ {sched.classroom}")
         
         if len(schedules) > 3:
             lines.append(f"...and {len(schedules) - 3} more")
         
         return "\n".join(lines)
     
+    def build_schedule_search_response(self, query: Dict, snapshot: CatalogSnapshot, user_emotion: Dict) -> Dict:
+        """Answer who is teaching, who is free or what is in a room at a given time"""
+        index = snapshot.schedule_index
+        day, start, end = query['day'], query['start'], query['end']
+        
+        if end - start >= 24 * 60:
+            when = day
+        elif end - start == 1:
+            when = f"{day} {clock(start)}"
+        else:
+            when = f"{day} {clock(start)}-{clock(end)}"
+        
+        if query['room']:
+            classes = index.in_room(query['room'], day, start, end)
+            room = index.rooms.get(room_key(query['room']), f"Room {query['room'].upper()}")
+            title = f"🏫 **{room}** - {when}"
+            empty = f"No classes in {room} then. It should be free! 🙌"
+        elif query['free']:
+            classes = None
+            free_count, free = index.free_professors(day, start, end, limit=20)
+            title = f"✅ **Free {when}** ({free_count} professors)"
+            empty = "Everyone is teaching then!"
+        else:
+            classes = index.teaching(day, start, end)
+            title = f"👨‍🏫 **Teaching {when}** ({len(classes)} classes)"
+            empty = f"Nobody is teaching then {user_emotion['emoji']}"
+        
+        if classes is None:
+            lines = [f"• {prof.name}" + (f" - {prof.department}" if prof.department else "") for prof in free[:5]]
+            total = free_count
+            results = [{'id': prof.id, 'name': prof.name, 'department': prof.department} for prof in free]
+        else:
+            lines = [
+                f"📅 {sched.time_start}-{sched.time_end} - {sched.subject_code} @ {sched.classroom} · {prof.name}"
+                for _, _, prof, sched in classes[:5]
+            ]
+            total = len(classes)
+            results = [
+                {'professor': {'id': prof.id, 'name': prof.name}, 'schedule': sched.to_dict()}
+                for _, _, prof, sched in classes[:20]
+            ]
+        
+        if lines:
+            response_msg = f"{title}\n\n" + "\n".join(lines)
+            if total > 5:
+                response_msg += f"\n...and {total - 5} more"
+        else:
+            response_msg = f"{title}\n\n{empty}"
+        
+        return {
+            'intent': 'schedule_search',
+            'message': self.format_response_with_emotion(response_msg, user_emotion),
+            'data': {
+                'day': day,
+                'start': clock(start),
+                'end': clock(end),
+                'room': query['room'],
+                'total': total,
+                'results': results
+            },
+            'emotion': user_emotion,
+            'suggestions': [
+                "Who is teaching right now?",
+                "Free professors today",
+                "Find a professor"
+            ]
+        }
+    
     def format_response_with_emotion(self, base_message: str, user_emotion: Dict) -> str:
         """Adjust response based on user emotion"""
         emotion = user_emotion['emotion']
@@ -597,14 +1026,196 @@ class ChatbotEngineEnhanced:
         
         return None
     
+    async def process_message_async(self, message: str, session_id: str = 'default') -> Dict:
+        """process_message() for the ASGI app
+        
+        Answering is in-memory work against the pinned snapshot, so it runs
+        inline on the event loop; decoding a newer shared snapshot file, the
+        only blocking step left, is moved to a worker thread.
+        """
+        if self.snapshot_store is not None and self.snapshot_store.has_update():
+            await asyncio.to_thread(self.try_adopt_shared_snapshot)
+        return self.process_message(message, session_id)
+    
     def process_message(self, message: str, session_id: str = 'default') -> Dict:
         """Process user message and generate response"""
+        timer = StageTimer() if self.metrics_enabled else None
+        # Lowercased and tokenized once; every stage below reads from it
+        message = NormalizedMessage(message)
+        
+        # Pin one catalog version for the whole request
+        self.sync_shared_snapshot()
+        snapshot = self.snapshot
+        
+        context = self.get_session(session_id)
+        refers = references(message) if context else (False, False)
+        if timer:
+            timer.mark('session')
+        
+        cached = False
+        if any(refers):
+            # Follow-ups ("what's her schedule?") depend on the session, so skip the cache
+            response = self.build_response(message, snapshot, context=context, refers=refers, timer=timer)
+        else:
+            # Catalog answers depend only on the text and the catalog version
+            cache_key = (message.key, snapshot.version)
+            response = self.response_cache.get(cache_key)
+            if timer:
+                timer.mark('cache')
+            if response is None:
+                response = self.remember(cache_key, self.build_response(message, snapshot, timer=timer))
+            else:
+                cached = True
+        if timer and not cached:
+            # Whatever ran after the last stage build_response marked
+            timer.mark('format')
+        
+        self.update_session(session_id, context, response)
+        if timer:
+            timer.mark('session_update')
+            observe_request(timer, response['intent'], cached)
+        return dict(response)
+    
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """Context of a session; the shared 'default' id never carries one"""
+        if not session_id or session_id == 'default':
+            return None
+        return self.sessions.get(session_id)
+    
+    def update_session(self, session_id: str, context: Optional[Dict], response: Dict):
+        """Remember the professor and subject a reply resolved to"""
+        if not session_id or session_id == 'default':
+            return
+        
+        updated = dict(context or {})
+        data = response.get('data')
+        if response['intent'] in self.PROFESSOR_INTENTS and data:
+            updated['professor_id'] = data['id']
+        elif response['intent'] == 'subject' and data:
+            updated['subject_code'] = data[0]['subject']['code']
+            if len(data) == 1:
+                updated['professor_id'] = data[0]['professor']['id']
+        
+        if updated:
+            self.sessions.set(session_id, updated)
+    
+    def remember(self, cache_key, response: Dict) -> Dict:
+        """Cache a catalog answer; small talk picks a random reply, so it is never cached"""
+        if response['intent'] in self.CACHEABLE_INTENTS:
+            self.response_cache.put(cache_key, response)
+        else:
+            self.response_cache.bypass()
+        return response
+    
+    def process_messages(self, messages: List[str], session_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Answer a batch of messages against one snapshot, sharing work across it
+        
+        Messages that normalize to the same text are answered once, and the
+        professor names of every remaining message are matched in a single
+        pass over the name index. A message that fails gets an 'error'
+        entry instead of failing the batch.
+        
+        session_ids, if given, holds one session id per message. Those items
+        then behave like process_message(): in batch order, follow-ups are
+        answered from their session's context and each reply updates it, so
+        a later item can refer back to an earlier one.
+        """
+        self.sync_shared_snapshot()
+        snapshot = self.snapshot
+        
+        normalized = [NormalizedMessage(message) for message in messages]
+        unique = {}
+        for message in normalized:
+            unique.setdefault(message.key, message)
+        
+        replies = {}
+        analyses = {}
+        for text, message in unique.items():
+            cached = self.response_cache.get((text, snapshot.version))
+            if cached is not None:
+                replies[text] = cached
+                continue
+            try:
+                analyses[text] = (self.emotion_detector.analyze_sentiment(message), self.detect_intent(message))
+            except Exception as e:
+                replies[text] = {'error': str(e)}
+        
+        # One matching pass for every message that names a professor
+        queries = [unique[text] for text, (_, intent) in analyses.items()
+                   if intent in self.PROFESSOR_INTENTS or intent == 'schedule_search']
+        matches = dict(zip([query.key for query in queries], snapshot.name_index.find_many(queries)))
+        
+        for text, (user_emotion, intent) in analyses.items():
+            try:
+                response = self.build_response(unique[text], snapshot, user_emotion, intent, matches)
+                replies[text] = self.remember((text, snapshot.version), response)
+            except Exception as e:
+                replies[text] = {'error': str(e)}
+        
+        if session_ids is None:
+            return [dict(replies[message.key]) for message in normalized]
+        
+        results = []
+        for message, session_id in zip(normalized, session_ids):
+            response = replies[message.key]
+            context = self.get_session(session_id)
+            refers = references(message) if context else (False, False)
+            try:
+                if any(refers):
+                    response = self.build_response(message, snapshot, context=context, refers=refers)
+                if 'error' not in response:
+                    self.update_session(session_id, context, response)
+            except Exception as e:
+                response = {'error': str(e)}
+            results.append(dict(response))
+        return results
+    
+    def build_response(self, message: Union[str, NormalizedMessage], snapshot: CatalogSnapshot,
+                       user_emotion: Optional[Dict] = None, intent: Optional[str] = None, matches: Optional[Dict] = None,
+                       context: Optional[Dict] = None, refers=(False, False),
+                       timer: Optional[StageTimer] = None) -> Dict:
+        """Answer a message against one pinned catalog snapshot
+        
+        Batch callers pass the emotion, intent and professor matches (keyed by
+        normalized text) they already computed for the message. For follow-ups,
+        refers says whether the message points back at the session context's
+        professor or subject.
+        With a timer, each stage is marked as it finishes.
+        """
+        message = NormalizedMessage.of(message)
+        
+        # Earlier professor of this session, looked up by id instead of searched;
+        # only used when the message itself names nobody
+        context = context or {}
+        remembered = snapshot.name_index.get(context.get('professor_id')) if refers[0] else None
         
         # Detect emotion
-        user_emotion = self.emotion_detector.analyze_sentiment(message)
+        if user_emotion is None:
+            user_emotion = self.emotion_detector.analyze_sentiment(message)
+            if timer:
+                timer.mark('emotion')
         
         # Detect intent
-        intent = self.detect_intent(message)
+        if intent is None:
+            intent = self.detect_intent(message)
+            if timer:
+                timer.mark('intent')
+        
+        # Day/time and room questions about nobody in particular
+        if intent == 'schedule_search':
+            query = parse_schedule_query(message)
+            named = self.resolve_professor(message, snapshot, matches)
+            matches = {message.key: named}
+            if query['explicit'] and named is None:
+                if timer:
+                    timer.mark('match')
+                return self.build_schedule_search_response(query, snapshot, user_emotion)
+            
+            # "is Dr. Reyes free on monday?" or no day, time or room: answer the
+            # next-best intent, a schedule lookup if nothing else matched
+            intent = self.intent_matcher.best(message, exclude=('schedule_search',))
+            if intent == 'unknown':
+                intent = 'schedule'
         
         # Handle simple intents
         simple_response = self.generate_short_response(intent, None, user_emotion)
@@ -613,44 +1224,48 @@ class ChatbotEngineEnhanced:
             return simple_response
         
         # Professor-related intents
-        if intent in ['professor_info', 'schedule', 'classroom', 'contact', 'professor_search', 'attachment']:
-            professor = self.find_professor(message)
+        if intent in self.PROFESSOR_INTENTS:
+            professor = self.resolve_professor(message, snapshot, matches) or remembered
+            if timer:
+                timer.mark('match')
             
             if professor:
-                # Get attachments
-                attachments = self.get_attachments(professor['id'])
+                # Only intents that show materials need attachments
+                attachments = self.get_attachments(professor.id, snapshot) if intent in self.ATTACHMENT_INTENTS else []
+                if timer:
+                    timer.mark('attachments')
                 
                 # Build response based on intent
                 if intent == 'schedule':
-                    schedule_info = self.format_schedule_short(professor['schedules'])
-                    response_msg = f"📋 **{professor['name']}'s Schedule**\n\n{schedule_info}"
+                    schedule_info = self.format_schedule_short(professor.schedules)
+                    response_msg = f"📋 **{professor.name}'s Schedule**\n\n{schedule_info}"
                 
                 elif intent == 'classroom':
-                    if professor['office_location']:
-                        response_msg = f"📍 **{professor['name']}**\n\nOffice: {professor['office_location']}"
+                    if professor.office_location:
+                        response_msg = f"📍 **{professor.name}**\n\nOffice: {professor.office_location}"
                     else:
-                        response_msg = f"Office location not available for {professor['name']}."
+                        response_msg = f"Office location not available for {professor.name}."
                     
-                    if professor['schedules']:
-                        classrooms = list(set(s['classroom'] for s in professor['schedules'] if s['classroom']))
+                    if professor.schedules:
+                        classrooms = list(set(s.classroom for s in professor.schedules if s.classroom))
                         if classrooms:
                             response_msg += f"\n\n🏫 Classrooms: {', '.join(classrooms[:3])}"
                 
                 elif intent == 'contact':
                     contact_parts = []
-                    if professor['email']:
-                        contact_parts.append(f"📧 {professor['email']}")
-                    if professor['contact']:
-                        contact_parts.append(f"📱 {professor['contact']}")
+                    if professor.email:
+                        contact_parts.append(f"📧 {professor.email}")
+                    if professor.contact:
+                        contact_parts.append(f"📱 {professor.contact}")
                     
                     if contact_parts:
-                        response_msg = f"📞 **{professor['name']}**\n\n" + "\n".join(contact_parts)
+                        response_msg = f"📞 **{professor.name}**\n\n" + "\n".join(contact_parts)
                     else:
-                        response_msg = f"No contact info available for {professor['name']}."
+                        response_msg = f"No contact info available for {professor.name}."
                 
                 elif intent == 'attachment':
                     if attachments:
-                        response_msg = f"📎 **{professor['name']}'s Materials** ({len(attachments)})\n\n"
+                        response_msg = f"📎 **{professor.name}'s Materials** ({len(attachments)})\n\n"
                         for att in attachments[:3]:
                             response_msg += f"• {att['file_name']}"
                             if att.get('subject_name'):
@@ -660,20 +1275,20 @@ class ChatbotEngineEnhanced:
                         if len(attachments) > 3:
                             response_msg += f"\n...and {len(attachments) - 3} more files"
                     else:
-                        response_msg = f"No attachments found for {professor['name']}."
+                        response_msg = f"No attachments found for {professor.name}."
                 
                 else:
                     # General info
-                    subjects = ", ".join([s['code'] for s in professor['subjects'][:3]]) if professor['subjects'] else "None"
-                    response_msg = f"👨‍🏫 **{professor['name']}**\n\n"
-                    response_msg += f"🏛️ {professor['department']}\n"
+                    subjects = ", ".join([s.code for s in professor.subjects[:3]]) if professor.subjects else "None"
+                    response_msg = f"👨‍🏫 **{professor.name}**\n\n"
+                    response_msg += f"🏛️ {professor.department}\n"
                     response_msg += f"📚 {subjects}\n"
                     
-                    if professor['office_location']:
-                        response_msg += f"📍 {professor['office_location']}\n"
+                    if professor.office_location:
+                        response_msg += f"📍 {professor.office_location}\n"
                     
-                    if professor['email']:
-                        response_msg += f"📧 {professor['email']}"
+                    if professor.email:
+                        response_msg += f"📧 {professor.email}"
                 
                 # Add emotion-based opening
                 response_msg = self.format_response_with_emotion(response_msg, user_emotion)
@@ -681,13 +1296,13 @@ class ChatbotEngineEnhanced:
                 return {
                     'intent': intent,
                     'message': response_msg,
-                    'data': professor,
+                    'data': professor.to_dict(),
                     'attachments': attachments if attachments else None,
-                    'image_url': professor.get('image_url'),
+                    'image_url': professor.image_url,
                     'emotion': user_emotion,
                     'suggestions': [
-                        f"{professor['name']}'s schedule",
-                        f"Contact {professor['name']}",
+                        f"{professor.name}'s schedule",
+                        f"Contact {professor.name}",
                         "Find another prof"
                     ]
                 }
@@ -705,21 +1320,34 @@ class ChatbotEngineEnhanced:
         
         # Subject search
         elif intent == 'subject':
-            results = self.find_by_subject(message)
+            results = self.find_by_subject(message, snapshot)
+            if results:
+                remembered = None
+            elif remembered:
+                # "what does she teach?"
+                results = [{'professor': remembered, 'subject': subject} for subject in remembered.subjects]
+            elif refers[1] and context.get('subject_code'):
+                # "who else teaches it?"
+                results = self.find_by_subject(context['subject_code'], snapshot)
+            if timer:
+                timer.mark('match')
             
             if results:
-                if len(results) == 1:
+                if remembered:
+                    response_msg = f"📚 **{remembered.name}** teaches:\n\n"
+                    response_msg += "\n".join(f"• {subject.code} - {subject.name}" for subject in remembered.subjects)
+                elif len(results) == 1:
                     prof = results[0]['professor']
                     subject = results[0]['subject']
-                    response_msg = f"📚 **{subject['name']}** ({subject['code']})\n\n"
-                    response_msg += f"👨‍🏫 {prof['name']}\n"
-                    response_msg += f"🏛️ {prof['department']}"
+                    response_msg = f"📚 **{subject.name}** ({subject.code})\n\n"
+                    response_msg += f"👨‍🏫 {prof.name}\n"
+                    response_msg += f"🏛️ {prof.department}"
                 else:
                     response_msg = f"Found {len(results)} professors:\n\n"
                     for i, result in enumerate(results[:3], 1):
                         prof = result['professor']
                         subject = result['subject']
-                        response_msg += f"{i}. **{prof['name']}** - {subject['code']}\n"
+                        response_msg += f"{i}. **{prof.name}** - {subject.code}\n"
                     
                     if len(results) > 3:
                         response_msg += f"\n...and {len(results) - 3} more"
@@ -729,11 +1357,11 @@ class ChatbotEngineEnhanced:
                 return {
                     'intent': 'subject',
                     'message': response_msg,
-                    'data': results,
+                    'data': serialize_subject_results(results),
                     'emotion': user_emotion,
-                    'image_url': results[0]['professor'].get('image_url') if len(results) == 1 else None,
+                    'image_url': results[0]['professor'].image_url if len(results) == 1 else None,
                     'suggestions': [
-                        f"{results[0]['professor']['name']}'s schedule" if results else "Search again"
+                        f"{results[0]['professor'].name}'s schedule" if results else "Search again"
                     ]
                 }
             else:
@@ -1,10 +1,205 @@
-import mysql.connector
-from mysql.connector import Error
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
 from dotenv import load_dotenv
+from lazy_imports import LazyModule
+from metrics import db_query
+
+# Imported on first use so loading this module stays cheap
+mysql_connector = LazyModule('mysql.connector')
 
 load_dotenv()
 
+# Joined catalog rows; {where} optionally narrows the load to some professors
+CATALOG_QUERY = """
+    SELECT 
+        p.id as professor_id,
+        p.name as professor_name,
+        p.department,
+        p.contact,
+        p.email,
+        p.office_location,
+        p.bio,
+        p.image_url,
+        s.id as subject_id,
+        s.subject_code,
+        s.subject_name,
+        s.description as subject_description,
+        s.units,
+        sch.id as schedule_id,
+        sch.classroom,
+        sch.day,
+        sch.time_start,
+        sch.time_end,
+        sch.semester,
+        sch.academic_year,
+        sch.section,
+        sch.description as schedule_description
+    FROM professors p
+    LEFT JOIN subjects s ON p.id = s.professor_id
+    LEFT JOIN schedules sch ON p.id = sch.professor_id AND s.id = sch.subject_id
+    {where}
+    ORDER BY p.name, s.subject_code, sch.day, sch.time_start
+"""
+
+# Only schedules that the catalog query can join to a subject
+JOINABLE_SCHEDULES_QUERY = """
+    SELECT sch.id, sch.professor_id
+    FROM schedules sch
+    JOIN subjects s ON s.id = sch.subject_id AND s.professor_id = sch.professor_id
+"""
+
+# subjects has no updated_at: new subjects are found by created_at and edits
+# by comparing SUBJECT_FINGERPRINT_QUERY with the snapshot. That comparison,
+# like delete detection, is a full scan of the id and subject columns on
+# every incremental reload; only the joined catalog query is limited to the
+# changed professors.
+CHANGED_PROFESSORS_QUERY = """
+    SELECT id FROM professors WHERE updated_at >= %s
+    UNION
+    SELECT professor_id FROM schedules WHERE updated_at >= %s
+    UNION
+    SELECT professor_id FROM subjects WHERE created_at >= %s
+"""
+
+# Every subject's owner plus the columns the catalog shows, to spot edited subjects
+SUBJECT_FINGERPRINT_QUERY = """
+    SELECT id, professor_id, subject_code, subject_name, description, units
+    FROM subjects
+"""
+
+def subject_fingerprints(rows):
+    """({subject id: professor id}, {subject id: (code, name, description, units)})"""
+    owners = {}
+    fields = {}
+    for subject_id, professor_id, code, name, description, units in rows:
+        owners[subject_id] = professor_id
+        fields[subject_id] = (code, name, description, units)
+    return owners, fields
+
+ALL_ATTACHMENTS_QUERY = """
+    SELECT 
+        a.id,
+        a.professor_id,
+        a.file_name,
+        a.file_path,
+        a.file_type,
+        a.description,
+        a.schedule_id,
+        s.subject_name,
+        s.subject_code
+    FROM attachments a
+    LEFT JOIN schedules sch ON a.schedule_id = sch.id
+    LEFT JOIN subjects s ON sch.subject_id = s.id
+    ORDER BY a.created_at DESC
+"""
+
+class CatalogFetchError(Exception):
+    """Raised when the catalog cannot be read from the database"""
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections with health checks on checkout"""
+    
+    def __init__(self, connect_args: Dict, size: int = 5, timeout: float = 5.0, ping_interval: float = 30.0):
+        self.connect_args = connect_args
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0,
+            'checkouts': 0,
+            'reconnects': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'in_use': 0
+        }
+    
+    def _count(self, key: str, delta: int = 1):
+        with self._lock:
+            self._stats[key] += delta
+    
+    def _open(self):
+        """Open a new connection; autocommit keeps pooled reads from pinning old snapshots"""
+        connection = mysql_connector.connect(autocommit=True, **self.connect_args)
+        self._count('created')
+        return connection
+    
+    def _healthy(self, connection, idle_since: float) -> bool:
+        """Ping connections that sat idle long enough to have gone stale"""
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except mysql_connector.Error:
+            return False
+    
+    def _close(self, connection):
+        try:
+            connection.close()
+        except mysql_connector.Error:
+            pass
+    
+    def acquire(self):
+        """Borrow a healthy connection, opening or reconnecting one if needed"""
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count('timeouts')
+            raise mysql_connector.Error(msg=f"Connection pool exhausted ({self.size} connections in use)")
+        
+        try:
+            try:
+                connection, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._open()
+            else:
+                if not self._healthy(connection, idle_since):
+                    self._close(connection)
+                    self._count('reconnects')
+                    connection = self._open()
+        except Exception:
+            self._slots.release()
+            raise
+        
+        self._count('checkouts')
+        self._count('in_use')
+        return connection
+    
+    def release(self, connection, broken: bool = False):
+        """Return a connection to the pool, dropping it if it is broken"""
+        self._count('in_use', -1)
+        try:
+            if broken:
+                self._close(connection)
+                self._count('discarded')
+            else:
+                self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+    
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+                self._close(connection)
+            except queue.Empty:
+                break
+    
+    def stats(self) -> Dict:
+        """Snapshot of pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        return stats
+
 class DatabaseConnection:
     def __init__(self):
         self.host = os.getenv('DB_HOST', 'localhost')
@@ -12,20 +207,43 @@ class DatabaseConnection:
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD', '')
         self.connection = None
+        
+        # DB_POOL_SIZE=0 falls back to one connection per call
+        self.pool_size = int(os.getenv('DB_POOL_SIZE', 5))
+        self.pool_timeout = float(os.getenv('DB_POOL_TIMEOUT', 5))
+        self.pool_ping_interval = float(os.getenv('DB_POOL_PING_INTERVAL', 30))
+        self.pool = None
+        self._pool_lock = threading.Lock()
+    
+    def connect_args(self) -> Dict:
+        return {
+            'host': self.host,
+            'database': self.database,
+            'user': self.user,
+            'password': self.password
+        }
+    
+    def get_pool(self):
+        """Create the connection pool on first use"""
+        if self.pool is None and self.pool_size > 0:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = ConnectionPool(
+                        self.connect_args(),
+                        size=self.pool_size,
+                        timeout=self.pool_timeout,
+                        ping_interval=self.pool_ping_interval
+                    )
+        return self.pool
     
     def connect(self):
         """Create database connection"""
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
+            self.connection = mysql_connector.connect(**self.connect_args())
             
             if self.connection.is_connected():
                 return self.connection
-        except Error as e:
+        except mysql_connector.Error as e:
             print(f"Error connecting to MySQL: {e}")
             return None
     
@@ -34,149 +252,251 @@ class DatabaseConnection:
         if self.connection and self.connection.is_connected():
             self.connection.close()
     
-    def fetch_all_data(self):
-        """Fetch all professor, subject, and schedule data with attachments"""
+    @contextmanager
+    def borrow(self):
+        """Yield a connection from the pool (or a fresh one when pooling is off)"""
+        pool = self.get_pool()
+        
+        if pool is None:
+            connection = None
+            try:
+                connection = mysql_connector.connect(**self.connect_args())
+            except mysql_connector.Error as e:
+                print(f"Error connecting to MySQL: {e}")
+            try:
+                yield connection
+            finally:
+                if connection and connection.is_connected():
+                    connection.close()
+            return
+        
         try:
-            connection = self.connect()
-            if not connection:
-                return []
-            
-            cursor = connection.cursor(dictionary=True)
-            
-            query = """
-                SELECT 
-                    p.id as professor_id,
-                    p.name as professor_name,
-                    p.department,
-                    p.contact,
-                    p.email,
-                    p.office_location,
-                    p.bio,
-                    p.image_url,
-                    s.id as subject_id,
-                    s.subject_code,
-                    s.subject_name,
-                    s.description as subject_description,
-                    s.units,
-                    sch.id as schedule_id,
-                    sch.classroom,
-                    sch.day,
-                    sch.time_start,
-                    sch.time_end,
-                    sch.semester,
-                    sch.academic_year,
-                    sch.section,
-                    sch.description as schedule_description
-                FROM professors p
-                LEFT JOIN subjects s ON p.id = s.professor_id
-                LEFT JOIN schedules sch ON p.id = sch.professor_id AND s.id = sch.subject_id
-                ORDER BY p.name, s.subject_code, sch.day, sch.time_start
-            """
-            
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            cursor.close()
-            self.disconnect()
-            
-            return results
+            connection = pool.acquire()
+        except mysql_connector.Error as e:
+            print(f"Error connecting to MySQL: {e}")
+            yield None
+            return
         
-        except Error as e:
-            print(f"Error fetching data: {e}")
+        broken = False
+        try:
+            yield connection
+        except BaseException:
+            # Includes GeneratorExit from an abandoned streaming read
+            broken = True
+            raise
+        finally:
+            pool.release(connection, broken=broken)
+    
+    def pool_stats(self) -> Dict:
+        """Pool counters for the health endpoint"""
+        if self.pool_size <= 0:
+            return {'enabled': False}
+        
+        pool = self.pool
+        if pool is None:
+            return {'enabled': True, 'size': self.pool_size, 'created': 0, 'in_use': 0, 'idle': 0}
+        
+        stats = pool.stats()
+        stats['enabled'] = True
+        return stats
+    
+    def fetch_all_data(self, professor_ids=None):
+        """Fetch all professor, subject, and schedule data with attachments
+        
+        When professor_ids is given only those professors are fetched.
+        """
+        try:
+            return list(self.iter_all_data(professor_ids))
+        except CatalogFetchError:
             return []
     
+    def iter_all_data(self, professor_ids=None, batch_size: int = 1000):
+        """Stream the joined catalog rows in batches instead of one fetchall()
+        
+        Raises CatalogFetchError on failure so a broken read is never
+        mistaken for an empty catalog.
+        """
+        if professor_ids is not None and not professor_ids:
+            return
+        
+        try:
+            with self.borrow() as connection:
+                if not connection:
+                    raise CatalogFetchError("No database connection")
+                
+                cursor = connection.cursor(dictionary=True)
+                
+                # Only the database's share: the caller consumes rows between batches
+                with db_query('catalog'):
+                    if professor_ids is None:
+                        cursor.execute(CATALOG_QUERY.format(where=""))
+                    else:
+                        ids = list(professor_ids)
+                        placeholders = ", ".join(["%s"] * len(ids))
+                        cursor.execute(CATALOG_QUERY.format(where=f"WHERE p.id IN ({placeholders})"), ids)
+                
+                while True:
+                    with db_query('catalog_fetch'):
+                        rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+                
+                cursor.close()
+        
+        except mysql_connector.Error as e:
+            print(f"Error fetching data: {e}")
+            raise CatalogFetchError(str(e)) from e
+    
+    def fetch_server_time(self):
+        """Current database server time, used as the reload watermark"""
+        try:
+            with self.borrow() as connection:
+                if not connection:
+                    return None
+                
+                with db_query('server_time'):
+                    cursor = connection.cursor()
+                    cursor.execute("SELECT NOW()")
+                    (server_time,) = cursor.fetchone()
+                    cursor.close()
+                
+                return server_time
+        
+        except mysql_connector.Error as e:
+            print(f"Error fetching server time: {e}")
+            return None
+    
+    def fetch_catalog_ids(self):
+        """Fetch every professor, subject and schedule id for delete detection
+        
+        'subject_fields' carries each subject's displayed columns so edits to
+        existing subjects are noticed too. Returns None on error so a failed query is never mistaken for an
+        empty catalog.
+        """
+        try:
+            with self.borrow() as connection:
+                if not connection:
+                    return None
+                
+                with db_query('catalog_ids'):
+                    cursor = connection.cursor()
+                    
+                    cursor.execute("SELECT id FROM professors")
+                    professors = {row[0] for row in cursor.fetchall()}
+                    
+                    cursor.execute(SUBJECT_FINGERPRINT_QUERY)
+                    subjects, subject_fields = subject_fingerprints(cursor.fetchall())
+                    
+                    # Only schedules that fetch_all_data can join to a subject
+                    cursor.execute(JOINABLE_SCHEDULES_QUERY)
+                    schedules = dict(cursor.fetchall())
+                    
+                    cursor.close()
+                
+                return {
+                    'professors': professors,
+                    'subjects': subjects,
+                    'subject_fields': subject_fields,
+                    'schedules': schedules
+                }
+        
+        except mysql_connector.Error as e:
+            print(f"Error fetching catalog ids: {e}")
+            return None
+    
+    def fetch_changed_professor_ids(self, since):
+        """Ids of professors whose own row, subjects or schedules changed since a watermark"""
+        try:
+            with self.borrow() as connection:
+                if not connection:
+                    return None
+                
+                with db_query('changed_professors'):
+                    cursor = connection.cursor()
+                    
+                    cursor.execute(CHANGED_PROFESSORS_QUERY, (since, since, since))
+                    results = {row[0] for row in cursor.fetchall()}
+                    
+                    cursor.close()
+                
+                return results
+        
+        except mysql_connector.Error as e:
+            print(f"Error fetching changed professors: {e}")
+            return None
+    
     def fetch_attachments(self, professor_id=None, schedule_id=None):
         """Fetch attachments for a professor or schedule"""
         try:
-            connection = self.connect()
-            if not connection:
-                return []
-            
-            cursor = connection.cursor(dictionary=True)
-            
-            if professor_id:
-                query = """
-                    SELECT 
-                        a.id,
-                        a.file_name,
-                        a.file_path,
-                        a.file_type,
-                        a.description,
-                        a.schedule_id,
-                        s.subject_name,
-                        s.subject_code
-                    FROM attachments a
-                    LEFT JOIN schedules sch ON a.schedule_id = sch.id
-                    LEFT JOIN subjects s ON sch.subject_id = s.id
-                    WHERE a.professor_id = %s
-                    ORDER BY a.created_at DESC
-                """
-                cursor.execute(query, (professor_id,))
-            elif schedule_id:
-                query = """
-                    SELECT 
-                        a.id,
-                        a.file_name,
-                        a.file_path,
-                        a.file_type,
-                        a.description
-                    FROM attachments a
-                    WHERE a.schedule_id = %s
-                    ORDER BY a.created_at DESC
-                """
-                cursor.execute(query, (schedule_id,))
-            else:
-                return []
-            
-            results = cursor.fetchall()
-            
-            cursor.close()
-            self.disconnect()
-            
-            return results
+            with self.borrow() as connection:
+                if not connection:
+                    return []
+                
+                with db_query('attachments'):
+                    cursor = connection.cursor(dictionary=True)
+                    
+                    if professor_id:
+                        query = """
+                            SELECT 
+                                a.id,
+                                a.file_name,
+                                a.file_path,
+                                a.file_type,
+                                a.description,
+                                a.schedule_id,
+                                s.subject_name,
+                                s.subject_code
+                            FROM attachments a
+                            LEFT JOIN schedules sch ON a.schedule_id = sch.id
+                            LEFT JOIN subjects s ON sch.subject_id = s.id
+                            WHERE a.professor_id = %s
+                            ORDER BY a.created_at DESC
+                        """
+                        cursor.execute(query, (professor_id,))
+                    elif schedule_id:
+                        query = """
+                            SELECT 
+                                a.id,
+                                a.file_name,
+                                a.file_path,
+                                a.file_type,
+                                a.description
+                            FROM attachments a
+                            WHERE a.schedule_id = %s
+                            ORDER BY a.created_at DESC
+                        """
+                        cursor.execute(query, (schedule_id,))
+                    else:
+                        return []
+                    
+                    results = cursor.fetchall()
+                    
+                    cursor.close()
+                
+                return results
         
-        except Error as e:
+        except mysql_connector.Error as e:
             print(f"Error fetching attachments: {e}")
             return []
     
-    def search_professors(self, query):
-        """Search professors by name, department, or subject"""
+    def fetch_all_attachments(self):
+        """Fetch every attachment in one query, newest first"""
         try:
-            connection = self.connect()
-            if not connection:
-                return []
-            
-            cursor = connection.cursor(dictionary=True)
-            
-            search_query = f"%{query}%"
-            
-            query_sql = """
-                SELECT DISTINCT
-                    p.id,
-                    p.name,
-                    p.department,
-                    p.email,
-                    p.office_location,
-                    p.bio,
-                    p.image_url
-                FROM professors p
-                LEFT JOIN subjects s ON p.id = s.professor_id
-                WHERE p.name LIKE %s
-                   OR p.department LIKE %s
-                   OR s.subject_name LIKE %s
-                   OR s.subject_code LIKE %s
-                ORDER BY p.name
-                LIMIT 10
-            """
-            
-            cursor.execute(query_sql, (search_query, search_query, search_query, search_query))
-            results = cursor.fetchall()
-            
-            cursor.close()
-            self.disconnect()
-            
-            return results
+            with self.borrow() as connection:
+                if not connection:
+                    return []
+                
+                with db_query('all_attachments'):
+                    cursor = connection.cursor(dictionary=True)
+                    
+                    cursor.execute(ALL_ATTACHMENTS_QUERY)
+                    results = cursor.fetchall()
+                    
+                    cursor.close()
+                
+                return results
         
-        except Error as e:
-            print(f"Error searching professors: {e}")
+        except mysql_connector.Error as e:
+            print(f"Error fetching attachments: {e}")
             return []
@@ -0,0 +1,178 @@
+import os
+import re
+from typing import Dict, Tuple, Union
+from preprocessing import NormalizedMessage
+
+# Specific emotions in priority order: the first category found in a message wins
+EMOTION_KEYWORDS = [
+    ('loving', '💕', ['love', 'loving', 'adore', 'i love you']),
+    ('grateful', '🙏', ['thanks', 'thank you', 'appreciate', 'grateful', 'tysm', 'thx']),
+    ('sad', '😢', ['sad', 'depressed', 'upset', 'crying', 'unhappy', 'miserable']),
+    ('angry', '😠', ['angry', 'mad', 'furious', 'annoyed', 'irritated', 'pissed']),
+    ('tired', '😴', ['tired', 'exhausted', 'sleepy', 'fatigue', 'burned out', 'drained']),
+    ('stressed', '😰', ['stressed', 'stressed out', 'anxious', 'worried', 'nervous', 'overwhelmed']),
+    ('bored', '😑', ['bored', 'boring', 'dull', 'meh']),
+    ('excited', '🤩', ['excited', 'awesome', 'amazing', 'fantastic', 'wonderful', 'yay', 'woohoo']),
+    ('happy', '😊', ['happy', 'glad', 'joyful', 'cheerful', 'delighted', 'pleased']),
+    ('confused', '😕', ['confused', 'lost', "don't understand", 'unclear', 'puzzled']),
+    ('needy', '🆘', ['help', 'please', 'need', 'urgent', 'asap']),
+    ('content', '🙂', ['great', 'good', 'fine', 'okay', 'alright']),
+]
+
+# word -> (polarity, subjectivity), on the same -1..1 / 0..1 scales TextBlob uses
+SENTIMENT_LEXICON = {
+    'amazing': (0.6, 0.9), 'awesome': (1.0, 1.0), 'beautiful': (0.85, 1.0), 'best': (1.0, 0.3),
+    'better': (0.5, 0.5), 'brilliant': (0.9, 1.0), 'cheerful': (0.8, 1.0), 'cool': (0.35, 0.65),
+    'delighted': (0.7, 0.7), 'easy': (0.43, 0.83), 'excellent': (1.0, 1.0), 'excited': (0.38, 0.75),
+    'fantastic': (0.4, 0.9), 'fine': (0.42, 0.5), 'fun': (0.3, 0.2), 'glad': (0.5, 1.0),
+    'good': (0.7, 0.6), 'grateful': (0.6, 0.75), 'great': (0.8, 0.75), 'happy': (0.8, 1.0),
+    'helpful': (0.5, 0.5), 'interesting': (0.5, 0.5), 'joyful': (0.8, 0.9), 'kind': (0.6, 0.9),
+    'love': (0.5, 0.6), 'lovely': (0.5, 0.75), 'nice': (0.6, 1.0), 'perfect': (1.0, 1.0),
+    'pleased': (0.5, 1.0), 'smart': (0.21, 0.64), 'super': (0.33, 0.67), 'sweet': (0.35, 0.65),
+    'thank': (0.2, 0.2), 'thanks': (0.2, 0.2), 'well': (0.2, 0.3), 'wonderful': (1.0, 1.0),
+    'yay': (0.5, 0.7),
+    'angry': (-0.5, 1.0), 'annoyed': (-0.4, 0.8), 'annoying': (-0.8, 0.9), 'awful': (-1.0, 1.0),
+    'bad': (-0.7, 0.67), 'boring': (-1.0, 1.0), 'bored': (-0.5, 1.0), 'confused': (-0.4, 0.7),
+    'confusing': (-0.3, 0.6), 'depressed': (-0.4, 0.6), 'difficult': (-0.5, 1.0), 'dull': (-0.31, 0.69),
+    'exhausted': (-0.4, 0.6), 'frustrated': (-0.7, 0.4), 'frustrating': (-0.6, 0.6), 'furious': (-0.75, 1.0),
+    'hard': (-0.29, 0.54), 'hate': (-0.8, 0.9), 'horrible': (-1.0, 1.0), 'lost': (-0.2, 0.3),
+    'mad': (-0.62, 1.0), 'miserable': (-1.0, 1.0), 'nervous': (-0.2, 0.7), 'poor': (-0.4, 0.6),
+    'sad': (-0.5, 1.0), 'sick': (-0.71, 0.86), 'stressed': (-0.4, 0.7), 'stupid': (-0.8, 1.0),
+    'terrible': (-1.0, 1.0), 'tired': (-0.4, 0.7), 'unclear': (-0.1, 0.4), 'unhappy': (-0.6, 0.9),
+    'upset': (-0.5, 0.8), 'urgent': (-0.1, 0.4), 'worried': (-0.3, 0.6), 'worst': (-1.0, 1.0),
+    'wrong': (-0.5, 0.9),
+}
+
+NEGATIONS = {'not', 'no', 'never', "don't", "dont", "isn't", "isnt", "wasn't", "can't", "cant", "didn't", "won't"}
+
+INTENSIFIERS = {'very': 1.3, 'really': 1.3, 'so': 1.3, 'extremely': 1.5, 'super': 1.3, 'too': 1.2, 'quite': 1.1}
+
+# Whole-word keyword match with common inflections ('loved', 'needs', 'helping')
+KEYWORD_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(
+        (re.escape(keyword) for _, _, keywords in EMOTION_KEYWORDS for keyword in keywords),
+        key=len, reverse=True
+    )) + r")(?:s|es|d|ed|ing|ly)?\b"
+)
+
+# keyword -> index of its category in EMOTION_KEYWORDS
+KEYWORD_CATEGORY = {
+    keyword: rank
+    for rank, (_, _, keywords) in reversed(list(enumerate(EMOTION_KEYWORDS)))
+    for keyword in keywords
+}
+
+
+def classify_polarity(polarity: float) -> Tuple[str, str]:
+    """Base emotion and emoji from a polarity score"""
+    if polarity > 0.5:
+        return "very_happy", "😊"
+    elif polarity > 0.1:
+        return "happy", "🙂"
+    elif polarity < -0.5:
+        return "very_sad", "😢"
+    elif polarity < -0.1:
+        return "sad", "😕"
+    return "neutral", "😐"
+
+
+def specific_emotion(text_lower: str):
+    """Highest priority emotion keyword category in the text, or None"""
+    ranks = {KEYWORD_CATEGORY[match.group(1)] for match in KEYWORD_PATTERN.finditer(text_lower)}
+    if not ranks:
+        return None
+    category, category_emoji, _ = EMOTION_KEYWORDS[min(ranks)]
+    return category, category_emoji
+
+
+class LexiconEmotionBackend:
+    """Fast polarity scoring from a precompiled word lexicon"""
+
+    name = 'lexicon'
+
+    def polarity(self, message: NormalizedMessage) -> Tuple[float, float]:
+        """Average polarity and subjectivity of the sentiment words, with negation and intensifiers"""
+        polarities = []
+        subjectivities = []
+        modifier = 1.0
+        negate = False
+
+        for word in message.tokens:
+            if word in NEGATIONS:
+                negate = True
+                continue
+            if word in INTENSIFIERS:
+                modifier *= INTENSIFIERS[word]
+                continue
+
+            scores = SENTIMENT_LEXICON.get(word)
+            if scores:
+                polarity, subjectivity = scores
+                polarity = max(-1.0, min(1.0, polarity * modifier))
+                if negate:
+                    # Same damping TextBlob applies: "not good" is mildly negative
+                    polarity *= -0.5
+                polarities.append(polarity)
+                subjectivities.append(min(1.0, subjectivity * modifier))
+
+            modifier = 1.0
+            negate = False
+
+        if not polarities:
+            return 0.0, 0.0
+        return sum(polarities) / len(polarities), sum(subjectivities) / len(subjectivities)
+
+
+class TextBlobEmotionBackend:
+    """Slower but more accurate polarity scoring with TextBlob's pattern analyzer"""
+
+    name = 'textblob'
+
+    def __init__(self):
+        from textblob import TextBlob
+        self._textblob = TextBlob
+
+    def polarity(self, message: NormalizedMessage) -> Tuple[float, float]:
+        sentiment = self._textblob(message.text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+
+
+EMOTION_BACKENDS = {
+    'lexicon': LexiconEmotionBackend,
+    'textblob': TextBlobEmotionBackend
+}
+
+
+class EmotionDetector:
+    """Detect emotions and sentiment from user messages
+
+    The polarity backend is pluggable: the lexicon backend is the default and
+    EMOTION_BACKEND=textblob selects TextBlob for more accurate scoring.
+    """
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = os.getenv('EMOTION_BACKEND', 'lexicon')
+        if isinstance(backend, str):
+            backend = EMOTION_BACKENDS[backend]()
+        self.backend = backend
+
+    def analyze_sentiment(self, text: Union[str, NormalizedMessage]) -> Dict:
+        """Analyze sentiment and emotion of text"""
+        message = NormalizedMessage.of(text)
+
+        polarity, subjectivity = self.backend.polarity(message)
+
+        emotion, emoji = classify_polarity(polarity)
+
+        # Check for specific emotions
+        specific = specific_emotion(message.lower)
+        if specific:
+            emotion, emoji = specific
+
+        return {
+            'polarity': polarity,
+            'subjectivity': subjectivity,
+            'emotion': emotion,
+            'emoji': emoji
+        }
@@ -0,0 +1,597 @@
+import heapq
+import importlib.util
+import math
+import os
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
+from lazy_imports import LazyModule
+from models import Professor
+from preprocessing import NormalizedMessage, strip_titles, token_sort_key, tokenize
+
+# fuzzywuzzy is only imported once the first index is built
+fuzz = LazyModule('fuzzywuzzy.fuzz')
+
+# Compiled scorer used instead of fuzzywuzzy when it is installed
+rapidfuzz_fuzz = LazyModule('rapidfuzz.fuzz')
+rapidfuzz_process = LazyModule('rapidfuzz.process')
+numpy = LazyModule('numpy')
+
+# Queries scored per cdist call, bounding the score matrix to this many rows
+MATRIX_CHUNK = 256
+
+# Words that carry no information when searching subject names
+SUBJECT_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'about', 'class', 'classes', 'course', 'courses', 'does', 'find',
+    'for', 'handles', 'i', 'in', 'is', 'me', 'of', 'on', 'professor', 'prof', 'show', 'subject',
+    'subjects', 'teach', 'teaches', 'teaching', 'the', 'to', 'what', 'who', 'whos', 'with'
+}
+
+
+def normalize_code(code: str) -> str:
+    """Canonical form of a subject code, e.g. 'cs 301' -> 'CS301'"""
+    return re.sub(r'[^A-Za-z0-9]', '', code or '').upper()
+
+
+def fuzzy_backend() -> str:
+    """'rapidfuzz' when it and NumPy are installed, else 'fuzzywuzzy'
+
+    FUZZY_BACKEND=fuzzywuzzy forces the fallback. Only the package specs are
+    checked, so nothing is imported here.
+    """
+    choice = os.getenv('FUZZY_BACKEND', 'auto')
+    if choice == 'fuzzywuzzy':
+        return choice
+    if importlib.util.find_spec('rapidfuzz') and importlib.util.find_spec('numpy'):
+        return 'rapidfuzz'
+    return 'fuzzywuzzy'
+
+
+def trigrams(key: str) -> set:
+    """Character trigrams of a normalized key, padded at the word edges"""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def moved_positions(before: List[Professor], positions: Dict, changed: set) -> List[Optional[int]]:
+    """New position of each professor of a base index, None if changed or gone"""
+    return [None if prof.id in changed else positions.get(prof.id) for prof in before]
+
+
+def remap_postings(postings: Dict, moved: List[Optional[int]]) -> defaultdict:
+    """Postings with base positions moved to a patched index; dropped positions go"""
+    remapped = defaultdict(list)
+    for term, positions in postings.items():
+        kept = [moved[position] for position in positions if moved[position] is not None]
+        if kept:
+            remapped[term] = kept
+    return remapped
+
+
+class ProfessorNameIndex:
+    """Precompiled professor name index for fuzzy lookups
+
+    Names are title-stripped and token-sorted once at build time, so scoring
+    a query is a plain ratio against each key (token_sort_ratio semantics).
+    With rapidfuzz, queries are scored against every key in one cdist call;
+    the fuzzywuzzy fallback scores the professors that share a name token or
+    trigram with the query first, then only the names long or short enough
+    to still beat the best score. Both give process.extractOne()'s answer.
+    """
+
+    def __init__(self, professors: List[Professor], threshold: int = 60, max_candidates: int = 100):
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.backend = fuzzy_backend()
+        self.by_id = {}
+        self.keys = []
+        self.professors = []
+        self.token_buckets = defaultdict(list)
+        self.trigram_postings = defaultdict(list)
+        self.length_buckets = defaultdict(list)
+
+        for position, prof in enumerate(professors):
+            key = token_sort_key(strip_titles(prof.name))
+            self.by_id[prof.id] = prof
+            self.keys.append(key)
+            self.professors.append(prof)
+            self._index_key(position, key)
+
+    def _index_key(self, position: int, key: str):
+        self.length_buckets[len(key)].append(position)
+        for token in set(key.split()):
+            self.token_buckets[token].append(position)
+        for gram in trigrams(key):
+            self.trigram_postings[gram].append(position)
+
+    @classmethod
+    def patched(cls, base: 'ProfessorNameIndex', professors: List[Professor], changed: set) -> 'ProfessorNameIndex':
+        """Index for professors that only normalizes the names of changed ids
+
+        Unchanged professors keep their key and postings from base, moved to
+        their new positions.
+        """
+        index = cls([], threshold=base.threshold, max_candidates=base.max_candidates)
+        index.professors = list(professors)
+        index.by_id = {prof.id: prof for prof in professors}
+        positions = {prof.id: position for position, prof in enumerate(professors)}
+        moved = moved_positions(base.professors, positions, changed)
+
+        index.keys = [None] * len(professors)
+        for old, new in enumerate(moved):
+            if new is not None:
+                index.keys[new] = base.keys[old]
+        index.token_buckets = remap_postings(base.token_buckets, moved)
+        index.trigram_postings = remap_postings(base.trigram_postings, moved)
+        index.length_buckets = remap_postings(base.length_buckets, moved)
+
+        for position, prof in enumerate(professors):
+            if index.keys[position] is None:
+                key = token_sort_key(strip_titles(prof.name))
+                index.keys[position] = key
+                index._index_key(position, key)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.professors)
+
+    def state(self) -> Dict:
+        """Precomputed index data, positions only, for the shared snapshot file"""
+        return {
+            'threshold': self.threshold,
+            'max_candidates': self.max_candidates,
+            'keys': self.keys,
+            'token_buckets': dict(self.token_buckets),
+            'trigram_postings': dict(self.trigram_postings)
+        }
+
+    @classmethod
+    def from_state(cls, professors: List[Professor], state: Dict) -> 'ProfessorNameIndex':
+        """Rebuild an index from state() without re-normalizing every name"""
+        index = cls([], threshold=state['threshold'], max_candidates=state['max_candidates'])
+        index.professors = list(professors)
+        index.by_id = {prof.id: prof for prof in professors}
+        index.keys = state['keys']
+        index.token_buckets.update(state['token_buckets'])
+        index.trigram_postings.update(state['trigram_postings'])
+        for position, key in enumerate(index.keys):
+            index.length_buckets[len(key)].append(position)
+        return index
+
+    def get(self, professor_id) -> Optional[Professor]:
+        """Return a professor by id"""
+        return self.by_id.get(professor_id)
+
+    def candidates(self, query_key: str) -> List[int]:
+        """Positions of professors worth scoring against the query"""
+        overlap = defaultdict(int)
+        for gram in trigrams(query_key):
+            for position in self.trigram_postings.get(gram, ()):
+                overlap[position] += 1
+
+        # An exact name token is a stronger signal than any trigram count
+        for token in set(query_key.split()):
+            for position in self.token_buckets.get(token, ()):
+                overlap[position] += len(token)
+
+        if not overlap:
+            return []
+
+        ranked = sorted(overlap, key=lambda position: (-overlap[position], position))
+        return sorted(ranked[:self.max_candidates])
+
+    def find(self, query: Union[str, NormalizedMessage]) -> Optional[Professor]:
+        """Return the best professor match scoring at least the threshold"""
+        if not self.professors:
+            return None
+        return self.find_key(NormalizedMessage.of(query).name_key)
+
+    def find_many(self, queries: List[Union[str, NormalizedMessage]]) -> List[Optional[Professor]]:
+        """Match a batch of queries in one pass; repeated names are scored once"""
+        if not self.professors:
+            return [None] * len(queries)
+
+        keys = [NormalizedMessage.of(query).name_key for query in queries]
+        unique = [key for key in set(keys) if key]
+        if self.backend == 'rapidfuzz':
+            matches = dict(zip(unique, self.match_matrix(unique)))
+        else:
+            matches = {key: self.match_candidates(key) for key in unique}
+        return [matches.get(key) for key in keys]
+
+    def find_key(self, query_key: str) -> Optional[Professor]:
+        """Best match for an already normalized query key"""
+        if not query_key:
+            return None
+        if self.backend == 'rapidfuzz':
+            return self.match_matrix([query_key])[0]
+        return self.match_candidates(query_key)
+
+    def mentioned(self, query: Union[str, NormalizedMessage]) -> Optional[Professor]:
+        """Professor whose full name appears word for word in a longer message
+
+        Not part of find(): the fuzzy ratio is taken over the whole message,
+        so a name inside a long sentence ("where is Dr. Pedro Dela Cruz's
+        office? I need to see him") scores below the threshold. Chat answers
+        try this after find() fails. Names of two or more tokens that are all
+        present count; the longest such name wins.
+        """
+        query_key = NormalizedMessage.of(query).name_key
+        hits = defaultdict(int)
+        for token in set(query_key.split()):
+            for position in self.token_buckets.get(token, ()):
+                hits[position] += 1
+
+        best_position = None
+        best_size = 0
+        for position, count in hits.items():
+            size = len(set(self.keys[position].split()))
+            if size < 2 or count != size:
+                continue
+            if size > best_size or (size == best_size and position < best_position):
+                best_position = position
+                best_size = size
+
+        if best_position is None:
+            return None
+        return self.professors[best_position]
+
+    def match_matrix(self, query_keys: List[str]) -> List[Optional[Professor]]:
+        """Score query keys against every name key with rapidfuzz's cdist"""
+        matches = []
+        for start in range(0, len(query_keys), MATRIX_CHUNK):
+            chunk = query_keys[start:start + MATRIX_CHUNK]
+            scores = rapidfuzz_process.cdist(chunk, self.keys, scorer=rapidfuzz_fuzz.ratio, dtype=numpy.float64)
+            # Round half to even like fuzzywuzzy, so the threshold and the
+            # first-best tie rule give exactly the same answers
+            scores = numpy.rint(scores)
+            best = scores.argmax(axis=1)
+
+            for row, position in enumerate(best):
+                if scores[row, position] >= self.threshold:
+                    matches.append(self.professors[position])
+                else:
+                    matches.append(None)
+        return matches
+
+    def match_candidates(self, query_key: str) -> Optional[Professor]:
+        """Best match with fuzzywuzzy; the same answer as scoring every name
+
+        The trigram candidates are scored first so the best score is high
+        early. Every other name whose length still allows it to beat or tie
+        that score is scored as well, so pruning never changes the winner.
+        Ties go to the earliest name, as with process.extractOne().
+        """
+        ratio = fuzz.ratio
+        keys = self.keys
+        query_len = len(query_key)
+        best_score = self.threshold - 1
+        best_position = len(keys)
+
+        candidates = self.candidates(query_key)
+        for position in candidates:
+            score = ratio(query_key, keys[position])
+            if score > best_score or (score == best_score and position < best_position):
+                best_score = score
+                best_position = position
+
+        scored = set(candidates)
+        for length, positions in self.length_buckets.items():
+            # ratio() can never exceed this bound for a key of this length
+            total = query_len + length
+            bound = (200 * min(query_len, length) + total - 1) // total
+            if bound < best_score:
+                continue
+
+            for position in positions:
+                if position in scored or (bound == best_score and position > best_position):
+                    continue
+                score = ratio(query_key, keys[position])
+                if score > best_score or (score == best_score and position < best_position):
+                    best_score = score
+                    best_position = position
+
+        if best_score < self.threshold:
+            return None
+        return self.professors[best_position]
+
+
+class SubjectIndex:
+    """Inverted index over every (professor, subject) pair in the catalog
+
+    Subject names are tokenized into a postings map and subject codes are kept
+    both in an exact map and a sorted list for prefix lookups, so a search only
+    touches the postings of the query tokens.
+    """
+
+    def __init__(self, professors: List[Professor]):
+        self.entries = []
+        self.by_code = defaultdict(list)
+        self.postings = defaultdict(list)
+
+        for prof in professors:
+            for subject in prof.subjects:
+                position = len(self.entries)
+                self.entries.append({
+                    'professor': prof,
+                    'subject': subject
+                })
+                self._index_subject(position, subject)
+
+        self.sorted_codes = sorted(self.by_code)
+
+    def _index_subject(self, position: int, subject):
+        code = normalize_code(subject.code)
+        if code:
+            self.by_code[code].append(position)
+
+        for token in set(tokenize(subject.name or '')):
+            if token not in SUBJECT_STOPWORDS:
+                self.postings[token].append(position)
+
+    @classmethod
+    def patched(cls, base: 'SubjectIndex', professors: List[Professor], changed: set) -> 'SubjectIndex':
+        """Index for professors that only tokenizes the subjects of changed ids"""
+        index = cls([])
+        by_professor = defaultdict(list)
+        for position, entry in enumerate(base.entries):
+            by_professor[entry['professor'].id].append(position)
+
+        moved = [None] * len(base.entries)
+        added = []
+        for prof in professors:
+            if prof.id not in changed and prof.id in by_professor:
+                for old in by_professor[prof.id]:
+                    moved[old] = len(index.entries)
+                    index.entries.append(base.entries[old])
+                continue
+
+            for subject in prof.subjects:
+                added.append((len(index.entries), subject))
+                index.entries.append({
+                    'professor': prof,
+                    'subject': subject
+                })
+
+        index.by_code = remap_postings(base.by_code, moved)
+        index.postings = remap_postings(base.postings, moved)
+        for position, subject in added:
+            index._index_subject(position, subject)
+        index.sorted_codes = sorted(index.by_code)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def state(self, professors: List[Professor]) -> Dict:
+        """Precomputed index data, positions only, for the shared snapshot file"""
+        prof_positions = {prof.id: position for position, prof in enumerate(professors)}
+        entries = []
+        for entry in self.entries:
+            prof = entry['professor']
+            entries.append((prof_positions[prof.id], prof.subjects.index(entry['subject'])))
+
+        return {
+            'entries': entries,
+            'by_code': dict(self.by_code),
+            'postings': dict(self.postings)
+        }
+
+    @classmethod
+    def from_state(cls, professors: List[Professor], state: Dict) -> 'SubjectIndex':
+        """Rebuild an index from state() without re-tokenizing every subject"""
+        index = cls([])
+        for prof_position, subject_position in state['entries']:
+            prof = professors[prof_position]
+            index.entries.append({
+                'professor': prof,
+                'subject': prof.subjects[subject_position]
+            })
+        index.by_code.update(state['by_code'])
+        index.postings.update(state['postings'])
+        index.sorted_codes = sorted(index.by_code)
+        return index
+
+    def codes_with_prefix(self, prefix: str) -> List[str]:
+        """Subject codes starting with prefix"""
+        codes = []
+        start = bisect_left(self.sorted_codes, prefix)
+        for code in self.sorted_codes[start:]:
+            if not code.startswith(prefix):
+                break
+            codes.append(code)
+        return codes
+
+    def lookup_codes(self, tokens: List[str], bigrams) -> List[int]:
+        """Entries whose code matches a token exactly or by prefix"""
+        # Codes are often typed with a space: 'CS 301'
+        candidates = set(tokens)
+        candidates.update(a + b for a, b in bigrams if a.isalpha() and b.isdigit())
+
+        positions = set()
+        for token in candidates:
+            # A code always carries its number, so bare words never hit the code maps
+            if token.isalpha():
+                continue
+
+            code = token.upper()
+            if code in self.by_code:
+                positions.update(self.by_code[code])
+            else:
+                for match in self.codes_with_prefix(code):
+                    positions.update(self.by_code[match])
+        return sorted(positions)
+
+    def lookup_names(self, tokens: List[str]) -> List[int]:
+        """Entries whose subject name shares the most tokens with the query"""
+        scores = defaultdict(int)
+        for token in set(tokens):
+            for position in self.postings.get(token, ()):
+                scores[position] += 1
+
+        if not scores:
+            return []
+
+        best = max(scores.values())
+        return sorted(position for position, score in scores.items() if score == best)
+
+    def lookup_code_families(self, tokens: List[str]) -> List[int]:
+        """Entries whose code starts with a bare department prefix such as 'math'"""
+        positions = set()
+        for token in set(tokens):
+            if len(token) < 3 or not token.isalpha() or token in SUBJECT_STOPWORDS:
+                continue
+            for match in self.codes_with_prefix(token.upper()):
+                positions.update(self.by_code[match])
+        return sorted(positions)
+
+    def search(self, query: Union[str, NormalizedMessage]) -> List[Dict]:
+        """Find (professor, subject) pairs mentioned in a free-form query"""
+        message = NormalizedMessage.of(query)
+        tokens = message.terms
+
+        positions = (self.lookup_codes(tokens, message.bigrams)
+                     or self.lookup_names(tokens)
+                     or self.lookup_code_families(tokens))
+        return [self.entries[position] for position in positions]
+
+
+class SearchIndex:
+    """BM25 inverted index over professors for ranked catalog search
+
+    Each professor is one document made of weighted fields, so a hit on the
+    name outranks the same word in a subject name or the department. Query
+    words with no exact postings fall back to the terms they are a prefix
+    of, which keeps partial words ('struct', 'calc') working the way the old
+    LIKE search did.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    # Term frequency weight of each field
+    FIELD_WEIGHTS = {'name': 3.0, 'code': 2.0, 'subject': 1.5, 'department': 1.0}
+
+    # Most vocabulary terms a prefix expands to
+    PREFIX_EXPANSIONS = 20
+
+    def __init__(self, professors: List[Professor]):
+        self.professors = list(professors)
+        self.postings = defaultdict(list)
+        self.lengths = []
+
+        for position, prof in enumerate(self.professors):
+            self.lengths.append(self._index_document(position, prof))
+
+        self._finish()
+
+    def _index_document(self, position: int, prof: Professor) -> float:
+        """Post one professor's weighted terms; returns the document length"""
+        frequencies = defaultdict(float)
+        for field, tokens in self.fields(prof):
+            weight = self.FIELD_WEIGHTS[field]
+            for token in tokens:
+                frequencies[token] += weight
+
+        for token, frequency in frequencies.items():
+            self.postings[token].append((position, frequency))
+        return sum(frequencies.values())
+
+    @classmethod
+    def patched(cls, base: 'SearchIndex', professors: List[Professor], changed: set) -> 'SearchIndex':
+        """Index for professors that only tokenizes the documents of changed ids"""
+        index = cls([])
+        index.professors = list(professors)
+        positions = {prof.id: position for position, prof in enumerate(professors)}
+        moved = moved_positions(base.professors, positions, changed)
+
+        index.lengths = [None] * len(professors)
+        for old, new in enumerate(moved):
+            if new is not None:
+                index.lengths[new] = base.lengths[old]
+        for term, postings in base.postings.items():
+            kept = [(moved[position], frequency) for position, frequency in postings if moved[position] is not None]
+            if kept:
+                index.postings[term] = kept
+
+        for position, prof in enumerate(professors):
+            if index.lengths[position] is None:
+                index.lengths[position] = index._index_document(position, prof)
+
+        index._finish()
+        return index
+
+    def _finish(self):
+        self.vocabulary = sorted(self.postings)
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.professors)
+
+    @staticmethod
+    def fields(prof: Professor):
+        """(field, tokens) pairs that make up a professor's document"""
+        yield 'name', tokenize(strip_titles(prof.name or ''))
+        yield 'department', tokenize(prof.department or '')
+        for subject in prof.subjects:
+            # 'CS 301' is searchable as a whole ('cs301') and by its parts
+            code = normalize_code(subject.code).lower()
+            parts = [token for token in tokenize(subject.code or '') if token != code]
+            yield 'code', ([code] if code else []) + parts
+            yield 'subject', [token for token in tokenize(subject.name or '') if token not in SUBJECT_STOPWORDS]
+
+    def state(self) -> Dict:
+        """Postings and document lengths for the shared snapshot file"""
+        return {'postings': dict(self.postings), 'lengths': self.lengths}
+
+    @classmethod
+    def from_state(cls, professors: List[Professor], state: Dict) -> 'SearchIndex':
+        """Rebuild an index from state() without re-tokenizing the catalog"""
+        index = cls([])
+        index.professors = list(professors)
+        index.postings.update(state['postings'])
+        index.lengths = list(state['lengths'])
+        index._finish()
+        return index
+
+    def expand(self, token: str) -> List[str]:
+        """The token itself if indexed, else the indexed terms it is a prefix of"""
+        if token in self.postings:
+            return [token]
+
+        terms = []
+        start = bisect_left(self.vocabulary, token)
+        for term in self.vocabulary[start:start + self.PREFIX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        return terms
+
+    def score(self, query: Union[str, NormalizedMessage]) -> Dict[int, float]:
+        """BM25 score of every professor matching at least one query term"""
+        tokens = [token for token in NormalizedMessage.of(query).stripped_terms if token not in SUBJECT_STOPWORDS]
+        # Codes are often typed with a space: 'CS 301'
+        tokens += [a + b for a, b in zip(tokens, tokens[1:]) if a.isalpha() and b.isdigit()]
+        count = len(self.professors)
+        scores = defaultdict(float)
+
+        for token in dict.fromkeys(tokens):
+            for term in self.expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for position, frequency in postings:
+                    norm = self.K1 * (1 - self.B + self.B * self.lengths[position] / self.average_length)
+                    scores[position] += idf * frequency * (self.K1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query: Union[str, NormalizedMessage], page: int = 1,
+               per_page: int = 10) -> Tuple[int, List[Tuple[Professor, float]]]:
+        """(total matches, one page of (professor, score)) ranked by relevance"""
+        scores = self.score(query)
+        end = page * per_page
+        ranked = heapq.nsmallest(
+            end, scores.items(),
+            key=lambda item: (-item[1], self.professors[item[0]].name or '', item[0])
+        )
+        return len(scores), [(self.professors[position], score) for position, score in ranked[end - per_page:end]]
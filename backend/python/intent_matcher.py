@@ -0,0 +1,124 @@
+from collections import deque
+from typing import Dict, List, Union
+from preprocessing import WORD_PATTERN, NormalizedMessage
+
+
+def tokenize_words(text: str) -> List[str]:
+    """Lowercase word tokens; apostrophes stay inside words such as "don't" """
+    return WORD_PATTERN.findall(text.lower())
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over the keyword phrases of every intent
+
+    The automaton runs over word tokens rather than characters, so keywords
+    only match whole words ('hi' no longer fires inside 'this' or 'history')
+    and one pass over the message scores every intent at once.
+    """
+
+    def __init__(self, intents: Dict[str, List[str]]):
+        self.intents = {intent: list(keywords) for intent, keywords in intents.items()}
+        self.order = {intent: rank for rank, intent in enumerate(self.intents)}
+
+        # Trie over token sequences: transitions, failure links, matched phrase ids
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._phrase_intents = []
+
+        phrase_ids = {}
+        for intent, keywords in self.intents.items():
+            for keyword in keywords:
+                phrase = tuple(tokenize_words(keyword))
+                if not phrase:
+                    continue
+                if phrase not in phrase_ids:
+                    phrase_ids[phrase] = self._add_phrase(phrase)
+                    self._phrase_intents.append([])
+                intents_for_phrase = self._phrase_intents[phrase_ids[phrase]]
+                if intent not in intents_for_phrase:
+                    intents_for_phrase.append(intent)
+
+        self._build_failure_links()
+
+    def _add_phrase(self, phrase) -> int:
+        state = 0
+        for token in phrase:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][token] = next_state
+            state = next_state
+
+        phrase_id = len(self._phrase_intents)
+        self._output[state] = (phrase_id,)
+        return phrase_id
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+
+                # A state also reports every phrase ending at its failure target
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @staticmethod
+    def _variants(token: str) -> List[str]:
+        """token plus its singular forms: a trailing plural 's'/'es' is tolerated"""
+        variants = [token]
+        if token.endswith('s') and len(token) > 3:
+            variants.append(token[:-1])
+            if token.endswith('es') and len(token) > 4:
+                variants.append(token[:-2])
+        return variants
+
+    def _step(self, state: int, token: str) -> int:
+        """Aho-Corasick transition on one exact token, following failure links"""
+        next_state = self._goto[state].get(token)
+        while next_state is None and state:
+            state = self._fail[state]
+            next_state = self._goto[state].get(token)
+        return next_state or 0
+
+    def scores(self, message: Union[str, NormalizedMessage]) -> Dict[str, int]:
+        """Number of distinct keywords of each intent found in the message
+
+        'teaches' is read both as itself and as 'teach', so the walk keeps a
+        small set of states, one per reading, instead of a single state.
+        """
+        matched = set()
+        states = {0}
+
+        for token in NormalizedMessage.of(message).tokens:
+            variants = self._variants(token)
+            states = {self._step(state, variant) for state in states for variant in variants}
+            for state in states:
+                matched.update(self._output[state])
+            # Every failure chain ends at the root, so it only needs keeping alone
+            states = (states - {0}) or {0}
+
+        intent_scores = {}
+        for phrase_id in matched:
+            for intent in self._phrase_intents[phrase_id]:
+                intent_scores[intent] = intent_scores.get(intent, 0) + 1
+        return intent_scores
+
+    def best(self, message: Union[str, NormalizedMessage], exclude=()) -> str:
+        """Highest scoring intent, leaving out exclude; ties go to the intent listed first"""
+        intent_scores = self.scores(message)
+        for intent in exclude:
+            intent_scores.pop(intent, None)
+        if not intent_scores:
+            return 'unknown'
+        return max(intent_scores, key=lambda intent: (intent_scores[intent], -self.order[intent]))
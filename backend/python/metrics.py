@@ -0,0 +1,261 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+
+# Upper bounds in seconds; the in-memory stages sit in the microsecond range
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+RELOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Every metric rendered by /metrics, in registration order
+REGISTRY = []
+
+# Finished requests whose stages are not yet in the histograms
+PENDING = deque()
+MAX_PENDING = int(os.getenv('METRICS_MAX_PENDING', '4096'))
+_fold_lock = threading.Lock()
+
+
+def metrics_enabled() -> bool:
+    """Stage timers run unless METRICS_ENABLED=0"""
+    return os.getenv('METRICS_ENABLED', '1') not in ('0', 'false')
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values, extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, format_labels(self.labelnames, labels), value) for labels, value in sorted(values.items())]
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels
+
+    observe() is one bisect and three increments under a lock; buckets are
+    only made cumulative when rendered.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                # One count per bucket plus +Inf, then sum and count
+                child = self._children[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            child[position] += 1
+            child[-2] += value
+            child[-1] += 1
+
+    def observe_many(self, observations: List[Tuple[float, tuple]]):
+        """Record several (value, labels) pairs under one lock acquisition"""
+        with self._lock:
+            for value, labels in observations:
+                child = self._children.get(labels)
+                if child is None:
+                    child = self._children[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+                child[bisect_left(self.buckets, value)] += 1
+                child[-2] += value
+                child[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels) -> int:
+        with self._lock:
+            child = self._children.get(labels)
+            return child[-1] if child else 0
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            children = {labels: list(child) for labels, child in self._children.items()}
+
+        samples = []
+        for labels, child in sorted(children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", format_labels(self.labelnames, labels, le), cumulative))
+            samples.append((f"{self.name}_sum", format_labels(self.labelnames, labels), child[-2]))
+            samples.append((f"{self.name}_count", format_labels(self.labelnames, labels), child[-1]))
+        return samples
+
+
+class CallbackMetric:
+    """Gauge or counter read from a callback at scrape time
+
+    The callback returns a number, or a dict mapping label value tuples to
+    numbers; returning None leaves the metric out of the scrape.
+    """
+
+    def __init__(self, name: str, help_text: str, callback: Callable, kind: str = 'gauge',
+                 labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return []
+
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, format_labels(self.labelnames, labels), value)
+                for labels, value in sorted(values.items()) if value is not None]
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    fold_pending()
+    lines = []
+    for metric in REGISTRY:
+        samples = metric.samples()
+        if not samples and metric.labelnames:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{labels} {format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Splits one request into consecutive stages: mark() ends the current one
+
+    Only (stage, timestamp) pairs are kept; durations are worked out when the
+    request is folded into the histograms.
+    """
+
+    __slots__ = ('marks',)
+
+    def __init__(self):
+        self.marks = [(None, time.perf_counter())]
+
+    def mark(self, stage: str):
+        self.marks.append((stage, time.perf_counter()))
+
+    def stages(self) -> List[Tuple[str, float]]:
+        return [(stage, at - previous[1]) for previous, (stage, at) in zip(self.marks, self.marks[1:])]
+
+    def total(self) -> float:
+        return self.marks[-1][1] - self.marks[0][1]
+
+
+STAGE_SECONDS = Histogram(
+    'chatbot_stage_seconds', 'Time spent in each process_message stage', ('stage', 'intent')
+)
+REQUEST_SECONDS = Histogram(
+    'chatbot_request_seconds', 'process_message latency', ('intent', 'cached')
+)
+DB_QUERY_SECONDS = Histogram(
+    'chatbot_db_query_seconds', 'MySQL query time, including fetching the rows', ('query',)
+)
+DB_ERRORS = Counter('chatbot_db_errors_total', 'MySQL queries that failed', ('query',))
+RELOAD_SECONDS = Histogram(
+    'chatbot_reload_seconds', 'Time to load or reload the catalog and publish a snapshot', ('mode',),
+    buckets=RELOAD_BUCKETS
+)
+ERRORS = Counter('chatbot_errors_total', 'Requests that failed with an exception', ('endpoint',))
+
+
+def observe_request(timer: StageTimer, intent: str, cached: bool):
+    """Queue a finished request's stages under its intent
+
+    The request path only appends to a deque; the histograms are updated when
+    /metrics is scraped, or by whichever request finds MAX_PENDING queued.
+    """
+    PENDING.append((timer, intent, cached))
+    if len(PENDING) > MAX_PENDING:
+        fold_pending()
+
+
+def fold_pending():
+    """Move queued requests into the stage and request histograms"""
+    with _fold_lock:
+        # Only this thread pops, so the length read here can't go stale downwards
+        requests = [PENDING.popleft() for _ in range(len(PENDING))]
+        if not requests:
+            return
+
+        stages = []
+        totals = []
+        for timer, intent, cached in requests:
+            stages.extend((seconds, (stage, intent)) for stage, seconds in timer.stages())
+            totals.append((timer.total(), (intent, 'true' if cached else 'false')))
+        STAGE_SECONDS.observe_many(stages)
+        REQUEST_SECONDS.observe_many(totals)
+
+
+@contextmanager
+def db_query(query: str):
+    """Time a MySQL query and count it as failed if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        DB_ERRORS.inc(query)
+        raise
+    finally:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - start, query)
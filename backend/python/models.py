@@ -0,0 +1,265 @@
+import sys
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+
+def intern(value: Optional[str]) -> Optional[str]:
+    """Share one copy of strings repeated across many records (days, departments...)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def to_minutes(value) -> Optional[int]:
+    """Convert a MySQL TIME value (timedelta or 'HH:MM[:SS]') to minutes after midnight"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+
+    parts = str(value).split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+def format_minutes(minutes: Optional[int]) -> Optional[str]:
+    """Format minutes the way str() formats a MySQL TIME timedelta, e.g. '8:00:00'"""
+    if minutes is None:
+        return None
+    return f"{minutes // 60}:{minutes % 60:02d}:00"
+
+
+class Subject:
+    """A subject taught by one professor"""
+    __slots__ = ('id', 'code', 'name', 'description', 'units')
+
+    def __init__(self, id: int, code: str, name: str, description: Optional[str] = None,
+                 units: Optional[int] = None):
+        self.id = id
+        self.code = intern(code)
+        self.name = intern(name)
+        self.description = description
+        self.units = units
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'code': self.code,
+            'name': self.name,
+            'description': self.description,
+            'units': self.units
+        }
+
+    def to_record(self) -> Tuple:
+        """Plain tuple form used by the shared snapshot file"""
+        return (self.id, self.code, self.name, self.description, self.units)
+
+    @classmethod
+    def from_record(cls, record: Tuple) -> 'Subject':
+        return cls(*record)
+
+    def fingerprint(self) -> Tuple:
+        """Columns compared with the database to spot an edited subject"""
+        return (self.code, self.name, self.description, self.units)
+
+
+class Schedule:
+    """One weekly class meeting; times are minutes after midnight"""
+    __slots__ = ('id', 'subject', 'classroom', 'day', 'start_minutes', 'end_minutes',
+                 'semester', 'academic_year', 'section', 'description')
+
+    def __init__(self, id: int, subject: Subject, classroom: Optional[str], day: Optional[str],
+                 start_minutes: Optional[int], end_minutes: Optional[int],
+                 semester: Optional[str] = None, academic_year: Optional[str] = None,
+                 section: Optional[str] = None, description: Optional[str] = None):
+        self.id = id
+        self.subject = subject
+        self.classroom = intern(classroom)
+        self.day = intern(day)
+        self.start_minutes = start_minutes
+        self.end_minutes = end_minutes
+        self.semester = intern(semester)
+        self.academic_year = intern(academic_year)
+        self.section = intern(section)
+        self.description = description
+
+    @property
+    def subject_code(self) -> str:
+        return self.subject.code
+
+    @property
+    def subject_name(self) -> str:
+        return self.subject.name
+
+    @property
+    def time_start(self) -> Optional[str]:
+        return format_minutes(self.start_minutes)
+
+    @property
+    def time_end(self) -> Optional[str]:
+        return format_minutes(self.end_minutes)
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'subject_code': self.subject_code,
+            'subject_name': self.subject_name,
+            'classroom': self.classroom,
+            'day': self.day,
+            'time_start': self.time_start,
+            'time_end': self.time_end,
+            'semester': self.semester,
+            'academic_year': self.academic_year,
+            'section': self.section,
+            'description': self.description
+        }
+
+    def to_record(self) -> Tuple:
+        """Plain tuple form used by the shared snapshot file; the subject is stored by id"""
+        return (self.id, self.subject.id, self.classroom, self.day, self.start_minutes,
+                self.end_minutes, self.semester, self.academic_year, self.section, self.description)
+
+    @classmethod
+    def from_record(cls, record: Tuple, subjects: Dict[int, Subject]) -> 'Schedule':
+        schedule_id, subject_id, *fields = record
+        return cls(schedule_id, subjects[subject_id], *fields)
+
+
+class Professor:
+    """A professor with the subjects they teach and their class schedules"""
+    __slots__ = ('id', 'name', 'department', 'contact', 'email', 'office_location', 'bio',
+                 'image_url', 'subjects', 'schedules')
+
+    def __init__(self, id: int, name: str, department: Optional[str] = None,
+                 contact: Optional[str] = None, email: Optional[str] = None,
+                 office_location: Optional[str] = None, bio: Optional[str] = None,
+                 image_url: Optional[str] = None, subjects: Tuple[Subject, ...] = (),
+                 schedules: Tuple[Schedule, ...] = ()):
+        self.id = id
+        self.name = name
+        self.department = intern(department)
+        self.contact = contact
+        self.email = email
+        self.office_location = office_location
+        self.bio = bio
+        self.image_url = image_url
+        self.subjects = subjects
+        self.schedules = schedules
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'department': self.department,
+            'contact': self.contact,
+            'email': self.email,
+            'office_location': self.office_location,
+            'bio': self.bio,
+            'image_url': self.image_url,
+            'subjects': [subject.to_dict() for subject in self.subjects],
+            'schedules': [schedule.to_dict() for schedule in self.schedules]
+        }
+
+    def to_record(self) -> Tuple:
+        """Plain tuple form used by the shared snapshot file"""
+        return (self.id, self.name, self.department, self.contact, self.email,
+                self.office_location, self.bio, self.image_url,
+                tuple(subject.to_record() for subject in self.subjects),
+                tuple(schedule.to_record() for schedule in self.schedules))
+
+    @classmethod
+    def from_record(cls, record: Tuple) -> 'Professor':
+        *fields, subject_records, schedule_records = record
+        subjects = tuple(Subject.from_record(subject) for subject in subject_records)
+        by_id = {subject.id: subject for subject in subjects}
+        schedules = tuple(Schedule.from_record(schedule, by_id) for schedule in schedule_records)
+        return cls(*fields, subjects=subjects, schedules=schedules)
+
+
+class ProfessorBuilder:
+    """Groups joined professor/subject/schedule rows into Professor records
+
+    Rows can be added in several batches as they stream in; subjects are
+    de-duplicated by id so grouping stays linear in the row count.
+    """
+
+    def __init__(self):
+        self.professors = {}
+        self.subjects = {}
+        self.schedules = {}
+
+    def add(self, rows) -> 'ProfessorBuilder':
+        professors = self.professors
+        subjects = self.subjects
+        schedules = self.schedules
+
+        for row in rows:
+            prof_id = row['professor_id']
+
+            if prof_id not in professors:
+                professors[prof_id] = Professor(
+                    id=prof_id,
+                    name=row['professor_name'],
+                    department=row['department'],
+                    contact=row['contact'],
+                    email=row['email'],
+                    office_location=row['office_location'],
+                    bio=row['bio'],
+                    image_url=row['image_url']
+                )
+                subjects[prof_id] = {}
+                schedules[prof_id] = []
+
+            if not row['subject_id']:
+                continue
+
+            subject = subjects[prof_id].get(row['subject_id'])
+            if subject is None:
+                subject = Subject(
+                    id=row['subject_id'],
+                    code=row['subject_code'],
+                    name=row['subject_name'],
+                    description=row['subject_description'],
+                    units=row['units']
+                )
+                subjects[prof_id][subject.id] = subject
+
+            if row['schedule_id']:
+                schedules[prof_id].append(Schedule(
+                    id=row['schedule_id'],
+                    subject=subject,
+                    classroom=row['classroom'],
+                    day=row['day'],
+                    start_minutes=to_minutes(row['time_start']),
+                    end_minutes=to_minutes(row['time_end']),
+                    semester=row['semester'],
+                    academic_year=row['academic_year'],
+                    section=row['section'],
+                    description=row['schedule_description']
+                ))
+
+        return self
+
+    def build(self) -> List[Professor]:
+        """Freeze the child lists into tuples once every row has been added"""
+        for prof_id, prof in self.professors.items():
+            prof.subjects = tuple(self.subjects[prof_id].values())
+            prof.schedules = tuple(self.schedules[prof_id])
+
+        return list(self.professors.values())
+
+
+def build_professors(rows) -> List[Professor]:
+    """Group joined professor/subject/schedule rows into Professor records
+
+    Rows are consumed as they stream in.
+    """
+    return ProfessorBuilder().add(rows).build()
+
+
+def serialize_subject_results(results: List[Dict]) -> List[Dict]:
+    """JSON shape of find_by_subject results for /chat responses"""
+    return [
+        {
+            'professor': result['professor'].to_dict(),
+            'subject': result['subject'].to_dict()
+        }
+        for result in results
+    ]
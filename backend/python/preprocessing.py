@@ -0,0 +1,89 @@
+import re
+from functools import cached_property
+from typing import List, Tuple, Union
+from lazy_imports import LazyModule
+
+# fuzzywuzzy is only imported once the first name key is built
+utils = LazyModule('fuzzywuzzy.utils')
+
+# Word tokens shared by every stage; apostrophes stay inside words such as "don't"
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Honorifics removed from both queries and professor names before matching
+TITLE_PATTERN = re.compile(r'\b(prof|professor|dr|doctor|ms|mr|mrs)\b\.?\s*', re.IGNORECASE)
+TITLES = {'prof', 'professor', 'dr', 'doctor', 'ms', 'mr', 'mrs'}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of text"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def strip_titles(text: str) -> str:
+    """Remove honorifics such as 'Dr.' or 'Prof.' from text"""
+    return TITLE_PATTERN.sub('', text).strip()
+
+
+def token_sort_key(text: str) -> str:
+    """Normalize text the same way fuzz.token_sort_ratio does before scoring"""
+    tokens = utils.full_process(text, force_ascii=True).split()
+    return " ".join(sorted(tokens))
+
+
+class NormalizedMessage:
+    """One chat message, lowercased and tokenized once for every stage
+
+    Emotion, intent, follow-up, name, subject and schedule matching all read
+    from the same object, so they agree on tokenization and none of them
+    re-lowercases or re-scans the text. Views that only some intents need are
+    computed on first use and kept.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        # Response cache key: lowercase with whitespace collapsed
+        self.key = ' '.join(self.lower.split())
+
+    @classmethod
+    def of(cls, message: Union[str, 'NormalizedMessage']) -> 'NormalizedMessage':
+        return message if isinstance(message, cls) else cls(message)
+
+    def __repr__(self) -> str:
+        return f"NormalizedMessage({self.text!r})"
+
+    @cached_property
+    def tokens(self) -> Tuple[str, ...]:
+        """Word tokens, apostrophes included ("don't", "what's")"""
+        return tuple(WORD_PATTERN.findall(self.lower))
+
+    @cached_property
+    def token_set(self) -> frozenset:
+        return frozenset(self.tokens)
+
+    @cached_property
+    def terms(self) -> Tuple[str, ...]:
+        """Alphanumeric search terms: the tokens split at apostrophes, as tokenize() splits text"""
+        return tuple(TOKEN_PATTERN.findall(self.lower))
+
+    @cached_property
+    def bigrams(self) -> Tuple[Tuple[str, str], ...]:
+        """Adjacent term pairs, e.g. ('cs', '301') for a code typed with a space"""
+        terms = self.terms
+        return tuple(zip(terms, terms[1:]))
+
+    @cached_property
+    def stripped(self) -> str:
+        """Lowercase text with honorifics removed"""
+        return strip_titles(self.lower)
+
+    @cached_property
+    def stripped_terms(self) -> Tuple[str, ...]:
+        return tuple(term for term in self.terms if term not in TITLES)
+
+    @cached_property
+    def name_key(self) -> str:
+        """Title-stripped, token-sorted key matched against professor names"""
+        return token_sort_key(self.stripped)
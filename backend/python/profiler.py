@@ -0,0 +1,233 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Longest profiling session an admin can start
+MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 60))
+
+MODES = ('sample', 'cprofile')
+
+# Shortest sampling interval; anything below busy-spins the sampler thread
+MIN_INTERVAL = 0.001
+
+# GIL switch interval while a sample session runs (the default is 5ms)
+SAMPLE_SWITCH_INTERVAL = 0.0001
+
+
+class ProfilerBusy(Exception):
+    """Raised when a session is started while another one is running"""
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> str:
+    """Stack of frame, root first, in the collapsed format flamegraph.pl reads"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class ProfileSession:
+    """One time-boxed profiling session over the requests it matches
+
+    In sample mode a background thread reads the stacks of the threads that
+    are inside a matching request every interval; in cprofile mode each
+    matching request runs under its own cProfile.Profile and the results are
+    merged. header (name or (name, value)) and session_id narrow the
+    requests that are profiled.
+
+    Samples are taken per thread, not per request: under the ASGI server
+    concurrent requests run on the event loop thread, so their stacks are
+    counted together for as long as any of them is in flight.
+    """
+
+    def __init__(self, mode: str = 'sample', seconds: float = 10.0, interval: float = 0.005,
+                 header=None, session_id: Optional[str] = None):
+        self.mode = mode
+        self.seconds = seconds
+        self.interval = interval
+        if isinstance(header, str):
+            header = (header, None)
+        # Lowercase so plain dicts of ASGI headers match as well as Flask's
+        self.header = (header[0].lower(), header[1]) if header else None
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.deadline = time.monotonic() + seconds
+        self.stopped = threading.Event()
+
+        self.requests = 0
+        self.skipped = 0
+        self.samples = 0
+        self.stacks = Counter()
+        self.stats = None
+        # Requests in flight per thread ident; ASGI requests share one thread
+        self._threads = Counter()
+        self._lock = threading.Lock()
+
+        if mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self._sampler.start()
+
+    @property
+    def running(self) -> bool:
+        return not self.stopped.is_set() and time.monotonic() < self.deadline
+
+    def stop(self):
+        self.stopped.set()
+
+    def matches(self, headers, session_id: Optional[str]) -> bool:
+        if self.header:
+            name, value = self.header
+            sent = headers.get(name)
+            if sent is None or (value is not None and sent != value):
+                return False
+        return self.session_id is None or session_id == self.session_id
+
+    def begin(self):
+        """Start profiling the current request; returns a token for end()"""
+        if self.mode == 'sample':
+            with self._lock:
+                self._threads[threading.get_ident()] += 1
+            return True
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile at a time
+            with self._lock:
+                self.skipped += 1
+            return None
+        return profile
+
+    def end(self, token):
+        if token is None:
+            return
+        if self.mode == 'sample':
+            ident = threading.get_ident()
+            with self._lock:
+                self._threads[ident] -= 1
+                if self._threads[ident] <= 0:
+                    del self._threads[ident]
+        else:
+            token.disable()
+            with self._lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(token)
+                else:
+                    self.stats.add(token)
+        with self._lock:
+            self.requests += 1
+
+    def _sample(self):
+        me = threading.get_ident()
+        # The sampler only runs once it gets the GIL; a short switch interval
+        # makes that happen soon after it wakes instead of mostly at the
+        # points where the profiled code releases the GIL itself. The interval
+        # is process-wide, so it is put back however the loop exits
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SAMPLE_SWITCH_INTERVAL)
+        try:
+            while self.running:
+                with self._lock:
+                    threads = list(self._threads)
+                if threads:
+                    frames = sys._current_frames()
+                    stacks = [collapse(frames[ident]) for ident in threads if ident in frames and ident != me]
+                    with self._lock:
+                        self.stacks.update(stacks)
+                        self.samples += len(stacks)
+                self.stopped.wait(self.interval)
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+    def describe(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'running': self.running,
+            'started_at': self.started_at,
+            'seconds': self.seconds,
+            'remaining': round(max(0.0, self.deadline - time.monotonic()), 3) if self.running else 0.0,
+            'header': self.header[0] if self.header else None,
+            'session_id': self.session_id,
+            'requests': self.requests,
+            'skipped': self.skipped,
+            'samples': self.samples
+        }
+
+    def collapsed(self) -> str:
+        """'frame;frame;frame count' lines, most sampled stacks first"""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def pstats_text(self, sort: str = 'cumulative', limit: int = 50) -> str:
+        with self._lock:
+            if self.stats is None:
+                return ''
+            output = io.StringIO()
+            self.stats.stream = output
+            self.stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def pstats_dump(self) -> bytes:
+        """Merged stats in the file format pstats.Stats() and snakeviz load"""
+        with self._lock:
+            return marshal.dumps(self.stats.stats) if self.stats is not None else b''
+
+
+class Profiler:
+    """Holds the current profiling session of this worker
+
+    Request hooks call begin()/end(); while no session is running begin() is
+    a single attribute check.
+    """
+
+    def __init__(self):
+        self.session = None
+        self._lock = threading.Lock()
+
+    def start(self, mode: str = 'sample', seconds: float = 10.0, **options) -> ProfileSession:
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {MAX_SECONDS:g}")
+        if not options.get('interval', MIN_INTERVAL) >= MIN_INTERVAL:
+            raise ValueError(f"interval_ms must be at least {MIN_INTERVAL * 1000:g}")
+
+        with self._lock:
+            if self.session is not None and self.session.running:
+                raise ProfilerBusy("A profiling session is already running")
+            self.session = ProfileSession(mode, seconds, **options)
+            return self.session
+
+    def stop(self) -> Optional[ProfileSession]:
+        session = self.session
+        if session is not None:
+            session.stop()
+        return session
+
+    def begin(self, headers, session_id: Optional[str] = None):
+        """(session, token) if the current request should be profiled, else None"""
+        session = self.session
+        if session is None or not session.running or not session.matches(headers, session_id):
+            return None
+        token = session.begin()
+        return (session, token) if token is not None else None
+
+    def end(self, handle):
+        if handle is not None:
+            session, token = handle
+            session.end(token)
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry time to live
+
+    A max_entries of 0 disables caching; lookups then always miss and
+    nothing is stored. Hits and misses are counted per get(), so hit_rate
+    is the share of lookups answered from the cache; responses that were
+    not cacheable are counted as misses and again under 'bypassed'.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0, 'expirations': 0}
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        return cls(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 1024)),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', 600))
+        )
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """Cached value for key, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value: Dict):
+        """Store value, evicting the least recently used entries past max_entries"""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def bypass(self):
+        """Count a response that was not cacheable"""
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def clear(self, reset_stats: bool = False):
+        """Drop every entry, e.g. when a new snapshot is published"""
+        with self._lock:
+            self._entries.clear()
+            if reset_stats:
+                for key in self._stats:
+                    self._stats[key] = 0
+
+    def stats(self) -> Dict:
+        """Counters for the health endpoint"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,426 @@
+import heapq
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional, Tuple, Union
+from models import Professor
+from preprocessing import NormalizedMessage
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+DAY_ALIASES = {
+    'mon': 'Monday', 'tue': 'Tuesday', 'tues': 'Tuesday', 'wed': 'Wednesday', 'thu': 'Thursday',
+    'thur': 'Thursday', 'thurs': 'Thursday', 'fri': 'Friday', 'sat': 'Saturday', 'sun': 'Sunday'
+}
+DAY_ALIASES.update({day.lower(): day for day in DAYS})
+
+DAY_PATTERN = re.compile(r'\b(' + '|'.join(sorted(DAY_ALIASES, key=len, reverse=True)) + r')s?\b|\b(today|tomorrow)\b')
+NOW_PATTERN = re.compile(r'\b(right now|now|currently|at the moment)\b')
+ROOM_PATTERN = re.compile(r'\b(?:room|rm)\.?\s*#?\s*([a-z]?\d+[a-z]?)\b|\b(lab|laboratory)\s*#?\s*(\w+)\b')
+
+# A clock time: '2pm', '10:30', '14:00', '2 pm'
+CLOCK = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?'
+RANGE_PATTERN = re.compile(r'\b' + CLOCK + r'\s*(?:-|–|—|to|until|till)\s*' + CLOCK + r'(?![\w:])')
+TIME_PATTERN = re.compile(r'(?:\b(?:at|from|by|around)\s+)?\b' + CLOCK + r'(?![\w:])')
+
+
+# Classroom names repeat across thousands of schedules
+@lru_cache(maxsize=4096)
+def room_key(classroom: Optional[str]) -> str:
+    """Canonical classroom name, e.g. 'Room 301' and 'rm 301' -> '301'"""
+    key = re.sub(r'[^a-z0-9]', '', (classroom or '').lower())
+    for prefix in ('room', 'rm'):
+        if key.startswith(prefix) and key[len(prefix):]:
+            return key[len(prefix):]
+    return key
+
+
+def clock(minutes: int) -> str:
+    """Minutes after midnight as '2:00 PM'"""
+    hours, mins = divmod(minutes % (24 * 60), 60)
+    suffix = 'AM' if hours < 12 else 'PM'
+    return f"{hours % 12 or 12}:{mins:02d} {suffix}"
+
+
+def to_clock_minutes(hour: str, minute: Optional[str], meridiem: Optional[str],
+                     default_meridiem: Optional[str] = None) -> Optional[int]:
+    """Minutes after midnight for a parsed clock time
+
+    Without am/pm, hours 1-6 are read as afternoon since classes do not
+    start before 7 in the morning.
+    """
+    hours = int(hour)
+    mins = int(minute or 0)
+    meridiem = (meridiem or default_meridiem or '').replace('.', '')
+    if hours > 23 or mins > 59:
+        return None
+
+    if meridiem == 'pm' and hours < 12:
+        hours += 12
+    elif meridiem == 'am' and hours == 12:
+        hours = 0
+    elif not meridiem and 1 <= hours <= 6:
+        hours += 12
+    return hours * 60 + mins
+
+
+class IntervalList:
+    """Intervals sorted by start for bisect-based overlap queries
+
+    Keeping the longest interval length bounds how far back an overlap
+    query has to look, so a lookup costs O(log n) plus the entries it
+    returns.
+    """
+
+    def __init__(self, entries: List[Tuple], presorted: bool = False, max_length: Optional[int] = None):
+        self.entries = entries if presorted else sorted(entries, key=interval_order)
+        self.starts = [entry[0] for entry in self.entries]
+        # Any upper bound works; patched lists keep their base's bound
+        if max_length is None:
+            max_length = max((end - start for start, end, *_ in self.entries), default=0)
+        self.max_length = max_length
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def overlapping(self, start: int, end: int) -> List[Tuple]:
+        """Entries whose [start, end) overlaps the given range"""
+        low = bisect_right(self.starts, start - self.max_length)
+        high = bisect_left(self.starts, end)
+        return [entry for entry in self.entries[low:high] if entry[1] > start]
+
+    def patched(self, changed: set, added: List[Tuple]) -> Optional['IntervalList']:
+        """Copy without the entries of changed professors, plus added; None if empty
+
+        Both sides are already sorted, so this is a linear merge, not a sort.
+        """
+        kept = [entry for entry in self.entries if entry[2].id not in changed]
+        added = sorted(added, key=interval_order)
+        if not kept and not added:
+            return None
+        entries = list(heapq.merge(kept, added, key=interval_order))
+        max_length = max([self.max_length] + [end - start for start, end, *_ in added])
+        return IntervalList(entries, presorted=True, max_length=max_length)
+
+
+def interval_order(entry: Tuple):
+    """Start, end, then schedule id, so equal intervals sort the same however the list was built"""
+    return entry[0], entry[1], entry[3].id
+
+
+class ScheduleIndex:
+    """Every timed class meeting, indexed per day and per (classroom, day)
+
+    Entries are (start_minutes, end_minutes, professor, schedule) tuples.
+    """
+
+    def __init__(self, professors: List[Professor]):
+        self.professors = list(professors)
+        self.rooms = {}
+        by_day = {}
+        by_room = {}
+
+        for prof in professors:
+            for entry in timed_entries(prof):
+                sched = entry[3]
+                day = DAY_ALIASES[sched.day.lower()]
+                by_day.setdefault(day, []).append(entry)
+
+                key = room_key(sched.classroom)
+                if key:
+                    self.rooms.setdefault(key, sched.classroom)
+                    by_room.setdefault((key, day), []).append(entry)
+
+        self.by_day = {day: IntervalList(entries) for day, entries in by_day.items()}
+        self.by_room = {key: IntervalList(entries) for key, entries in by_room.items()}
+        self.conflicts = self.find_conflicts()
+
+    @classmethod
+    def patched(cls, base: 'ScheduleIndex', professors: List[Professor], changed: set) -> 'ScheduleIndex':
+        """Index for professors that only re-reads the schedules of changed ids
+
+        Entries of changed or deleted professors are dropped and the new ones
+        merged into the sorted day and room lists. Only rooms and professors
+        those entries touch have their conflicts recomputed.
+        """
+        index = cls([])
+        index.professors = list(professors)
+        index.rooms = dict(base.rooms)
+        added_by_day = {}
+        added_by_room = {}
+
+        for prof in professors:
+            if prof.id not in changed:
+                continue
+            for entry in timed_entries(prof):
+                sched = entry[3]
+                day = DAY_ALIASES[sched.day.lower()]
+                added_by_day.setdefault(day, []).append(entry)
+                key = room_key(sched.classroom)
+                if key:
+                    index.rooms.setdefault(key, sched.classroom)
+                    added_by_room.setdefault((key, day), []).append(entry)
+
+        # Rooms whose bookings change: the old entries' rooms and the new ones'
+        touched = set(added_by_room)
+        for (key, day), intervals in base.by_room.items():
+            if any(entry[2].id in changed for entry in intervals.entries):
+                touched.add((key, day))
+
+        for day in set(base.by_day) | set(added_by_day):
+            base_day = base.by_day.get(day, IntervalList([]))
+            intervals = base_day.patched(changed, added_by_day.get(day, []))
+            if intervals is not None:
+                index.by_day[day] = intervals
+
+        index.by_room = {key: intervals for key, intervals in base.by_room.items() if key not in touched}
+        for key in touched:
+            base_room = base.by_room.get(key, IntervalList([]))
+            intervals = base_room.patched(changed, added_by_room.get(key, []))
+            if intervals is not None:
+                index.by_room[key] = intervals
+
+        rooms = [(day, cluster) for day, cluster in base.conflicts['rooms']
+                 if (room_key(cluster[0][3].classroom), day) not in touched]
+        for key, day in touched:
+            intervals = index.by_room.get((key, day))
+            if intervals:
+                rooms.extend((day, cluster) for cluster in overlap_clusters(intervals.entries, room_group))
+
+        professor_conflicts = [(day, cluster) for day, cluster in base.conflicts['professors']
+                               if cluster[0][2].id not in changed]
+        for day, entries in added_by_day.items():
+            entries.sort(key=interval_order)
+            professor_conflicts.extend((day, cluster) for cluster in overlap_clusters(entries, professor_group))
+
+        index.conflicts = {'rooms': sorted(rooms, key=conflict_order),
+                           'professors': sorted(professor_conflicts, key=conflict_order)}
+        return index
+
+    def teaching(self, day: str, start: int, end: int) -> List[Tuple]:
+        """Classes running on day at any point in [start, end)"""
+        intervals = self.by_day.get(day)
+        return intervals.overlapping(start, end) if intervals else []
+
+    def free_professors(self, day: str, start: int, end: int,
+                        limit: Optional[int] = None) -> Tuple[int, List[Professor]]:
+        """(number free, the first limit of them) for professors with no class on day overlapping [start, end)
+
+        Busy professors come from the interval index in O(log n + k) for the
+        k overlapping classes, and the count is the catalog size minus them.
+        The walk over the catalog stops after limit free professors, so a
+        page costs O(log n + k + limit) rather than a pass over every
+        professor; with no limit it is O(P).
+        """
+        busy = {prof.id for _, _, prof, _ in self.teaching(day, start, end)}
+        free = (prof for prof in self.professors if prof.id not in busy)
+        return len(self.professors) - len(busy), list(islice(free, limit))
+
+    def in_room(self, room: str, day: str, start: int = 0, end: int = 24 * 60) -> List[Tuple]:
+        """Classes held in room on day overlapping [start, end)"""
+        intervals = self.by_room.get((room_key(room), day))
+        return intervals.overlapping(start, end) if intervals else []
+
+    def find_conflicts(self) -> Dict[str, List[Tuple]]:
+        """Double-booked rooms and professors within the same term
+
+        Each conflict is a (day, bookings) cluster of start-sorted meetings
+        that overlap in a chain; describe_conflict() turns one into JSON.
+        """
+        conflicts = {'rooms': [], 'professors': []}
+        for day in DAYS:
+            intervals = self.by_day.get(day)
+            if not intervals:
+                continue
+
+            for cluster in overlap_clusters(intervals.entries, room_group):
+                conflicts['rooms'].append((day, cluster))
+            for cluster in overlap_clusters(intervals.entries, professor_group):
+                conflicts['professors'].append((day, cluster))
+
+        conflicts['rooms'].sort(key=conflict_order)
+        conflicts['professors'].sort(key=conflict_order)
+        return conflicts
+
+    def occupancy(self, first_hour: int = 7, last_hour: int = 21) -> Dict:
+        """Share of each hour a room is in use, per room and day
+
+        Overlapping bookings are merged first, so a double-booked hour
+        still counts as fully occupied rather than more.
+        """
+        rooms = {}
+        for (key, day), intervals in sorted(self.by_room.items(), key=lambda item: (item[0][0], DAYS.index(item[0][1]))):
+            hours = [0] * (last_hour - first_hour)
+            for start, end in merge_intervals(intervals.entries):
+                for hour in range(max(start // 60, first_hour), min((end - 1) // 60 + 1, last_hour)):
+                    bucket_start = hour * 60
+                    used = min(end, bucket_start + 60) - max(start, bucket_start)
+                    hours[hour - first_hour] += used
+            rooms.setdefault(self.rooms[key], {})[day] = [round(used / 60, 2) for used in hours]
+
+        return {'hours': list(range(first_hour, last_hour)), 'rooms': rooms}
+
+
+def timed_entries(prof: Professor) -> List[Tuple]:
+    """(start, end, professor, schedule) for each of prof's schedules with a day and times"""
+    entries = []
+    for sched in prof.schedules:
+        day = DAY_ALIASES.get((sched.day or '').lower())
+        if day is None or sched.start_minutes is None or sched.end_minutes is None:
+            continue
+        entries.append((sched.start_minutes, sched.end_minutes, prof, sched))
+    return entries
+
+
+def conflict_order(conflict: Tuple):
+    """Day, then the first booking, so patched and full builds list conflicts alike"""
+    day, bookings = conflict
+    return (DAYS.index(day),) + interval_order(bookings[0])
+
+
+def room_group(entry: Tuple):
+    sched = entry[3]
+    key = room_key(sched.classroom)
+    return (key, sched.semester, sched.academic_year) if key else None
+
+
+def professor_group(entry: Tuple):
+    sched = entry[3]
+    return (entry[2].id, sched.semester, sched.academic_year)
+
+
+def overlap_clusters(entries: List[Tuple], group):
+    """Runs of overlapping entries that share a group key
+
+    entries must be sorted by start. A sweep keeps one open run per group
+    and its latest end; an entry starting before that end joins the run,
+    otherwise the run closes. Reporting runs instead of every overlapping
+    pair keeps the sweep O(n) after the sort, even for a room booked ten
+    times over.
+    """
+    runs = {}
+    for entry in entries:
+        key = group(entry)
+        if key is None:
+            continue
+
+        run = runs.get(key)
+        if run is not None and entry[0] < run[0]:
+            run[0] = max(run[0], entry[1])
+            run[1].append(entry)
+            continue
+
+        if run is not None and len(run[1]) > 1:
+            yield run[1]
+        runs[key] = [entry[1], [entry]]
+
+    for _, members in runs.values():
+        if len(members) > 1:
+            yield members
+
+
+def merge_intervals(entries: List[Tuple]) -> List[Tuple[int, int]]:
+    """Union of start-sorted intervals as (start, end) pairs"""
+    merged = []
+    for start, end, *_ in entries:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def describe_conflict(kind: str, day: str, bookings: List[Tuple]) -> Dict:
+    """JSON form of a cluster of overlapping bookings"""
+    first = bookings[0]
+    conflict = {
+        'type': kind,
+        'day': day,
+        'start': clock(first[0]),
+        'end': clock(max(entry[1] for entry in bookings)),
+        'semester': first[3].semester,
+        'academic_year': first[3].academic_year,
+        'schedules': [
+            {
+                'id': sched.id,
+                'subject_code': sched.subject_code,
+                'section': sched.section,
+                'classroom': sched.classroom,
+                'time_start': sched.time_start,
+                'time_end': sched.time_end,
+                'professor_id': prof.id,
+                'professor_name': prof.name
+            }
+            for _, _, prof, sched in bookings
+        ]
+    }
+    if kind == 'room':
+        conflict['classroom'] = first[3].classroom
+    else:
+        conflict['professor_id'] = first[2].id
+        conflict['professor_name'] = first[2].name
+    return conflict
+
+
+def parse_schedule_query(message: Union[str, NormalizedMessage], now: Optional[datetime] = None) -> Dict:
+    """Day, time range and room mentioned in a free-form question
+
+    Returns a dict with 'day', 'start', 'end' (minutes, end exclusive),
+    'room', 'free' and 'explicit', which is False when nothing beyond the
+    defaults (today, right now) could be read from the message.
+    """
+    now = now or datetime.now()
+    text = NormalizedMessage.of(message).lower
+    query = {'room': None, 'free': bool(re.search(r'\b(free|available|vacant|not teaching)\b', text))}
+    explicit = False
+
+    room = ROOM_PATTERN.search(text)
+    if room:
+        query['room'] = room.group(1) or f"{room.group(2)}{room.group(3)}"
+        # Keep the room number out of the time parsing
+        text = text[:room.start()] + ' ' + text[room.end():]
+        explicit = True
+
+    day_match = DAY_PATTERN.search(text)
+    if day_match and day_match.group(1):
+        query['day'] = DAY_ALIASES[day_match.group(1)]
+        explicit = True
+    elif day_match and day_match.group(2) == 'tomorrow':
+        query['day'] = DAYS[(now + timedelta(days=1)).weekday()]
+        explicit = True
+    else:
+        query['day'] = DAYS[now.weekday()]
+
+    start = end = None
+    time_range = RANGE_PATTERN.search(text)
+    if time_range:
+        first_hour, first_minute, first_meridiem, second_hour, second_minute, second_meridiem = time_range.groups()
+        # '2-4pm': the meridiem after the range applies to both ends
+        start = to_clock_minutes(first_hour, first_minute, first_meridiem, second_meridiem)
+        end = to_clock_minutes(second_hour, second_minute, second_meridiem)
+    else:
+        for point in TIME_PATTERN.finditer(text):
+            hour, minute, meridiem = point.groups()
+            # A bare number is only a time after 'at', or with minutes or am/pm
+            if not (meridiem or minute or point.group(0).strip()[:1].isalpha()):
+                continue
+            start = to_clock_minutes(hour, minute, meridiem)
+            if start is not None:
+                end = start + 1
+                break
+
+    if start is not None and end is not None and end > start:
+        explicit = True
+    elif query['room'] and not NOW_PATTERN.search(text):
+        # "What's in Room 301 on Monday?" means the whole day
+        start, end = 0, 24 * 60
+    else:
+        if NOW_PATTERN.search(text):
+            explicit = True
+        start = now.hour * 60 + now.minute
+        end = start + 1
+
+    query.update(start=start, end=end, explicit=explicit)
+    return query
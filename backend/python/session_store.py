@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+from preprocessing import NormalizedMessage
+
+# Words that point back at the professor or subject of an earlier message
+PROFESSOR_REFERENCES = {'he', 'she', 'him', 'her', 'his', 'hers', 'they', 'them', 'their'}
+SUBJECT_REFERENCES = {'it', 'same'}
+
+
+def references(message: Union[str, NormalizedMessage]):
+    """(refers to a professor, refers to a subject) for a follow-up message"""
+    words = NormalizedMessage.of(message).token_set
+    return bool(words & PROFESSOR_REFERENCES), bool(words & SUBJECT_REFERENCES)
+
+
+# Rough per-session overhead on top of the id string: OrderedDict slot,
+# context dict with its two values and the expiry float
+SESSION_OVERHEAD_BYTES = 400
+
+
+class MemorySessionBackend:
+    """Per-process session contexts with LRU eviction, TTL and a memory cap
+
+    Sessions expire ttl seconds after their last update. The least recently
+    used ones are evicted once there are more than max_sessions or their
+    estimated size passes max_bytes, so floods of one-off anonymous
+    sessions cannot grow the worker without bound.
+    """
+
+    name = 'memory'
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 100000, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    @staticmethod
+    def _size(session_id: str) -> int:
+        return sys.getsizeof(session_id) + SESSION_OVERHEAD_BYTES
+
+    def _drop(self, session_id: str):
+        del self._sessions[session_id]
+        self._bytes -= self._size(session_id)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Context of a live session, or None"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            context, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._drop(session_id)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._sessions.move_to_end(session_id)
+            self._stats['hits'] += 1
+            return dict(context)
+
+    def set(self, session_id: str, context: Dict):
+        """Store a session's context and restart its TTL"""
+        with self._lock:
+            if session_id not in self._sessions:
+                self._bytes += self._size(session_id)
+            self._sessions[session_id] = (dict(context), time.monotonic() + self.ttl)
+            self._sessions.move_to_end(session_id)
+
+            while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._sessions)))
+                self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+            stats['bytes'] = self._bytes
+        stats['backend'] = self.name
+        stats['max_sessions'] = self.max_sessions
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+class SQLiteSessionBackend:
+    """Session contexts in a local SQLite file shared by every worker
+
+    Stands in for Redis on a single host: workers of one server see each
+    other's sessions. Rows expire ttl seconds after their last update and
+    the oldest are pruned past max_sessions, which bounds the file size.
+    """
+
+    name = 'sqlite'
+
+    # Prune expired and excess rows once every this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, ttl: float = 1800.0, max_sessions: int = 100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    professor_id INTEGER,
+                    subject_code TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside a writer"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT professor_id, subject_code FROM sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+
+        if row is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return {'professor_id': row[0], 'subject_code': row[1]}
+
+    def set(self, session_id: str, context: Dict):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, professor_id, subject_code, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, context.get('professor_id'), context.get('subject_code'), time.time())
+            )
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Delete expired sessions and the oldest ones past max_sessions"""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM sessions WHERE updated_at <= ?", (time.time() - self.ttl,))
+            connection.execute("""
+                DELETE FROM sessions WHERE session_id IN (
+                    SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_sessions,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['sessions'] = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        stats['backend'] = self.name
+        stats['max_sessions'] = self.max_sessions
+        return stats
+
+
+def create_session_backend(name: Optional[str] = None):
+    """Session backend selected by SESSION_BACKEND (memory or sqlite)"""
+    name = name or os.getenv('SESSION_BACKEND', 'memory')
+    ttl = float(os.getenv('SESSION_TTL', 1800))
+    max_sessions = int(os.getenv('SESSION_MAX', 100000))
+
+    if name == 'sqlite':
+        path = os.getenv('SESSION_DB_PATH', 'sessions.sqlite3')
+        return SQLiteSessionBackend(path, ttl=ttl, max_sessions=max_sessions)
+    if name == 'memory':
+        max_bytes = int(os.getenv('SESSION_MAX_BYTES', 32 * 1024 * 1024))
+        return MemorySessionBackend(ttl=ttl, max_sessions=max_sessions, max_bytes=max_bytes)
+    raise ValueError(f"Unknown SESSION_BACKEND {name!r}")
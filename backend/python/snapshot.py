@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Tuple
+from indexes import ProfessorNameIndex, SearchIndex, SubjectIndex
+from models import Professor
+from schedule_index import ScheduleIndex
+
+
+class SnapshotRejected(Exception):
+    """Raised when a freshly built snapshot looks truncated"""
+
+
+def group_attachments(rows: List[Dict]) -> Tuple[Dict, Dict]:
+    """Group attachment rows by professor and by schedule"""
+    by_professor = {}
+    by_schedule = {}
+
+    for row in rows:
+        attachment = dict(row)
+        professor_id = attachment.pop('professor_id', None)
+
+        if professor_id:
+            by_professor.setdefault(professor_id, []).append(attachment)
+        if attachment['schedule_id']:
+            by_schedule.setdefault(attachment['schedule_id'], []).append(attachment)
+
+    return by_professor, by_schedule
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable, versioned catalog with its derived indexes and attachment maps
+
+    Snapshots are built off to the side and published by swapping a single
+    reference, so request threads always see one consistent version.
+    """
+    version: int
+    built_at: datetime
+    watermark: object
+    professors: Tuple[Professor, ...]
+    name_index: ProfessorNameIndex
+    subject_index: SubjectIndex
+    schedule_index: ScheduleIndex
+    search_index: SearchIndex
+    attachments_by_professor: Dict
+    attachments_by_schedule: Dict
+    attachment_count: int
+
+    @classmethod
+    def build(cls, version: int, professors: List[Professor], attachment_rows: List[Dict], watermark=None):
+        """Build a snapshot and all of its indexes from loaded rows"""
+        by_professor, by_schedule = group_attachments(attachment_rows)
+
+        return cls(
+            version=version,
+            built_at=datetime.now(),
+            watermark=watermark,
+            professors=tuple(professors),
+            name_index=ProfessorNameIndex(professors),
+            subject_index=SubjectIndex(professors),
+            schedule_index=ScheduleIndex(professors),
+            search_index=SearchIndex(professors),
+            attachments_by_professor=by_professor,
+            attachments_by_schedule=by_schedule,
+            attachment_count=len(attachment_rows)
+        )
+
+    @classmethod
+    def patch(cls, base: 'CatalogSnapshot', version: int, professors: List[Professor], changed: set,
+              attachment_rows: List[Dict], watermark=None):
+        """Build a successor of base whose indexes only re-read the professors in changed
+
+        changed must hold every id whose record differs from base's, deleted
+        ones included. The other professors must be base's own records; their
+        index entries are carried over instead of rebuilt.
+        """
+        by_professor, by_schedule = group_attachments(attachment_rows)
+
+        return cls(
+            version=version,
+            built_at=datetime.now(),
+            watermark=watermark,
+            professors=tuple(professors),
+            name_index=ProfessorNameIndex.patched(base.name_index, professors, changed),
+            subject_index=SubjectIndex.patched(base.subject_index, professors, changed),
+            schedule_index=ScheduleIndex.patched(base.schedule_index, professors, changed),
+            search_index=SearchIndex.patched(base.search_index, professors, changed),
+            attachments_by_professor=by_professor,
+            attachments_by_schedule=by_schedule,
+            attachment_count=len(attachment_rows)
+        )
+
+    @classmethod
+    def empty(cls):
+        """Snapshot used before the first load"""
+        return cls.build(0, [], [])
+
+    def check_successor(self, candidate: 'CatalogSnapshot', min_ratio: float = 0.5):
+        """Raise SnapshotRejected if candidate looks like a truncated load of this catalog"""
+        if not self.professors:
+            return
+
+        if not candidate.professors:
+            raise SnapshotRejected(
+                f"New snapshot has no professors (current v{self.version} has {len(self.professors)})"
+            )
+
+        if len(candidate.professors) < len(self.professors) * min_ratio:
+            raise SnapshotRejected(
+                f"New snapshot has {len(candidate.professors)} professors, "
+                f"below {min_ratio:.0%} of the {len(self.professors)} in v{self.version}"
+            )
+
+        if self.attachment_count and not candidate.attachment_count:
+            raise SnapshotRejected(
+                f"New snapshot has no attachments (current v{self.version} has {self.attachment_count})"
+            )
+
+    def describe(self) -> Dict:
+        """Summary for the health endpoint"""
+        return {
+            'version': self.version,
+            'built_at': self.built_at.isoformat(),
+            'professors': len(self.professors),
+            'attachments': self.attachment_count,
+            'room_conflicts': len(self.schedule_index.conflicts['rooms']),
+            'professor_conflicts': len(self.schedule_index.conflicts['professors'])
+        }
@@ -0,0 +1,176 @@
+"""Catalog snapshot file shared by prefork workers
+
+The file holds the catalog rows and precomputed index state, so a worker
+can start serving without querying MySQL or rebuilding the name, subject
+and search indexes. It does not share memory: each worker unmarshals its
+own full copy of the catalog and its indexes, so resident memory still
+grows with the number of workers.
+
+The payload is marshal data, whose format may change between Python
+versions, so the header records the interpreter that wrote it. A file
+from another interpreter is treated as missing and rebuilt from MySQL.
+"""
+import marshal
+import os
+import struct
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+from indexes import ProfessorNameIndex, SearchIndex, SubjectIndex
+from models import Professor
+from schedule_index import ScheduleIndex
+from snapshot import CatalogSnapshot
+
+try:
+    import fcntl
+except ImportError:
+    # Windows dev server runs a single process, so there is nobody to coordinate with
+    fcntl = None
+
+MAGIC = b'FMPS'
+FORMAT_VERSION = 3
+
+# magic, format version, Python major and minor, catalog version, built_at timestamp, payload length
+HEADER = struct.Struct('<4sHBBQdQ')
+
+
+def encode_snapshot(snapshot: CatalogSnapshot) -> bytes:
+    """Serialize a snapshot and its precomputed indexes into the file format"""
+    professors = list(snapshot.professors)
+    watermark = snapshot.watermark
+    payload = marshal.dumps({
+        'watermark': watermark.isoformat() if isinstance(watermark, datetime) else watermark,
+        'professors': [prof.to_record() for prof in professors],
+        'name_index': snapshot.name_index.state(),
+        'subject_index': snapshot.subject_index.state(professors),
+        'search_index': snapshot.search_index.state(),
+        'attachments_by_professor': snapshot.attachments_by_professor,
+        'attachments_by_schedule': snapshot.attachments_by_schedule,
+        'attachment_count': snapshot.attachment_count
+    })
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, *sys.version_info[:2], snapshot.version,
+                         snapshot.built_at.timestamp(), len(payload))
+    return header + payload
+
+
+def decode_snapshot(buffer) -> CatalogSnapshot:
+    """Rebuild a snapshot from a buffer written by encode_snapshot()"""
+    magic, format_version, major, minor, version, built_at, length = HEADER.unpack_from(buffer)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError("Not a catalog snapshot file")
+    if (major, minor) != sys.version_info[:2]:
+        raise ValueError(f"Written by Python {major}.{minor}, this is {sys.version_info[0]}.{sys.version_info[1]}")
+
+    with memoryview(buffer)[HEADER.size:HEADER.size + length] as payload:
+        data = marshal.loads(payload)
+    professors = [Professor.from_record(record) for record in data['professors']]
+    watermark = data['watermark']
+
+    return CatalogSnapshot(
+        version=version,
+        built_at=datetime.fromtimestamp(built_at),
+        watermark=datetime.fromisoformat(watermark) if isinstance(watermark, str) else watermark,
+        professors=tuple(professors),
+        name_index=ProfessorNameIndex.from_state(professors, data['name_index']),
+        subject_index=SubjectIndex.from_state(professors, data['subject_index']),
+        # Cheap to sort again, so it is not stored in the file
+        schedule_index=ScheduleIndex(professors),
+        search_index=SearchIndex.from_state(professors, data['search_index']),
+        attachments_by_professor=data['attachments_by_professor'],
+        attachments_by_schedule=data['attachments_by_schedule'],
+        attachment_count=data['attachment_count']
+    )
+
+
+class SnapshotFileStore:
+    """Catalog snapshot shared between prefork workers through one file
+
+    The worker holding the lock queries MySQL and writes the file atomically
+    (temp file + os.replace); the others read it instead of querying the
+    database themselves. Each worker decodes the file into its own objects,
+    so what is shared is the database load and the index build, not memory.
+    A file that fails to decode, including one written by another Python
+    version, reads as None and is rebuilt and rewritten by the next load.
+    Workers poll the file's stat at most once per check_interval to pick up
+    versions published by a sibling.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.check_interval = check_interval
+        self._stamp = None
+        self._next_check = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional['SnapshotFileStore']:
+        """Store configured by CATALOG_SNAPSHOT_PATH, or None when sharing is off"""
+        path = os.getenv('CATALOG_SNAPSHOT_PATH')
+        if not path:
+            return None
+        return cls(path, check_interval=float(os.getenv('CATALOG_SNAPSHOT_CHECK_INTERVAL', 1.0)))
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the cross-process writer lock, so only one worker queries MySQL"""
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write(self, snapshot: CatalogSnapshot):
+        """Atomically replace the shared file with snapshot"""
+        data = encode_snapshot(snapshot)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._stamp = self._file_stamp()
+        print(f"💾 Wrote catalog snapshot v{snapshot.version} ({len(data)} bytes) to {self.path}")
+
+    def read(self) -> Optional[CatalogSnapshot]:
+        """Read and decode the shared file; None if it is missing or unreadable"""
+        try:
+            with open(self.path, 'rb') as f:
+                stamp = os.fstat(f.fileno())
+                data = f.read()
+            snapshot = decode_snapshot(data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, KeyError, TypeError, struct.error) as e:
+            print(f"Error reading catalog snapshot {self.path}: {e}")
+            return None
+
+        self._stamp = stamp.st_ino, stamp.st_mtime_ns, stamp.st_size
+        return snapshot
+
+    def has_update(self) -> bool:
+        """True if another process replaced the file since we last read or wrote it
+
+        Only stats the file once per check_interval, so this is cheap enough
+        to call on every request.
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+
+        stamp = self._file_stamp()
+        return stamp is not None and stamp != self._stamp
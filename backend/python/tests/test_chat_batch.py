@@ -0,0 +1,91 @@
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks'), HERE]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from snapshot import CatalogSnapshot
+from synthetic_catalog import SyntheticDatabase
+from test_schedule_search_intent import ATTACHMENTS, ROWS
+
+FOLLOW_UP = ["Who is Dr. Maria Reyes?", "what is her schedule?"]
+
+
+def professor_name(reply):
+    data = reply.get('data')
+    return data.get('name') if isinstance(data, dict) else None
+
+
+class ProcessMessagesSessionTest(unittest.TestCase):
+    """Batch items with a session id behave like process_message() calls in order"""
+
+    def setUp(self):
+        self.chatbot = ChatbotEngineEnhanced(autoload=False)
+        self.chatbot.publish(CatalogSnapshot.build(1, build_professors(ROWS), ATTACHMENTS), force=True)
+
+    def test_follow_up_uses_earlier_item_of_the_same_session(self):
+        replies = self.chatbot.process_messages(FOLLOW_UP + ["what is her schedule?"], ['s1', 's1', 's2'])
+        self.assertEqual([reply['intent'] for reply in replies], ['professor_info', 'schedule', 'schedule'])
+        self.assertEqual(professor_name(replies[1]), 'Dr. Maria Reyes')
+        # s2 never named anyone
+        self.assertIsNone(professor_name(replies[2]))
+        self.assertEqual(self.chatbot.get_session('s1'), {'professor_id': 1})
+        self.assertIsNone(self.chatbot.get_session('s2'))
+
+    def test_follow_up_uses_context_from_before_the_batch(self):
+        self.chatbot.process_message("Who is Dr. Pedro Dela Cruz?", 's1')
+        reply, = self.chatbot.process_messages(["what is his schedule?"], ['s1'])
+        self.assertEqual(professor_name(reply), 'Dr. Pedro Dela Cruz')
+
+    def test_batch_matches_single_calls(self):
+        messages = FOLLOW_UP + ["Who teaches CS301", "where is his office?"]
+        batch = self.chatbot.process_messages(messages, ['s1'] * len(messages))
+
+        single = ChatbotEngineEnhanced(autoload=False)
+        single.publish(self.chatbot.snapshot, force=True)
+        expected = [single.process_message(message, 's1') for message in messages]
+        self.assertEqual([(reply['intent'], reply.get('data')) for reply in batch],
+                         [(reply['intent'], reply.get('data')) for reply in expected])
+
+    def test_without_session_ids_sessions_are_untouched(self):
+        replies = self.chatbot.process_messages(FOLLOW_UP)
+        self.assertIsNone(professor_name(replies[1]))
+        self.assertEqual(self.chatbot.sessions.stats()['sessions'], 0)
+
+
+class ChatBatchEndpointTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import app
+        cls.app = app
+        app.chatbot.db = SyntheticDatabase(ROWS, ATTACHMENTS)
+        app.chatbot.load_data(force=True)
+        app.chatbot.ready.set()
+        cls.client = app.app.test_client()
+
+    def post(self, items):
+        response = self.client.post('/chat/batch', json=items)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['results']
+
+    def test_session_ids_are_passed_through(self):
+        results = self.post([{'message': message, 'session_id': 'batch-user'} for message in FOLLOW_UP])
+        self.assertEqual(professor_name(results[1]), 'Dr. Maria Reyes')
+        self.assertEqual(self.app.chatbot.get_session('batch-user'), {'professor_id': 1})
+
+    def test_items_without_session_id_share_no_context(self):
+        results = self.post([{'message': message} for message in FOLLOW_UP])
+        self.assertIsNone(professor_name(results[1]))
+
+    def test_non_string_session_id_is_an_item_error(self):
+        results = self.post([{'message': FOLLOW_UP[0], 'session_id': ['x']}, {'message': FOLLOW_UP[0]}])
+        self.assertFalse(results[0]['success'])
+        self.assertEqual(professor_name(results[1]), 'Dr. Maria Reyes')
+
+
+if __name__ == '__main__':
+    unittest.main()
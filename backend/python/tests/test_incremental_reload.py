@@ -0,0 +1,155 @@
+import copy
+import os
+import sys
+import unittest
+from datetime import timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from schedule_index import DAYS
+from synthetic_catalog import SyntheticDatabase, generate_catalog, query_corpus, subject_rows
+
+PROFESSOR_FIELDS = ['professor_id', 'professor_name', 'department', 'contact', 'email',
+                    'office_location', 'bio', 'image_url']
+
+
+def load(rows, attachments):
+    chatbot = ChatbotEngineEnhanced(autoload=False)
+    chatbot.db = SyntheticDatabase(rows, attachments)
+    chatbot.load_data()
+    return chatbot
+
+
+def ids(entries):
+    return [sched.id for _, _, _, sched in entries]
+
+
+class IncrementalReloadTest(unittest.TestCase):
+    """A patched snapshot must answer exactly like a full rebuild of the same rows"""
+
+    @classmethod
+    def setUpClass(cls):
+        rows, attachments = generate_catalog(3000)
+        cls.chatbot = load(rows, attachments)
+        cls.base = cls.chatbot.snapshot
+        db = cls.chatbot.db
+        db.rows = rows = copy.deepcopy(rows)
+        by_professor = {}
+        for row in rows:
+            by_professor.setdefault(row['professor_id'], []).append(row)
+        busy = [prof_id for prof_id, prof_rows in by_professor.items()
+                if len({row['subject_id'] for row in prof_rows}) > 1]
+
+        # Edit a subject in place: only the fingerprint scan can see it
+        renamed = rows[0]['subject_id'] or by_professor[busy[0]][0]['subject_id']
+        for row in rows:
+            if row['subject_id'] == renamed:
+                row['subject_name'] = 'Advanced Underwater Basket Weaving'
+                row['subject_code'] = 'ART999'
+
+        # Delete a professor outright
+        deleted = busy[1]
+        rows[:] = [row for row in rows if row['professor_id'] != deleted]
+
+        # Hand one subject and its schedules to another professor
+        donor, receiver = busy[2], busy[3]
+        moved = by_professor[donor][-1]['subject_id']
+        owner = {field: by_professor[receiver][0][field] for field in PROFESSOR_FIELDS}
+        for row in rows:
+            if row['subject_id'] == moved:
+                row.update(owner)
+
+        # Move a class into another professor's room and time, and edit an office
+        target, clash = by_professor[busy[4]][0], by_professor[busy[5]][0]
+        for row in rows:
+            if row['schedule_id'] == target['schedule_id']:
+                row.update({field: clash[field] for field in ('classroom', 'day', 'time_start', 'time_end')})
+            if row['professor_id'] == busy[6]:
+                row['office_location'] = 'Room 999, Annex'
+        db.changed = {busy[4], busy[6]}
+
+        # A professor that did not exist before
+        rows.append(dict(rows[0], professor_id=99999, professor_name='Dr. Zenaida Quiambao',
+                         email='zenaida@university.edu', subject_id=99999, subject_code='CS777',
+                         subject_name='Quantum Compilers', schedule_id=99999, classroom='Room 101',
+                         day='Monday', time_start=timedelta(hours=8), time_end=timedelta(hours=11)))
+        rows.sort(key=lambda row: row['professor_name'])
+
+        cls.summary = cls.chatbot.reload_data()
+        cls.patched = cls.chatbot.snapshot
+        cls.full = load(rows, db.attachments).snapshot
+        cls.touched = {deleted, donor, receiver, busy[4], busy[6], 99999} | {
+            row['professor_id'] for row in rows if row['subject_id'] == renamed
+        }
+        cls.corpus = query_corpus(rows, 300, seed=3) + ['Who is Dr. Zenaida Quiambao?',
+                                                        'Who teaches Underwater Basket Weaving?']
+        cls.subjects = subject_rows(rows)
+
+    def test_reload_is_incremental(self):
+        self.assertEqual(self.summary['mode'], 'incremental')
+        self.assertEqual(self.patched.version, self.base.version + 1)
+
+    def test_unchanged_professors_are_shared_with_the_base(self):
+        base = {prof.id: prof for prof in self.base.professors}
+        for prof in self.patched.professors:
+            if prof.id not in self.touched:
+                self.assertIs(prof, base[prof.id])
+
+    def test_professors_match_full_rebuild(self):
+        self.assertEqual([prof.to_dict() for prof in self.patched.professors],
+                         [prof.to_dict() for prof in self.full.professors])
+        self.assertEqual(self.patched.attachments_by_professor, self.full.attachments_by_professor)
+
+    def test_name_index_matches_full_rebuild(self):
+        def answers(snapshot):
+            index = snapshot.name_index
+            found = [index.find(message) for message in self.corpus]
+            found += index.find_many(self.corpus)
+            found += [index.mentioned(message) for message in self.corpus]
+            return [prof and prof.id for prof in found]
+
+        self.assertEqual(answers(self.patched), answers(self.full))
+
+    def test_subject_index_matches_full_rebuild(self):
+        queries = self.corpus + [row['subject_code'] for row in self.subjects[:200]] + ['ART', 'math']
+
+        def answers(snapshot):
+            return [[(entry['professor'].id, entry['subject'].id) for entry in snapshot.subject_index.search(query)]
+                    for query in queries]
+
+        self.assertEqual(answers(self.patched), answers(self.full))
+
+    def test_search_index_matches_full_rebuild(self):
+        def answers(snapshot):
+            results = []
+            for query in self.corpus[:100] + ['basket weaving', 'quantum', 'annex']:
+                total, page = snapshot.search_index.search(query, per_page=20)
+                results.append((total, [(prof.id, round(score, 9)) for prof, score in page]))
+            return results
+
+        self.assertEqual(answers(self.patched), answers(self.full))
+
+    def test_schedule_index_matches_full_rebuild(self):
+        def answers(snapshot):
+            index = snapshot.schedule_index
+            results = []
+            for day in DAYS:
+                for hour in range(7, 21):
+                    start, end = hour * 60, hour * 60 + 90
+                    results.append(ids(index.teaching(day, start, end)))
+                    count, free = index.free_professors(day, start, end)
+                    results.append((count, [prof.id for prof in free]))
+                for room in ('Room 101', 'Room 205', 'Room 340'):
+                    results.append(ids(index.in_room(room, day)))
+            for kind in ('rooms', 'professors'):
+                results.append([(day, ids(bookings)) for day, bookings in index.conflicts[kind]])
+            results.append(index.occupancy())
+            return results
+
+        self.assertEqual(answers(self.patched), answers(self.full))
+
+
+if __name__ == '__main__':
+    unittest.main()
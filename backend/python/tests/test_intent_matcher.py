@@ -0,0 +1,108 @@
+import os
+import re
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from intent_matcher import IntentMatcher
+from synthetic_catalog import generate_catalog, query_corpus
+
+EXTRA_MESSAGES = [
+    "this is history", "thank you so much", "what's the schedule of classes?", "schedules please",
+    "tells me about Dr. Reyes", "she looks for her files", "which classroom?", "the faculty lounge",
+    "I'm so stressed", "later!", "Who teaches Calculus?", "whats up", "how r u", "yo", "hey, find prof tan",
+    "any documents or photos?", "thx", "tysm", "byes", "tys", "good mornings", ""
+]
+
+
+def best(intent_scores, intents):
+    """Highest score, ties to the intent listed first, as the original detect_intent() chose"""
+    if not intent_scores:
+        return 'unknown'
+    return max(intent_scores, key=lambda intent: (intent_scores[intent], -list(intents).index(intent)))
+
+
+def substring_label(intents, message):
+    """The original detect_intent(): a keyword counts wherever its text appears"""
+    text = message.lower()
+    scores = {}
+    for intent, keywords in intents.items():
+        score = sum(1 for keyword in keywords if keyword in text)
+        if score > 0:
+            scores[intent] = score
+    return best(scores, intents)
+
+
+def inflected(word):
+    # Words of three or more letters also match with a trailing 's' or 'es'
+    return re.escape(word) + ('(?:e?s)?' if len(word) >= 3 else '')
+
+
+def word_label(intents, message):
+    """What the matcher is meant to answer: whole words only, plural 's'/'es' tolerated per word"""
+    text = message.lower()
+    scores = {}
+    for intent, keywords in intents.items():
+        score = 0
+        for keyword in keywords:
+            words = re.findall(r"[\w']+", keyword.lower())
+            pattern = r"(?<![\w'])" + r"[^\w']+".join(inflected(word) for word in words) + r"(?![\w'])"
+            if re.search(pattern, text):
+                score += 1
+        if score > 0:
+            scores[intent] = score
+    return best(scores, intents)
+
+
+class IntentMatcherTest(unittest.TestCase):
+    """IntentMatcher against the substring detection it replaced"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.intents = ChatbotEngineEnhanced(autoload=False).intents
+        cls.matcher = IntentMatcher(cls.intents)
+        rows, _ = generate_catalog(2000)
+        cls.corpus = query_corpus(rows, 600, seed=9) + EXTRA_MESSAGES
+
+    def test_matches_whole_word_reference(self):
+        self.assertEqual([word_label(self.intents, message) for message in self.corpus],
+                         [self.matcher.best(message) for message in self.corpus])
+
+    def test_differences_from_substring_labels_are_only_word_boundaries_and_plurals(self):
+        changed = {}
+        for message in self.corpus:
+            old = substring_label(self.intents, message)
+            new = self.matcher.best(message)
+            if old != new:
+                changed[message] = (old, new)
+
+        # Everything else in the corpus keeps its label
+        self.assertLess(len(changed), len(self.corpus) // 4)
+        self.assertEqual(changed.get("this is history"), ('greeting', 'unknown'))
+        # 'teach' no longer fires inside 'teaching', so the tie goes to the first listed intent
+        self.assertEqual(changed.get("Who is teaching right now?"), ('subject', 'schedule_search'))
+        self.assertEqual(changed.get("thank you so much"), ('greeting', 'thanks'))
+        self.assertEqual(changed.get("the faculty lounge"), ('thanks', 'unknown'))
+        # An inflected word inside a phrase now matches; the substring test missed it
+        self.assertEqual(changed.get("she looks for her files"), ('attachment', 'professor_search'))
+        self.assertEqual(self.matcher.scores("tells me about Dr. Reyes")['professor_info'], 2)
+        # 'teaches' still counts as both 'teaches' and 'teach'
+        self.assertEqual(self.matcher.scores("Who teaches Calculus?")['subject'], 2)
+
+    def test_plural_keywords_keep_matching(self):
+        for message, intent in [("schedules please", 'schedule'), ("any documents or photos?", 'attachment'),
+                                ("good mornings", 'greeting')]:
+            self.assertEqual(self.matcher.best(message), intent)
+            self.assertEqual(substring_label(self.intents, message), intent)
+
+    def test_short_words_take_no_suffix(self):
+        self.assertEqual(self.matcher.best("byes"), 'farewell')
+        self.assertEqual(self.matcher.best("tys"), 'unknown')
+        self.assertEqual(substring_label(self.intents, "tys"), 'thanks')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+from fuzzywuzzy import fuzz, process
+from indexes import ProfessorNameIndex
+from models import build_professors
+from preprocessing import NormalizedMessage
+from synthetic_catalog import generate_catalog, query_corpus
+
+
+def extract_one(index, message):
+    """What process.extractOne() answers over the index's title-stripped keys"""
+    key = NormalizedMessage(message).name_key
+    if not key:
+        return None
+    match = process.extractOne(key, index.keys, processor=None, scorer=fuzz.ratio)
+    if match is None or match[1] < index.threshold:
+        return None
+    return index.professors[index.keys.index(match[0])]
+
+
+class ProfessorNameIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rows, _ = generate_catalog(3000)
+        cls.professors = build_professors(rows)
+        cls.corpus = query_corpus(rows, 300) + [
+            'I am tired', 'who is prof warm up', 'Dr.', '', 'maria', 'santos maria dr'
+        ]
+
+    def index(self, backend):
+        index = ProfessorNameIndex(self.professors)
+        index.backend = backend
+        return index
+
+    def assertSameProfessors(self, expected, actual):
+        self.assertEqual([prof and prof.id for prof in expected], [prof and prof.id for prof in actual])
+
+    def test_fuzzywuzzy_backend_matches_extract_one(self):
+        index = self.index('fuzzywuzzy')
+        self.assertSameProfessors([extract_one(index, message) for message in self.corpus],
+                                  [index.find(message) for message in self.corpus])
+
+    def test_pruning_never_drops_the_best_match(self):
+        # One candidate at most: every winner must come from the full scan
+        index = self.index('fuzzywuzzy')
+        index.max_candidates = 1
+        self.assertSameProfessors([extract_one(index, message) for message in self.corpus],
+                                  [index.find(message) for message in self.corpus])
+
+    def test_find_many_matches_find(self):
+        index = self.index('fuzzywuzzy')
+        self.assertSameProfessors([index.find(message) for message in self.corpus],
+                                  index.find_many(self.corpus))
+
+
+@unittest.skipUnless(importlib.util.find_spec('rapidfuzz') and importlib.util.find_spec('numpy'),
+                     "rapidfuzz and numpy are not installed")
+class FuzzyBackendParityTest(unittest.TestCase):
+    """rapidfuzz and fuzzywuzzy must answer alike, whichever is installed"""
+
+    def test_both_backends_give_the_same_professors(self):
+        rows, _ = generate_catalog(10000)
+        professors = build_professors(rows)
+        corpus = query_corpus(rows, 400, seed=5) + ['I am tired', 'I am so tired', 'hello there']
+
+        answers = {}
+        for backend in ('rapidfuzz', 'fuzzywuzzy'):
+            index = ProfessorNameIndex(professors)
+            index.backend = backend
+            answers[backend] = (
+                [prof and prof.id for prof in (index.find(message) for message in corpus)],
+                [prof and prof.id for prof in index.find_many(corpus)]
+            )
+
+        self.assertEqual(answers['rapidfuzz'], answers['fuzzywuzzy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import threading
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE)]
+
+from profiler import SAMPLE_SWITCH_INTERVAL, ProfileSession
+
+
+class SampleSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        self.session = ProfileSession('sample', seconds=5, interval=0.001)
+        self.addCleanup(self.session._sampler.join, 5)
+        self.addCleanup(self.session.stop)
+
+    def test_switch_interval_is_restored_when_the_session_stops(self):
+        # The interpreter keeps the interval in whole microseconds
+        while self.session.running and sys.getswitchinterval() > SAMPLE_SWITCH_INTERVAL * 1.5:
+            self.session.stopped.wait(0.001)
+        self.assertAlmostEqual(sys.getswitchinterval(), SAMPLE_SWITCH_INTERVAL, delta=1e-6)
+
+        self.session.stop()
+        self.session._sampler.join(5)
+        self.assertEqual(sys.getswitchinterval(), self.switch_interval)
+
+    def test_overlapping_requests_on_one_thread_keep_it_sampled(self):
+        # Two ASGI requests in flight on the event loop thread
+        first, second = self.session.begin(), self.session.begin()
+        self.session.end(first)
+        self.assertIn(threading.get_ident(), self.session._threads)
+
+        self.session.end(second)
+        self.assertNotIn(threading.get_ident(), self.session._threads)
+        self.assertEqual(self.session.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from response_cache import ResponseCache
+from snapshot import CatalogSnapshot
+from synthetic_catalog import generate_catalog
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', {'n': 1})
+        cache.put('b', {'n': 2})
+        # Reading 'a' makes 'b' the oldest
+        self.assertEqual(cache.get('a'), {'n': 1})
+        cache.put('c', {'n': 3})
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'n': 1})
+        self.assertEqual(cache.get('c'), {'n': 3})
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(ttl=10)
+        with mock.patch('response_cache.time.monotonic', return_value=100.0):
+            cache.put('a', {'n': 1})
+        with mock.patch('response_cache.time.monotonic', return_value=109.9):
+            self.assertEqual(cache.get('a'), {'n': 1})
+        with mock.patch('response_cache.time.monotonic', return_value=110.0):
+            self.assertIsNone(cache.get('a'))
+
+        stats = cache.stats()
+        self.assertEqual((stats['expirations'], stats['size']), (1, 0))
+
+    def test_misses_are_counted_per_lookup(self):
+        cache = ResponseCache()
+        self.assertIsNone(cache.get('a'))
+        cache.bypass()
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', {'n': 1})
+        cache.get('a')
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bypassed']), (1, 2, 1))
+        self.assertEqual(stats['hit_rate'], round(1 / 3, 4))
+
+    def test_disabled_cache_misses_and_stores_nothing(self):
+        cache = ResponseCache(max_entries=0)
+        cache.put('a', {'n': 1})
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.stats()['misses'], cache.stats()['size']), (1, 0))
+
+
+class ChatResponseCacheTest(unittest.TestCase):
+    """Answers are keyed by normalized text and catalog version"""
+
+    def setUp(self):
+        rows, attachments = generate_catalog(300)
+        self.snapshot = CatalogSnapshot.build(1, build_professors(rows), attachments)
+        self.chatbot = ChatbotEngineEnhanced(autoload=False)
+        self.chatbot.publish(self.snapshot, force=True)
+        self.name = self.snapshot.professors[0].name
+
+    def stats(self):
+        stats = self.chatbot.response_cache.stats()
+        return stats['hits'], stats['misses']
+
+    def test_same_text_is_answered_from_the_cache(self):
+        first = self.chatbot.process_message(f"Who is {self.name}?")
+        again = self.chatbot.process_message(f"  who is {self.name.upper()}? ")
+        self.assertEqual(first, again)
+        self.assertEqual(self.stats(), (1, 1))
+
+    def test_new_catalog_version_misses(self):
+        self.chatbot.process_message(f"Who is {self.name}?")
+        # Bypass publish(), which clears the cache, to check the key itself
+        self.chatbot.snapshot = CatalogSnapshot.build(2, list(self.snapshot.professors), [])
+        self.chatbot.process_message(f"Who is {self.name}?")
+        self.assertEqual(self.stats(), (0, 2))
+        self.assertEqual(self.chatbot.response_cache.stats()['size'], 2)
+
+    def test_small_talk_misses_and_is_bypassed(self):
+        self.chatbot.process_message("tell me a joke")
+        self.chatbot.process_message("tell me a joke")
+        stats = self.chatbot.response_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bypassed'], stats['size']), (0, 2, 2, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
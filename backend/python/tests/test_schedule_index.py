@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from schedule_index import DAYS, ScheduleIndex, parse_schedule_query, room_key
+from snapshot import CatalogSnapshot
+from synthetic_catalog import generate_catalog
+
+# A Monday morning
+NOW = datetime(2025, 6, 2, 10, 15)
+
+
+def parse(message):
+    query = parse_schedule_query(message, now=NOW)
+    return query['day'], query['start'], query['end'], query['room'], query['free'], query['explicit']
+
+
+class ParseScheduleQueryTest(unittest.TestCase):
+
+    def test_day_and_range(self):
+        self.assertEqual(parse("Free professors Monday 2-4pm"), ('Monday', 840, 960, None, True, True))
+        self.assertEqual(parse("who is teaching on thurs from 9:30 to 11am"),
+                         ('Thursday', 570, 660, None, False, True))
+
+    def test_range_without_meridiem_reads_class_hours(self):
+        # 1-6 without am/pm are afternoon hours
+        self.assertEqual(parse("who is free wed 1-3")[:3], ('Wednesday', 780, 900))
+        self.assertEqual(parse("who is free wed 10-11")[:3], ('Wednesday', 600, 660))
+
+    def test_single_time_is_a_one_minute_range(self):
+        self.assertEqual(parse("who is teaching at 10:30 on friday")[:3], ('Friday', 630, 631))
+        self.assertEqual(parse("available professors tomorrow at 3")[:3], ('Tuesday', 900, 901))
+
+    def test_bare_number_is_not_a_time(self):
+        self.assertEqual(parse("who teaches 3 subjects on friday")[1:3], (615, 616))
+
+    def test_now_defaults_to_today(self):
+        self.assertEqual(parse("who is teaching right now?"), ('Monday', 615, 616, None, False, True))
+
+    def test_room_without_time_means_the_whole_day(self):
+        self.assertEqual(parse("what's in Room 301 on tuesday?"), ('Tuesday', 0, 1440, '301', False, True))
+        self.assertEqual(parse("what's in rm 301 now")[1:4], (615, 616, '301'))
+        # The room number is not read as a time
+        self.assertEqual(parse("what's in room 12 at 2pm")[1:4], (840, 841, '12'))
+
+    def test_nothing_specific_is_not_explicit(self):
+        self.assertEqual(parse("hello there"), ('Monday', 615, 616, None, False, False))
+
+
+class ScheduleAnswersTest(unittest.TestCase):
+    """Index answers against a scan of every schedule"""
+
+    @classmethod
+    def setUpClass(cls):
+        rows, attachments = generate_catalog(2000)
+        cls.professors = build_professors(rows)
+        cls.index = ScheduleIndex(cls.professors)
+        cls.snapshot = CatalogSnapshot.build(1, cls.professors, attachments)
+
+    def scan(self, day, start, end, room=None):
+        return sorted(
+            sched.id for prof in self.professors for sched in prof.schedules
+            if sched.day == day and sched.start_minutes < end and sched.end_minutes > start
+            and (room is None or room_key(sched.classroom) == room_key(room))
+        )
+
+    def windows(self):
+        for day in DAYS:
+            for start in range(6 * 60, 21 * 60, 45):
+                yield day, start, start + 1
+                yield day, start, start + 120
+
+    def test_teaching_matches_a_scan(self):
+        for day, start, end in self.windows():
+            teaching = sorted(sched.id for _, _, _, sched in self.index.teaching(day, start, end))
+            self.assertEqual(teaching, self.scan(day, start, end))
+
+    def test_free_professors_match_a_scan(self):
+        for day, start, end in self.windows():
+            teaching = set(self.scan(day, start, end))
+            busy = {prof.id for prof in self.professors for sched in prof.schedules if sched.id in teaching}
+            expected = [prof.id for prof in self.professors if prof.id not in busy]
+
+            count, free = self.index.free_professors(day, start, end)
+            self.assertEqual((count, [prof.id for prof in free]), (len(expected), expected))
+            count, page = self.index.free_professors(day, start, end, limit=20)
+            self.assertEqual((count, [prof.id for prof in page]), (len(expected), expected[:20]))
+
+    def test_room_bookings_match_a_scan(self):
+        for room in ('Room 101', 'rm 205', 'Room 340'):
+            for day in DAYS:
+                booked = sorted(sched.id for _, _, _, sched in self.index.in_room(room, day, 600, 720))
+                self.assertEqual(booked, self.scan(day, 600, 720, room))
+
+    def test_chat_answers_count_every_free_professor(self):
+        chatbot = ChatbotEngineEnhanced(autoload=False)
+        chatbot.publish(self.snapshot, force=True)
+        reply = chatbot.process_message("Free professors Monday 2-4pm")
+        count, page = self.index.free_professors('Monday', 840, 960, limit=20)
+
+        self.assertEqual(reply['intent'], 'schedule_search')
+        self.assertEqual(reply['data']['total'], count)
+        self.assertEqual([result['id'] for result in reply['data']['results']], [prof.id for prof in page])
+        self.assertIn(f"({count} professors)", reply['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
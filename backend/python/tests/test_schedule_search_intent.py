@@ -0,0 +1,106 @@
+import os
+import sys
+import unittest
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from snapshot import CatalogSnapshot
+
+
+def catalog_row(professor_id, name, office, subject_id, code, subject_name,
+                schedule_id, classroom, day, start_hour):
+    return {
+        'professor_id': professor_id,
+        'professor_name': name,
+        'department': 'Computer Science',
+        'contact': '09170000000',
+        'email': f"prof{professor_id}@example.edu",
+        'office_location': office,
+        'bio': None,
+        'image_url': None,
+        'subject_id': subject_id,
+        'subject_code': code,
+        'subject_name': subject_name,
+        'subject_description': None,
+        'units': 3,
+        'schedule_id': schedule_id,
+        'classroom': classroom,
+        'day': day,
+        'time_start': timedelta(hours=start_hour),
+        'time_end': timedelta(hours=start_hour + 2),
+        'semester': '1st Semester',
+        'academic_year': '2025-2026',
+        'section': 'A',
+        'schedule_description': None
+    }
+
+
+ROWS = [
+    catalog_row(1, 'Dr. Maria Reyes', 'Room 214, IT Building', 1, 'CS301', 'Database Systems',
+                1, 'Room 301', 'Monday', 9),
+    catalog_row(2, 'Dr. Pedro Dela Cruz', 'Room 118, Science Building', 2, 'IT311', 'Network Security',
+                2, 'Room 105', 'Tuesday', 13)
+]
+
+ATTACHMENTS = [{
+    'id': 1,
+    'professor_id': 1,
+    'file_name': 'cs301-syllabus.pdf',
+    'file_path': 'uploads/cs301-syllabus.pdf',
+    'file_type': 'application/pdf',
+    'description': None,
+    'schedule_id': 1,
+    'subject_name': 'Database Systems',
+    'subject_code': 'CS301'
+}]
+
+
+class ScheduleSearchIntentTest(unittest.TestCase):
+    """Day/time words must not take professor, subject or attachment questions"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.chatbot = ChatbotEngineEnhanced(autoload=False)
+        cls.chatbot.publish(CatalogSnapshot.build(1, build_professors(ROWS), ATTACHMENTS), force=True)
+
+    def ask(self, message):
+        return self.chatbot.process_message(message)
+
+    def test_where_is_named_professor_now_gives_office(self):
+        response = self.ask("where is Dr. Maria Reyes now?")
+        self.assertEqual(response['intent'], 'classroom')
+        self.assertIn('Room 214, IT Building', response['message'])
+
+    def test_named_professor_free_on_day_gives_their_schedule(self):
+        response = self.ask("is Dr. Maria Reyes free on monday?")
+        self.assertNotEqual(response['intent'], 'schedule_search')
+        self.assertEqual(response['data']['name'], 'Dr. Maria Reyes')
+
+    def test_who_is_teaching_code_is_a_subject_question(self):
+        response = self.ask("Who is teaching CS301")
+        self.assertEqual(response['intent'], 'subject')
+        self.assertIn('Dr. Maria Reyes', response['message'])
+
+    def test_what_is_in_professor_files_lists_attachments(self):
+        response = self.ask("what is in Dr. Maria Reyes's files")
+        self.assertEqual(response['intent'], 'attachment')
+        self.assertIn('cs301-syllabus.pdf', response['message'])
+
+    def test_room_and_time_question_is_still_a_schedule_search(self):
+        response = self.ask("what's in Room 301 on monday at 10am?")
+        self.assertEqual(response['intent'], 'schedule_search')
+        self.assertIn('Dr. Maria Reyes', response['message'])
+
+    def test_batch_answers_match_single_answers(self):
+        messages = ["where is Dr. Maria Reyes now?", "Who is teaching CS301",
+                    "what is in Dr. Maria Reyes's files"]
+        batch = self.chatbot.process_messages(messages)
+        self.assertEqual([reply['intent'] for reply in batch],
+                         ['classroom', 'subject', 'attachment'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), HERE]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from session_store import MemorySessionBackend, SQLiteSessionBackend, references
+from snapshot import CatalogSnapshot
+from test_schedule_search_intent import ATTACHMENTS, ROWS
+
+
+def chatbot_with(sessions):
+    chatbot = ChatbotEngineEnhanced(autoload=False)
+    chatbot.publish(CatalogSnapshot.build(1, build_professors(ROWS), ATTACHMENTS), force=True)
+    chatbot.sessions = sessions
+    return chatbot
+
+
+def professor_name(reply):
+    data = reply.get('data')
+    return data.get('name') if isinstance(data, dict) else None
+
+
+class ReferencesTest(unittest.TestCase):
+
+    def test_pronouns_point_back_at_a_professor(self):
+        for message in ["what is her schedule?", "Where is HIS office", "how do I reach them?", "is it hers?"]:
+            self.assertTrue(references(message)[0], message)
+
+    def test_it_and_same_point_back_at_a_subject(self):
+        self.assertEqual(references("who else teaches it?"), (False, True))
+        self.assertEqual(references("same subject, other section"), (False, True))
+
+    def test_pronouns_inside_words_do_not_count(self):
+        for message in ["Where is Sheila?", "Who teaches theory?", "the item list", "Shermans office"]:
+            self.assertEqual(references(message), (False, False), message)
+
+
+class MemorySessionBackendTest(unittest.TestCase):
+
+    def test_round_trip_returns_a_copy(self):
+        sessions = MemorySessionBackend()
+        sessions.set('a', {'professor_id': 1})
+        context = sessions.get('a')
+        context['professor_id'] = 2
+        self.assertEqual(sessions.get('a'), {'professor_id': 1})
+        self.assertIsNone(sessions.get('b'))
+
+    def test_sessions_expire_after_ttl(self):
+        sessions = MemorySessionBackend(ttl=60)
+        with mock.patch('session_store.time.monotonic', return_value=1000.0):
+            sessions.set('a', {'professor_id': 1})
+        with mock.patch('session_store.time.monotonic', return_value=1059.0):
+            self.assertEqual(sessions.get('a'), {'professor_id': 1})
+        with mock.patch('session_store.time.monotonic', return_value=1060.0):
+            self.assertIsNone(sessions.get('a'))
+
+        stats = sessions.stats()
+        self.assertEqual((stats['expirations'], stats['sessions'], stats['bytes']), (1, 0, 0))
+
+    def test_byte_cap_evicts_least_recently_used(self):
+        size = MemorySessionBackend._size('a')
+        sessions = MemorySessionBackend(max_bytes=2 * size)
+        sessions.set('a', {'professor_id': 1})
+        sessions.set('b', {'professor_id': 2})
+        # Reading 'a' leaves 'b' as the least recently used
+        sessions.get('a')
+        sessions.set('c', {'professor_id': 3})
+
+        self.assertIsNone(sessions.get('b'))
+        self.assertEqual(sessions.get('a'), {'professor_id': 1})
+        self.assertEqual(sessions.get('c'), {'professor_id': 3})
+        stats = sessions.stats()
+        self.assertEqual((stats['evictions'], stats['sessions'], stats['bytes']), (1, 2, 2 * size))
+
+    def test_session_count_cap(self):
+        sessions = MemorySessionBackend(max_sessions=3)
+        for number in range(5):
+            sessions.set(str(number), {'professor_id': number})
+        self.assertEqual([sessions.get(str(number)) is not None for number in range(5)],
+                         [False, False, True, True, True])
+
+    def test_updating_a_session_does_not_grow_its_size(self):
+        sessions = MemorySessionBackend()
+        sessions.set('a', {'professor_id': 1})
+        before = sessions.stats()['bytes']
+        sessions.set('a', {'professor_id': 2, 'subject_code': 'CS301'})
+        self.assertEqual(sessions.stats()['bytes'], before)
+
+
+class SQLiteSessionBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'sessions.sqlite3')
+
+    def test_round_trip_between_workers(self):
+        SQLiteSessionBackend(self.path).set('a', {'professor_id': 1, 'subject_code': 'CS301'})
+        # A second backend on the same file stands in for another worker
+        self.assertEqual(SQLiteSessionBackend(self.path).get('a'), {'professor_id': 1, 'subject_code': 'CS301'})
+        self.assertIsNone(SQLiteSessionBackend(self.path).get('b'))
+
+    def test_sessions_expire_after_ttl(self):
+        sessions = SQLiteSessionBackend(self.path, ttl=60)
+        with mock.patch('session_store.time.time', return_value=1000.0):
+            sessions.set('a', {'professor_id': 1})
+        with mock.patch('session_store.time.time', return_value=1059.0):
+            self.assertEqual(sessions.get('a')['professor_id'], 1)
+        with mock.patch('session_store.time.time', return_value=1060.0):
+            self.assertIsNone(sessions.get('a'))
+            sessions.prune()
+        self.assertEqual(sessions.stats()['sessions'], 0)
+
+    def test_prune_keeps_the_newest_sessions(self):
+        sessions = SQLiteSessionBackend(self.path, max_sessions=2)
+        for number in range(4):
+            with mock.patch('session_store.time.time', return_value=1000.0 + number):
+                sessions.set(str(number), {'professor_id': number})
+        with mock.patch('session_store.time.time', return_value=1010.0):
+            sessions.prune()
+            self.assertEqual([sessions.get(str(number)) is not None for number in range(4)],
+                             [False, False, True, True])
+
+
+class SessionFollowUpTest(unittest.TestCase):
+    """process_message() answers follow-ups from the session's context"""
+
+    def setUp(self):
+        self.chatbot = chatbot_with(MemorySessionBackend())
+
+    def ask(self, message, session_id='s1'):
+        return self.chatbot.process_message(message, session_id)
+
+    def test_pronoun_follows_the_last_professor(self):
+        self.ask("Who is Dr. Pedro Dela Cruz?")
+        reply = self.ask("where is his office?")
+        self.assertEqual(reply['intent'], 'classroom')
+        self.assertEqual(professor_name(reply), 'Dr. Pedro Dela Cruz')
+        self.assertIn('Room 118, Science Building', reply['message'])
+
+    def test_single_teacher_of_a_subject_becomes_the_professor(self):
+        self.ask("Who teaches CS301")
+        self.assertEqual(self.chatbot.get_session('s1'), {'subject_code': 'CS301', 'professor_id': 1})
+        self.assertEqual(professor_name(self.ask("what is her email?")), 'Dr. Maria Reyes')
+
+    def test_it_follows_the_last_subject(self):
+        self.ask("Who teaches CS301")
+        reply = self.ask("who else teaches it?")
+        self.assertEqual(reply['intent'], 'subject')
+        self.assertEqual([result['subject']['code'] for result in reply['data']], ['CS301'])
+
+    def test_named_professor_wins_over_the_context(self):
+        self.ask("Who is Dr. Pedro Dela Cruz?")
+        self.assertEqual(professor_name(self.ask("what is Dr. Maria Reyes's email? I need her")), 'Dr. Maria Reyes')
+
+    def test_sessions_do_not_leak(self):
+        self.ask("Who is Dr. Pedro Dela Cruz?")
+        self.assertIsNone(professor_name(self.ask("where is his office?", 's2')))
+        # The shared default id never keeps context
+        self.ask("Who is Dr. Pedro Dela Cruz?", 'default')
+        self.assertIsNone(self.chatbot.get_session('default'))
+
+    def test_follow_ups_are_not_cached(self):
+        self.ask("Who is Dr. Pedro Dela Cruz?")
+        self.ask("where is his office?")
+        self.ask("Who is Dr. Maria Reyes?", 's2')
+        self.assertEqual(professor_name(self.ask("where is his office?", 's2')), 'Dr. Maria Reyes')
+
+    def test_sqlite_sessions_carry_context_across_workers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'sessions.sqlite3')
+
+        chatbot_with(SQLiteSessionBackend(path)).process_message("Who is Dr. Pedro Dela Cruz?", 's1')
+        reply = chatbot_with(SQLiteSessionBackend(path)).process_message("how do I contact him?", 's1')
+        self.assertEqual(reply['intent'], 'contact')
+        self.assertEqual(professor_name(reply), 'Dr. Pedro Dela Cruz')
+
+
+if __name__ == '__main__':
+    unittest.main()
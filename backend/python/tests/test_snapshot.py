@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from snapshot import CatalogSnapshot, SnapshotRejected
+from synthetic_catalog import SyntheticDatabase, generate_catalog
+
+
+def catalog(rows, attachments, version=1):
+    return CatalogSnapshot.build(version, build_professors(rows), attachments)
+
+
+def first_professors(rows, count):
+    """Rows of the first count professors"""
+    ids = list(dict.fromkeys(row['professor_id'] for row in rows))[:count]
+    return [row for row in rows if row['professor_id'] in ids]
+
+
+class CheckSuccessorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rows, cls.attachments = generate_catalog(300)
+        cls.current = catalog(cls.rows, cls.attachments)
+        cls.count = len(cls.current.professors)
+
+    def test_same_size_is_accepted(self):
+        self.current.check_successor(catalog(self.rows, self.attachments, 2))
+
+    def test_empty_current_accepts_anything(self):
+        CatalogSnapshot.empty().check_successor(CatalogSnapshot.empty())
+
+    def test_empty_candidate_is_rejected(self):
+        with self.assertRaisesRegex(SnapshotRejected, 'no professors'):
+            self.current.check_successor(CatalogSnapshot.empty())
+
+    def test_below_min_ratio_is_rejected(self):
+        half = catalog(first_professors(self.rows, self.count // 2 - 1), self.attachments)
+        with self.assertRaisesRegex(SnapshotRejected, 'below 50%'):
+            self.current.check_successor(half)
+        # The ratio is configurable
+        self.current.check_successor(half, min_ratio=0.4)
+
+    def test_at_min_ratio_is_accepted(self):
+        self.current.check_successor(catalog(first_professors(self.rows, -(-self.count // 2)), self.attachments))
+
+    def test_losing_every_attachment_is_rejected(self):
+        with self.assertRaisesRegex(SnapshotRejected, 'no attachments'):
+            self.current.check_successor(catalog(self.rows, []))
+
+    def test_catalog_without_attachments_stays_accepted(self):
+        catalog(self.rows, []).check_successor(catalog(self.rows, []))
+
+
+class PublishTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rows, self.attachments = generate_catalog(300)
+        self.chatbot = ChatbotEngineEnhanced(autoload=False)
+        self.chatbot.publish(catalog(self.rows, self.attachments), force=True)
+
+    def test_rejected_snapshot_is_not_published(self):
+        current = self.chatbot.snapshot
+        with self.assertRaises(SnapshotRejected):
+            self.chatbot.publish(CatalogSnapshot.empty())
+        self.assertIs(self.chatbot.snapshot, current)
+
+    def test_force_publishes_a_suspicious_snapshot(self):
+        self.chatbot.publish(CatalogSnapshot.empty(), force=True)
+        self.assertEqual(len(self.chatbot.professors_data), 0)
+
+    def test_pinned_snapshot_survives_a_publish(self):
+        pinned = self.chatbot.snapshot
+        name = pinned.professors[0].name
+        successor = catalog([row for row in self.rows if row['professor_name'] != name], self.attachments, 2)
+
+        self.chatbot.publish(successor)
+        self.assertIs(self.chatbot.snapshot, successor)
+        # A request that pinned the old version still resolves against it
+        self.assertEqual(pinned.name_index.find(name).name, name)
+        found = successor.name_index.find(name)
+        self.assertTrue(found is None or found.name != name)
+
+    def test_publish_clears_the_response_cache(self):
+        self.chatbot.process_message("Who teaches Calculus?")
+        self.assertGreater(self.chatbot.response_cache.stats()['size'], 0)
+        self.chatbot.publish(catalog(self.rows, self.attachments, 2))
+        self.assertEqual(self.chatbot.response_cache.stats()['size'], 0)
+
+    def test_readers_always_see_one_whole_snapshot(self):
+        # Two catalogs that disagree on every office; a reply mixing them would be torn
+        moved = [dict(row, office_location=row['office_location'] + ' (Annex)') for row in self.rows]
+        snapshots = [catalog(self.rows, self.attachments), catalog(moved, self.attachments)]
+        offices = [{prof.name: prof.office_location for prof in snapshot.professors} for snapshot in snapshots]
+        names = [prof.name for prof in snapshots[0].professors[:20]]
+        stop = threading.Event()
+
+        def publisher():
+            swaps = 0
+            while not stop.is_set():
+                self.chatbot.publish(snapshots[swaps % 2], force=True)
+                swaps += 1
+
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        try:
+            for turn in range(300):
+                name = names[turn % len(names)]
+                data = self.chatbot.process_message(f"where is the office of {name}?")['data']
+                self.assertIn(data['office_location'], [offices[0][data['name']], offices[1][data['name']]])
+        finally:
+            stop.set()
+            thread.join()
+
+
+class ReloadEndpointTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import app
+        cls.chatbot = app.chatbot
+        cls.client = app.app.test_client()
+        cls.rows, cls.attachments = generate_catalog(300)
+
+    def setUp(self):
+        self.chatbot.db = SyntheticDatabase(self.rows, self.attachments)
+        self.chatbot.load_data(force=True)
+        self.chatbot.ready.set()
+
+    def test_truncated_reload_answers_409(self):
+        current = self.chatbot.snapshot
+        self.chatbot.db.rows = first_professors(self.rows, 3)
+
+        response = self.client.post('/reload-data?full=1')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.get_json()['success'])
+        self.assertIs(self.chatbot.snapshot, current)
+
+    def test_force_publishes_the_truncated_reload(self):
+        self.chatbot.db.rows = first_professors(self.rows, 3)
+
+        response = self.client.post('/reload-data', json={'full': True, 'force': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['reload']['professors'], 3)
+
+    def test_ordinary_reload_succeeds(self):
+        response = self.client.post('/reload-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['reload']['mode'], 'incremental')
+
+
+if __name__ == '__main__':
+    unittest.main()
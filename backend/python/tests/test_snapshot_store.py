@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), 'benchmarks')]
+
+import snapshot_store
+from chatbot_engine_enhanced import ChatbotEngineEnhanced
+from models import build_professors
+from snapshot import CatalogSnapshot
+from snapshot_store import HEADER, SnapshotFileStore
+from synthetic_catalog import SyntheticDatabase, generate_catalog, query_corpus
+
+
+class SnapshotFileStoreTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rows, cls.attachments = generate_catalog(1000)
+        cls.snapshot = CatalogSnapshot.build(3, build_professors(cls.rows), cls.attachments,
+                                             watermark=datetime(2025, 6, 1, 8, 30))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'catalog.snap')
+
+    def store(self):
+        return SnapshotFileStore(self.path, check_interval=0)
+
+    def test_write_then_has_update_then_read(self):
+        writer, reader = self.store(), self.store()
+        self.assertFalse(reader.has_update())
+
+        writer.write(self.snapshot)
+        self.assertFalse(writer.has_update())
+        self.assertTrue(reader.has_update())
+
+        loaded = reader.read()
+        self.assertFalse(reader.has_update())
+        self.assertEqual(loaded.version, 3)
+        self.assertEqual(loaded.watermark, self.snapshot.watermark)
+        self.assertEqual([prof.to_dict() for prof in loaded.professors],
+                         [prof.to_dict() for prof in self.snapshot.professors])
+        self.assertEqual(loaded.attachments_by_schedule, self.snapshot.attachments_by_schedule)
+        self.assertEqual(loaded.describe()['room_conflicts'], self.snapshot.describe()['room_conflicts'])
+
+        corpus = query_corpus(self.rows, 100)
+        self.assertEqual([prof and prof.id for prof in loaded.name_index.find_many(corpus)],
+                         [prof and prof.id for prof in self.snapshot.name_index.find_many(corpus)])
+        self.assertEqual([len(loaded.subject_index.search(query)) for query in corpus],
+                         [len(self.snapshot.subject_index.search(query)) for query in corpus])
+
+    def test_missing_file_reads_as_none(self):
+        self.assertIsNone(self.store().read())
+
+    def test_file_from_another_python_is_ignored(self):
+        self.store().write(self.snapshot)
+        self.rewrite_python_version(2, 7)
+        self.assertIsNone(self.store().read())
+
+    def test_file_from_another_python_is_rebuilt(self):
+        self.store().write(self.snapshot)
+        self.rewrite_python_version(2, 7)
+
+        chatbot = ChatbotEngineEnhanced(autoload=False)
+        chatbot.db = SyntheticDatabase(self.rows, self.attachments)
+        chatbot.snapshot_store = self.store()
+        chatbot.load_initial_catalog()
+
+        self.assertEqual(len(chatbot.professors_data), len(self.snapshot.professors))
+        self.assertEqual(self.store().read().version, chatbot.snapshot.version)
+
+    def rewrite_python_version(self, major, minor):
+        with open(self.path, 'r+b') as f:
+            fields = list(HEADER.unpack(f.read(HEADER.size)))
+            fields[2:4] = major, minor
+            f.seek(0)
+            f.write(HEADER.pack(*fields))
+
+    def test_header_records_this_python(self):
+        data = snapshot_store.encode_snapshot(self.snapshot)
+        self.assertEqual(HEADER.unpack_from(data)[2:4], sys.version_info[:2])
+
+
+if __name__ == '__main__':
+    unittest.main()